@@ -1,17 +1,30 @@
 import argparse
-import json
+import heapq
 import logging
 import os
+import re
 import socket
 import threading
 import time
-from collections import defaultdict
-from dataclasses import dataclass
-from typing import Callable, Dict, Optional, Set
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Deque, Dict, List, Mapping, Optional, Set, Tuple
 
 import paho.mqtt.client as mqtt
 
+# Die Render-Funktionen bleiben auch über ``app`` erreichbar.
+from awtrix_messages import (  # noqa: F401
+    RenderPlan,
+    compile_render_plan,
+    display_state_uuids,
+    format_control_message,
+    render_plan_message,
+)
 from loxone_data import ControlRow, LoxoneDataFetcher
+from mqtt_connection import MqttConnection
+from mqtt_publisher import MESSAGE_AUTOMATIC, MESSAGE_BRIDGE, MqttPublisher
+from loxone_structure import StructureModel
 
 
 logger = logging.getLogger(__name__)
@@ -22,7 +35,8 @@ except ImportError:  # pragma: no cover - Python < 3.8 compatibility guard
     TYPE_CHECKING = False
 
 if TYPE_CHECKING:  # pragma: no cover - typing only
-    from auto_config import AutoConfigStore
+    from auto_config import AutoConfigStore, ChangeFilter
+    from loxone_stream import LoxoneStateStream
 
 
 @dataclass
@@ -35,10 +49,262 @@ class Config:
     mqtt_username: Optional[str] = None
     mqtt_password: Optional[str] = None
     automatic_interval: float = 60.0
+    adaptive_polling: bool = False
+    adaptive_min_interval: float = 1.0
+    adaptive_max_interval: float = 600.0
+    mqtt_qos_automatic: int = 0
+    mqtt_qos_bridge: int = 0
+    mqtt_queue_size: int = 1000
+    mqtt_max_inflight: int = 20
+    mqtt_client_id: Optional[str] = None
+    mqtt_reconnect_min: float = 1.0
+    mqtt_reconnect_max: float = 60.0
+    mqtt_v5: bool = False
+    mqtt_message_expiry: float = 120.0
+    mqtt_topic_aliases: int = 64
+    mqtt_displays: Tuple[str, ...] = ()
+    udp_dedupe_window: float = 1.0
+    udp_dedupe_max_entries: int = 1024
+    udp_rcvbuf: int = 4 * 1024 * 1024
+    udp_sndbuf: int = 0
+
+
+class MessageDeduplicator:
+    """Suppress repeats of a message within ``window`` seconds.
+
+    Remembered messages are kept in send order, so expired entries are
+    dropped from the front in O(1) per message and the oldest entry is
+    evicted once ``max_entries`` are stored.  A repeat inside the window is
+    suppressed without extending it; afterwards the message passes again.
+    ``window=0`` disables suppression.
+    """
+
+    def __init__(
+        self,
+        window: float = 1.0,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window = window
+        self.max_entries = max(1, max_entries)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sent_at: "OrderedDict[str, float]" = OrderedDict()
+        self.counters: Dict[str, int] = {"forwarded": 0, "suppressed": 0, "evicted": 0}
+
+    def admit(self, message: str) -> bool:
+        """Whether ``message`` should be sent; remembers it if so."""
+
+        now = self._clock()
+        with self._lock:
+            if self.window <= 0:
+                self.counters["forwarded"] += 1
+                return True
+            self._expire(now)
+            if message in self._sent_at:
+                self.counters["suppressed"] += 1
+                return False
+            if len(self._sent_at) >= self.max_entries:
+                self._sent_at.popitem(last=False)
+                self.counters["evicted"] += 1
+            self._sent_at[message] = now
+            self.counters["forwarded"] += 1
+            return True
+
+    def _expire(self, now: float) -> None:
+        # Einträge liegen in Sendereihenfolge – abgelaufene stehen vorne.
+        while self._sent_at:
+            message, sent_at = next(iter(self._sent_at.items()))
+            if now - sent_at < self.window:
+                break
+            del self._sent_at[message]
+
+    def __contains__(self, message: object) -> bool:
+        with self._lock:
+            self._expire(self._clock())
+            return message in self._sent_at
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sent_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sent_at.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(
+                self.counters,
+                entries=len(self._sent_at),
+                window=self.window,
+                max_entries=self.max_entries,
+            )
+
+
+# Größte Nutzlast eines UDP-Datagramms über IPv4: 65535 minus 20 Byte
+# IP- und 8 Byte UDP-Header.
+UDP_MAX_DATAGRAM = 65507
+
+# Nicht jede Plattform kennt MSG_TRUNC; ohne bleibt ``truncated`` bei 0.
+_MSG_TRUNC = getattr(socket, "MSG_TRUNC", 0)
+
+
+class UdpTransport:
+    """Long-lived UDP sockets of the bridge.
+
+    Outgoing datagrams reuse one socket per destination instead of opening a
+    new one per message.  Incoming datagrams are read with ``recvfrom_into``
+    into one preallocated buffer of ``max_datagram`` bytes; with
+    ``MSG_TRUNC`` the kernel reports the real size, so oversized datagrams
+    are counted as truncated.  ``rcvbuf``/``sndbuf`` set ``SO_RCVBUF``/
+    ``SO_SNDBUF`` (``0`` keeps the system default) so bursts can queue up in
+    the kernel while the bridge is busy; the kernel may clamp the values,
+    :meth:`stats` reports the effective sizes.
+    """
+
+    def __init__(
+        self, *, rcvbuf: int = 0, sndbuf: int = 0, max_datagram: int = UDP_MAX_DATAGRAM
+    ):
+        self.rcvbuf = rcvbuf
+        self.sndbuf = sndbuf
+        self._lock = threading.Lock()
+        self._send_sockets: Dict[Tuple[str, int], socket.socket] = {}
+        self._receive_socket: Optional[socket.socket] = None
+        self._buffer = bytearray(max_datagram)
+        self._view = memoryview(self._buffer)
+        self.counters: Dict[str, int] = {
+            "sent": 0,
+            "send_errors": 0,
+            "received": 0,
+            "truncated": 0,
+            "dropped": 0,
+        }
+
+    def send(self, payload: bytes, destination: Tuple[str, int]) -> bool:
+        """Send ``payload`` to ``destination``; ``False`` if the socket failed."""
+
+        with self._lock:
+            sock = self._send_sockets.get(destination)
+            if sock is None:
+                sock = self._send_sockets[destination] = socket.socket(
+                    socket.AF_INET, socket.SOCK_DGRAM
+                )
+                if self.sndbuf:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+        try:
+            sock.sendto(payload, destination)
+        except OSError as exc:
+            with self._lock:
+                self.counters["send_errors"] += 1
+                # Defekten Socket verwerfen, die nächste Nachricht öffnet einen neuen.
+                if self._send_sockets.get(destination) is sock:
+                    del self._send_sockets[destination]
+            sock.close()
+            logger.warning("UDP-Nachricht an %s:%s fehlgeschlagen: %s", *destination, exc)
+            return False
+        with self._lock:
+            self.counters["sent"] += 1
+        return True
+
+    def bind(self, address: Tuple[str, int]) -> None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+        sock.bind(address)
+        with self._lock:
+            self._receive_socket = sock
+
+    def receive(self) -> Tuple[bytes, Tuple[str, int]]:
+        """Block until a datagram arrives and return a copy of it with its sender."""
+
+        sock = self._receive_socket
+        if sock is None:
+            raise RuntimeError("UdpTransport.bind muss vor receive aufgerufen werden")
+        size, address = sock.recvfrom_into(self._buffer, 0, _MSG_TRUNC)
+        with self._lock:
+            self.counters["received"] += 1
+            if size > len(self._buffer):
+                self.counters["truncated"] += 1
+                size = len(self._buffer)
+        # Kopie, der Puffer wird beim nächsten Empfang überschrieben.
+        return bytes(self._view[:size]), address
+
+    def count_dropped(self) -> None:
+        with self._lock:
+            self.counters["dropped"] += 1
+
+    def close(self) -> None:
+        with self._lock:
+            sockets = list(self._send_sockets.values())
+            self._send_sockets.clear()
+            if self._receive_socket is not None:
+                sockets.append(self._receive_socket)
+                self._receive_socket = None
+        for sock in sockets:
+            sock.close()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats: Dict[str, object] = dict(
+                self.counters,
+                send_sockets=len(self._send_sockets),
+                max_datagram=len(self._buffer),
+            )
+            receive_socket = self._receive_socket
+        if receive_socket is not None:
+            try:
+                stats["rcvbuf"] = receive_socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            except OSError:  # pragma: no cover - socket already closed
+                pass
+        return stats
+
+
+# Zuletzt gesendete Nachrichten und Sockets je UDP-Ziel.
+_udp_deduplicators: Dict[Tuple[str, int], MessageDeduplicator] = {}
+_udp_transports: Dict[Tuple[str, int], UdpTransport] = {}
+_udp_lock = threading.Lock()
+
+
+def udp_deduplicator(config: Config) -> MessageDeduplicator:
+    """Return the deduplicator of the UDP destination configured in ``config``."""
+
+    destination = (config.udp_ip, config.udp_port)
+    with _udp_lock:
+        deduplicator = _udp_deduplicators.get(destination)
+        if deduplicator is None:
+            deduplicator = _udp_deduplicators[destination] = MessageDeduplicator(
+                config.udp_dedupe_window, config.udp_dedupe_max_entries
+            )
+        return deduplicator
+
+
+def udp_transport(config: Config) -> UdpTransport:
+    """Return the process-wide transport for the UDP address in ``config``."""
+
+    address = (config.udp_ip, config.udp_port)
+    with _udp_lock:
+        transport = _udp_transports.get(address)
+        if transport is None:
+            transport = _udp_transports[address] = UdpTransport(
+                rcvbuf=config.udp_rcvbuf, sndbuf=config.udp_sndbuf
+            )
+        return transport
+
+
+def udp_stats() -> Dict[str, Dict[str, Dict[str, object]]]:
+    """Transport and suppression statistics per UDP address (``ip:port``)."""
 
+    with _udp_lock:
+        deduplicators = dict(_udp_deduplicators)
+        transports = dict(_udp_transports)
+    stats: Dict[str, Dict[str, Dict[str, object]]] = defaultdict(dict)
+    for (ip, port), deduplicator in deduplicators.items():
+        stats[f"{ip}:{port}"]["dedupe"] = deduplicator.stats()
+    for (ip, port), transport in transports.items():
+        stats[f"{ip}:{port}"]["transport"] = transport.stats()
+    return dict(stats)
 
-# Variable zur Verfolgung der gesendeten Nachrichten
-sent_messages = set()
 
 # Interne Ablage für Nachrichten, die lokal auf dem MQTT-Broker veröffentlicht
 # wurden und daher nicht erneut verarbeitet werden sollen.
@@ -49,7 +315,12 @@ _published_lock = threading.Lock()
 def reset_message_tracking() -> None:
     """Reset cached message tracking state (hauptsächlich für Tests)."""
 
-    sent_messages.clear()
+    with _udp_lock:
+        _udp_deduplicators.clear()
+        transports = list(_udp_transports.values())
+        _udp_transports.clear()
+    for transport in transports:
+        transport.close()
     with _published_lock:
         _published_messages.clear()
 
@@ -75,21 +346,94 @@ def should_ignore_mqtt_message(message: str) -> bool:
         return True
 
 
+def forget_local_mqtt_message(message: str) -> None:
+    """Nimm eine Meldung zurück, deren Veröffentlichung fehlgeschlagen ist."""
+
+    # Gleiche Buchführung wie beim Eintreffen des Echos.
+    should_ignore_mqtt_message(message)
+
+
+# Wie lange der Broker eine persistente MQTT-v5-Sitzung aufhebt (Sekunden).
+_MQTT_V5_SESSION_EXPIRY = 24 * 3600
+
+
+def _mqtt_v5_properties(packet_type: str) -> Callable[[], object]:
+    """Return a factory for paho ``Properties`` of ``packet_type`` (MQTT v5 only)."""
+
+    # Erst bei Bedarf importieren, MQTT 3.1.1 braucht die Module nicht.
+    from paho.mqtt.packettypes import PacketTypes
+    from paho.mqtt.properties import Properties
+
+    return partial(Properties, getattr(PacketTypes, packet_type))
+
+
 def create_mqtt_client(config: Config) -> mqtt.Client:
-    client = mqtt.Client()
+    """Create an unconnected client; :class:`MqttConnection` connects it."""
+
+    if config.mqtt_v5:
+        # Persistente Sitzung wird bei v5 über ``clean_start`` beim Verbinden gesteuert.
+        client = mqtt.Client(client_id=config.mqtt_client_id or "", protocol=mqtt.MQTTv5)
+    elif config.mqtt_client_id:
+        # Feste Client-ID: der Broker behält Abonnements und QoS>0-Nachrichten.
+        client = mqtt.Client(client_id=config.mqtt_client_id, clean_session=False)
+    else:
+        client = mqtt.Client()
     if config.mqtt_username or config.mqtt_password:
         client.username_pw_set(config.mqtt_username, config.mqtt_password)
-    client.connect(config.mqtt_broker, config.mqtt_port, 60)
+    client.reconnect_delay_set(config.mqtt_reconnect_min, config.mqtt_reconnect_max)
     return client
 
 
+def create_mqtt_publisher(client: mqtt.Client, config: Config, name: str) -> MqttPublisher:
+    """Wrap ``client`` in a bounded publisher configured from ``config``."""
+
+    v5_options = {}
+    if config.mqtt_v5:
+        v5_options = {
+            "properties_factory": _mqtt_v5_properties("PUBLISH"),
+            "message_expiry": config.mqtt_message_expiry,
+            "topic_alias_limit": config.mqtt_topic_aliases,
+        }
+    return MqttPublisher(
+        client,
+        name,
+        qos={MESSAGE_AUTOMATIC: config.mqtt_qos_automatic, MESSAGE_BRIDGE: config.mqtt_qos_bridge},
+        max_queue=config.mqtt_queue_size,
+        max_inflight=config.mqtt_max_inflight,
+        on_send=record_local_mqtt_message,
+        on_send_failed=forget_local_mqtt_message,
+        **v5_options,
+    )
+
+
+def create_mqtt_connection(config: Config) -> MqttConnection:
+    """Create the broker connection shared by bridge and automatic mode."""
+
+    client = create_mqtt_client(config)
+    connect_options = {}
+    if config.mqtt_v5 and config.mqtt_client_id:
+        properties = _mqtt_v5_properties("CONNECT")()
+        properties.SessionExpiryInterval = _MQTT_V5_SESSION_EXPIRY
+        connect_options = {"clean_start": False, "properties": properties}
+    return MqttConnection(
+        client,
+        config.mqtt_broker,
+        config.mqtt_port,
+        publisher=create_mqtt_publisher(client, config, "mqtt"),
+        connect_options=connect_options,
+    )
+
+
 def send_udp_message(message: str, config: Config) -> None:
-    """Sende eine Nachricht an das konfigurierte UDP-Ziel."""
+    """Sende eine Nachricht an das konfigurierte UDP-Ziel.
 
-    if message not in sent_messages:
-        sent_messages.add(message)
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.sendto(message.encode(), (config.udp_ip, config.udp_port))
+    Wiederholungen derselben Nachricht innerhalb von ``config.udp_dedupe_window``
+    Sekunden werden unterdrückt (:class:`MessageDeduplicator`).
+    """
+
+    if not udp_deduplicator(config).admit(message):
+        return
+    if udp_transport(config).send(message.encode(), (config.udp_ip, config.udp_port)):
         logger.info(
             "Weitergeleitete MQTT-Nachricht – Topic: %s, Nachricht: %s",
             config.mqtt_topic,
@@ -109,23 +453,28 @@ def create_on_message(config: Config):
     return on_message
 
 
-def mqtt_to_udp(config: Config) -> None:
-    client = create_mqtt_client(config)
-    client.on_message = create_on_message(config)
-    client.subscribe(config.mqtt_topic)
-    client.loop_forever()
+def mqtt_to_udp(config: Config, connection: MqttConnection) -> None:
+    """Forward messages on the configured topic to UDP via ``connection``."""
+
+    connection.subscribe(config.mqtt_topic, create_on_message(config))
 
 
-def udp_to_mqtt(client: mqtt.Client, config: Config) -> None:
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((config.udp_ip, config.udp_port))
+def udp_to_mqtt(connection: MqttConnection, config: Config) -> None:
+    """Publish every datagram received on the configured UDP address to MQTT."""
+
+    transport = udp_transport(config)
+    transport.bind((config.udp_ip, config.udp_port))
     while True:
-        data, addr = sock.recvfrom(1024)
-        message = data.decode()
-        print(f"UDP Nachricht empfangen: {message}")
-        record_local_mqtt_message(message)
-        client.publish(config.mqtt_topic, message)
-        logger.info(
+        data, _addr = transport.receive()
+        try:
+            message = data.decode()
+        except UnicodeDecodeError:
+            transport.count_dropped()
+            logger.warning("UDP-Nachricht ist kein gültiges UTF-8 und wird verworfen")
+            continue
+        connection.publish(config.mqtt_topic, message, message_class=MESSAGE_BRIDGE)
+        # Bei tausenden Datagrammen pro Sekunde kein print je Nachricht.
+        logger.debug(
             "Veröffentlichte UDP-Nachricht – Topic: %s, Nachricht: %s",
             config.mqtt_topic,
             message,
@@ -153,6 +502,113 @@ def parse_args(argv=None) -> Config:
         default=60.0,
         help="Intervall in Sekunden für den Automatikmodus (Standard: 60)",
     )
+    parser.add_argument(
+        "--adaptive-polling",
+        action="store_true",
+        help="Abfrageintervall je Control an die Änderungshäufigkeit anpassen",
+    )
+    parser.add_argument(
+        "--adaptive-min-interval",
+        type=float,
+        default=1.0,
+        help="Kürzestes adaptives Intervall in Sekunden (Standard: 1)",
+    )
+    parser.add_argument(
+        "--adaptive-max-interval",
+        type=float,
+        default=600.0,
+        help="Längstes adaptives Intervall in Sekunden (Standard: 600)",
+    )
+    parser.add_argument(
+        "--mqtt-qos-automatic",
+        type=int,
+        choices=(0, 1, 2),
+        default=0,
+        help="QoS für Nachrichten des Automatikmodus (Standard: 0)",
+    )
+    parser.add_argument(
+        "--mqtt-qos-bridge",
+        type=int,
+        choices=(0, 1, 2),
+        default=0,
+        help="QoS für weitergeleitete UDP-Nachrichten (Standard: 0)",
+    )
+    parser.add_argument(
+        "--mqtt-queue-size",
+        type=int,
+        default=1000,
+        help="Maximale Länge der MQTT-Sendewarteschlange (Standard: 1000)",
+    )
+    parser.add_argument(
+        "--mqtt-max-inflight",
+        type=int,
+        default=20,
+        help="Maximal unbestätigte MQTT-Nachrichten (Standard: 20)",
+    )
+    parser.add_argument(
+        "--mqtt-client-id",
+        default=None,
+        help="Feste MQTT Client-ID für eine persistente Sitzung",
+    )
+    parser.add_argument(
+        "--mqtt-reconnect-min",
+        type=float,
+        default=1.0,
+        help="Erste Wartezeit vor einem Verbindungsversuch in Sekunden (Standard: 1)",
+    )
+    parser.add_argument(
+        "--mqtt-reconnect-max",
+        type=float,
+        default=60.0,
+        help="Längste Wartezeit zwischen Verbindungsversuchen in Sekunden (Standard: 60)",
+    )
+    parser.add_argument(
+        "--mqtt-v5",
+        action="store_true",
+        help="MQTT v5 mit Topic-Aliasen, Ablaufzeit und UUID-Eigenschaft verwenden",
+    )
+    parser.add_argument(
+        "--mqtt-message-expiry",
+        type=float,
+        default=120.0,
+        help="Ablaufzeit der Nachrichten in Sekunden, nur MQTT v5 (Standard: 120, 0 = keine)",
+    )
+    parser.add_argument(
+        "--mqtt-topic-aliases",
+        type=int,
+        default=64,
+        help="Höchstzahl genutzter Topic-Aliase, nur MQTT v5 (Standard: 64)",
+    )
+    parser.add_argument(
+        "--mqtt-display",
+        action="append",
+        default=[],
+        help="Topic-Präfix einer weiteren AWTRIX-Uhr (mehrfach angebbar)",
+    )
+    parser.add_argument(
+        "--udp-dedupe-window",
+        type=float,
+        default=1.0,
+        help="Gleiche MQTT-Nachricht innerhalb dieser Sekunden nur einmal per UDP senden (Standard: 1, 0 = aus)",
+    )
+    parser.add_argument(
+        "--udp-dedupe-max-entries",
+        type=int,
+        default=1024,
+        help="Höchstzahl gemerkter Nachrichten für die Duplikaterkennung (Standard: 1024)",
+    )
+    parser.add_argument(
+        "--udp-rcvbuf",
+        type=int,
+        default=4 * 1024 * 1024,
+        help="Empfangspuffer des UDP-Sockets in Bytes (Standard: 4 MiB, 0 = Systemstandard)",
+    )
+    parser.add_argument(
+        "--udp-sndbuf",
+        type=int,
+        default=0,
+        help="Sendepuffer der UDP-Sockets in Bytes (Standard: Systemstandard)",
+    )
 
     args = parser.parse_args(argv)
     return Config(
@@ -164,6 +620,24 @@ def parse_args(argv=None) -> Config:
         mqtt_username=args.mqtt_username,
         mqtt_password=args.mqtt_password,
         automatic_interval=args.automatic_interval,
+        adaptive_polling=args.adaptive_polling,
+        adaptive_min_interval=args.adaptive_min_interval,
+        adaptive_max_interval=args.adaptive_max_interval,
+        mqtt_qos_automatic=args.mqtt_qos_automatic,
+        mqtt_qos_bridge=args.mqtt_qos_bridge,
+        mqtt_queue_size=args.mqtt_queue_size,
+        mqtt_max_inflight=args.mqtt_max_inflight,
+        mqtt_client_id=args.mqtt_client_id,
+        mqtt_reconnect_min=args.mqtt_reconnect_min,
+        mqtt_reconnect_max=args.mqtt_reconnect_max,
+        mqtt_v5=args.mqtt_v5,
+        mqtt_message_expiry=args.mqtt_message_expiry,
+        mqtt_topic_aliases=args.mqtt_topic_aliases,
+        mqtt_displays=tuple(args.mqtt_display),
+        udp_dedupe_window=args.udp_dedupe_window,
+        udp_dedupe_max_entries=args.udp_dedupe_max_entries,
+        udp_rcvbuf=args.udp_rcvbuf,
+        udp_sndbuf=args.udp_sndbuf,
     )
 
 
@@ -189,66 +663,94 @@ def config_from_env() -> Config:
         mqtt_username=os.getenv("MQTT_USERNAME") or None,
         mqtt_password=os.getenv("MQTT_PASSWORD") or None,
         automatic_interval=automatic_interval,
+        adaptive_polling=os.getenv("AUTOMATIC_ADAPTIVE", "").strip().lower()
+        in ("1", "true", "yes", "on"),
+        adaptive_min_interval=float(os.getenv("AUTOMATIC_MIN_INTERVAL", "1")),
+        adaptive_max_interval=float(os.getenv("AUTOMATIC_MAX_INTERVAL", "600")),
+        mqtt_qos_automatic=int(os.getenv("MQTT_QOS_AUTOMATIC", "0")),
+        mqtt_qos_bridge=int(os.getenv("MQTT_QOS_BRIDGE", "0")),
+        mqtt_queue_size=int(os.getenv("MQTT_QUEUE_SIZE", "1000")),
+        mqtt_max_inflight=int(os.getenv("MQTT_MAX_INFLIGHT", "20")),
+        mqtt_client_id=os.getenv("MQTT_CLIENT_ID") or None,
+        mqtt_reconnect_min=float(os.getenv("MQTT_RECONNECT_MIN", "1")),
+        mqtt_reconnect_max=float(os.getenv("MQTT_RECONNECT_MAX", "60")),
+        mqtt_v5=os.getenv("MQTT_V5", "").strip().lower() in ("1", "true", "yes", "on"),
+        mqtt_message_expiry=float(os.getenv("MQTT_MESSAGE_EXPIRY", "120")),
+        mqtt_topic_aliases=int(os.getenv("MQTT_TOPIC_ALIASES", "64")),
+        mqtt_displays=tuple(
+            prefix.strip() for prefix in os.getenv("MQTT_DISPLAYS", "").split(",") if prefix.strip()
+        ),
+        udp_dedupe_window=float(os.getenv("UDP_DEDUPE_WINDOW", "1")),
+        udp_dedupe_max_entries=int(os.getenv("UDP_DEDUPE_MAX_ENTRIES", "1024")),
+        udp_rcvbuf=int(os.getenv("UDP_RCVBUF", str(4 * 1024 * 1024))),
+        udp_sndbuf=int(os.getenv("UDP_SNDBUF", "0")),
     )
 
 
-def format_control_message(
-    control: ControlRow,
-    state_resolver: Optional[Callable[[str], Optional[str]]] = None,
-    *,
-    icon: Optional[str] = None,
-) -> str:
-    """Render an AWTRIX compatible payload for a control."""
-
-    values = []
-    if control.states:
-        resolved_values = []
-        fallback_values = []
-        # Loxone "error" states contain error flags, not display values.
-        _SKIP_STATE_KEYS = {"error"}
-        for _key, raw_value in control.states:
-            if _key in _SKIP_STATE_KEYS:
-                continue
-            resolved = state_resolver(raw_value) if state_resolver else None
-            if resolved:
-                resolved_values.append(str(resolved).strip())
-            elif raw_value:
-                fallback_values.append(str(raw_value).strip())
-
-        candidates = resolved_values or fallback_values
-        if candidates:
-            values.append(candidates[0])
-            if len(candidates) > 1:
-                values.extend(candidate for candidate in candidates[1:] if candidate)
-    elif control.details:
-        for key, value in control.details:
-            text = f"{key}: {value}".strip()
-            if text:
-                values.append(text)
-
-    if not values:
-        values.append("Keine Daten verfügbar")
-
-    label = control.name.strip()
-    value_text = " ".join(filter(None, values)).strip()
-
-    # Wenn ein Icon gesetzt ist, ersetzt es den Namen – nur den Wert anzeigen.
-    if icon and value_text:
-        text = value_text
-    elif label and value_text:
-        text = f"{label}: {value_text}".strip()
-    elif label:
-        text = label
-    else:
-        text = value_text or "Keine Daten verfügbar"
+_NUMBER_PATTERN = re.compile(r"[-+]?\d+(?:[.,]\d+)?")
 
-    payload: Dict[str, object] = {"text": text}
-    if icon:
-        try:
-            payload["icon"] = int(icon)
-        except (ValueError, TypeError):
-            payload["icon"] = icon
-    return json.dumps(payload, ensure_ascii=False)
+
+def parse_state_number(value: Optional[str]) -> Optional[float]:
+    """Return the leading number of a state value such as ``"21.5°C"``."""
+
+    if value is None:
+        return None
+    match = _NUMBER_PATTERN.match(str(value).strip())
+    if match is None:
+        return None
+    return float(match.group().replace(",", "."))
+
+
+class ChangeGate:
+    """Apply a :class:`ChangeFilter` to the raw state values of one control.
+
+    The gate remembers the values it last let through; :meth:`accept` returns
+    ``True`` only for changes that leave the deadband (and the hysteresis band
+    on a change of direction) once ``min_interval`` has passed.  Non-numeric
+    values pass on any change.
+    """
+
+    def __init__(self, change_filter: "ChangeFilter", key: object = None):
+        self.change_filter = change_filter
+        self.key = key
+        self._values: Optional[Tuple[Optional[str], ...]] = None
+        self._directions: Tuple[int, ...] = ()
+        self._published_at = float("-inf")
+
+    def accept(self, values: Tuple[Optional[str], ...], now: float) -> bool:
+        change_filter = self.change_filter
+        previous = self._values
+        if previous is not None:
+            if now - self._published_at < change_filter.min_interval or values == previous:
+                return False
+
+        directions = list(self._directions) or [0] * len(values)
+        significant = previous is None or len(previous) != len(values)
+        if not significant:
+            directions = directions[: len(values)] + [0] * (len(values) - len(directions))
+            for index, (new, old) in enumerate(zip(values, previous)):
+                new_number = parse_state_number(new)
+                old_number = parse_state_number(old)
+                if new_number is None or old_number is None:
+                    significant = significant or new != old
+                    continue
+                delta = new_number - old_number
+                if not delta:
+                    continue
+                direction = 1 if delta > 0 else -1
+                threshold = max(change_filter.absolute, change_filter.relative * abs(old_number))
+                if directions[index] and direction != directions[index]:
+                    threshold += change_filter.hysteresis
+                if abs(delta) > threshold:
+                    significant = True
+                    directions[index] = direction
+            if not significant:
+                return False
+
+        self._values = values
+        self._directions = tuple(directions)
+        self._published_at = now
+        return True
 
 
 def resolve_target_topic(base: str, uuid: str) -> str:
@@ -290,113 +792,624 @@ def resolve_notification_topic(base: str) -> str:
     return cleaned + "/notify"
 
 
+def _stream_first_resolver(
+    state_stream: "LoxoneStateStream", fallback: Callable[[str], Optional[str]]
+) -> Callable[[str], Optional[str]]:
+    """Prefer streamed values and ask ``fallback`` for unknown states."""
+
+    def resolve(candidate: str) -> Optional[str]:
+        value = state_stream.resolve_state_value(candidate)
+        if value is not None:
+            return value
+        return fallback(candidate)
+
+    return resolve
+
+
+def _batch_first_resolver(
+    values: Mapping[str, Optional[str]], fallback: Callable[[str], Optional[str]]
+) -> Callable[[str], Optional[str]]:
+    """Answer from the values of a ``resolve_many`` batch, ``fallback`` otherwise."""
+
+    def resolve(candidate: str) -> Optional[str]:
+        if candidate in values:
+            return values[candidate]
+        return fallback(candidate)
+
+    return resolve
+
+
+class PollScheduler:
+    """Priority queue of controls keyed by the time they are due next.
+
+    Rescheduling a control leaves its old heap entry behind; such stale
+    entries are recognised by their due time and skipped when popped.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}
+        self._counter = 0
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self._due
+
+    def schedule(self, uuid: str, due: float) -> None:
+        self._due[uuid] = due
+        self._counter += 1
+        heapq.heappush(self._heap, (due, self._counter, uuid))
+
+    def remove(self, uuid: str) -> None:
+        self._due.pop(uuid, None)
+
+    def pop_due(self, now: float) -> List[str]:
+        """Remove and return all controls due at ``now``, earliest first."""
+
+        due: List[str] = []
+        while self._heap and self._heap[0][0] <= now:
+            when, _counter, uuid = heapq.heappop(self._heap)
+            if self._due.get(uuid) == when:
+                del self._due[uuid]
+                due.append(uuid)
+        return due
+
+    def next_due(self) -> Optional[float]:
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+
+@dataclass
+class _AdaptiveState:
+    interval: float
+    values: Optional[Tuple[Optional[str], ...]] = None
+    changes: Deque[float] = field(default_factory=deque)
+
+
+class AdaptivePoller:
+    """Per-control poll intervals that follow how often a control changes.
+
+    After a change the interval drops to ``min_interval``; every poll that
+    returns the same values multiplies it by ``growth`` up to
+    ``max_interval``.  Thread-safe, so the web app can show :meth:`stats`
+    while the automatic mode updates it.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 1.0,
+        max_interval: float = 600.0,
+        growth: float = 2.0,
+        window: float = 3600.0,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.growth = growth
+        self.window = window
+        self._states: Dict[str, _AdaptiveState] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self, uuid: str, values: Tuple[Optional[str], ...], now: float, base_interval: float
+    ) -> float:
+        """Record the polled ``values`` and return the next poll interval."""
+
+        with self._lock:
+            state = self._states.get(uuid)
+            if state is None:
+                interval = min(self.max_interval, max(self.min_interval, base_interval))
+                state = self._states[uuid] = _AdaptiveState(interval=interval)
+            elif values != state.values:
+                state.changes.append(now)
+                state.interval = self.min_interval
+            else:
+                state.interval = min(self.max_interval, state.interval * self.growth)
+            state.values = values
+            while state.changes and state.changes[0] < now - self.window:
+                state.changes.popleft()
+            return state.interval
+
+    def forget(self, uuid: str) -> None:
+        with self._lock:
+            self._states.pop(uuid, None)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Current interval and changes per hour (over ``window``) per control."""
+
+        with self._lock:
+            return {
+                uuid: {
+                    "interval": state.interval,
+                    "changes_per_hour": len(state.changes) * 3600.0 / self.window,
+                }
+                for uuid, state in self._states.items()
+            }
+
+
+# Kürzeste Wartezeit nach einem Fehler im Automatikmodus (Sekunden).
+_AUTOMATIC_RETRY_MIN = 1.0
+
+
+@dataclass
+class _ClockState:
+    """What the automatic mode last published on one clock."""
+
+    topic: str
+    selection: object
+    enabled: Set[str] = field(default_factory=set)
+    previous_enabled: Set[str] = field(default_factory=set)
+    previous_messages: Dict[str, str] = field(default_factory=dict)
+    last_app_publish_at: Dict[str, float] = field(default_factory=dict)
+    # Letzte App-Nachricht je Control für den Abgleich nach einem Neuverbinden.
+    app_payloads: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    # Gruppe, in der die Seite eines Controls zuletzt veröffentlicht wurde.
+    page_groups: Dict[str, str] = field(default_factory=dict)
+    dirty_groups: Set[str] = field(default_factory=set)
+    group_published_at: Dict[str, float] = field(default_factory=dict)
+    regrouped: Set[str] = field(default_factory=set)
+
+    def forget(self, uuid: str) -> None:
+        if uuid in self.page_groups:
+            self.dirty_groups.add(self.page_groups.pop(uuid))
+        self.previous_messages.pop(uuid, None)
+        self.last_app_publish_at.pop(uuid, None)
+        self.app_payloads.pop(uuid, None)
+
+    def reset_disabled(self, connection: MqttConnection) -> None:
+        """Clear the controls disabled since the last cycle from the clock."""
+
+        for uuid in self.previous_enabled - self.enabled:
+            topic = resolve_target_topic(self.topic, uuid)
+            if uuid not in self.page_groups:
+                connection.publish(topic, "{}", key=uuid)
+            self.forget(uuid)
+            logger.info("Automatikmodus setzte Nachricht zurück – Topic: %s", topic)
+
+    def regroup(self, groups: Mapping[str, str]) -> Set[str]:
+        """Detach pages whose group changed and return the controls to re-publish."""
+
+        self.regrouped = set()
+        for uuid in self.enabled | self.page_groups.keys():
+            group = groups.get(uuid, "") if uuid in self.enabled else ""
+            if group and self.selection.get_mode(uuid) != "app":
+                group = ""
+            current = self.page_groups.get(uuid, "")
+            if group == current or (not current and uuid not in self.previous_messages):
+                continue
+            if current:
+                self.dirty_groups.add(self.page_groups.pop(uuid))
+            if uuid in self.enabled:
+                self.regrouped.add(uuid)
+        return self.regrouped
+
+    def publish_control(
+        self,
+        uuid: str,
+        icon: str,
+        render: Callable[[str], str],
+        *,
+        fresh: bool,
+        accepted: bool,
+        group: str,
+        refresh_interval: float,
+        now: float,
+        connection: MqttConnection,
+    ) -> Optional[float]:
+        """Publish the message of ``uuid`` on this clock if it is due.
+
+        ``render`` formats the current message for an icon and is only called
+        for ``accepted`` values.  Returns when an app mode message has to be
+        refreshed next (``None`` for notifications).
+        """
+
+        mode = self.selection.get_mode(uuid)
+        should_refresh = mode == "app" and (
+            now - self.last_app_publish_at.get(uuid, float("-inf"))
+        ) >= refresh_interval
+
+        if accepted:
+            message: Optional[str] = render(icon)
+        elif not fresh:
+            # Nur Auffrischung fällig: letzte Nachricht erneut senden.
+            message = (
+                self.previous_messages.get(uuid)
+                if should_refresh or uuid in self.regrouped
+                else None
+            )
+        else:
+            # Innerhalb des Totbands: weder formatieren noch senden,
+            # im App-Modus höchstens die letzte Nachricht auffrischen.
+            message = self.previous_messages.get(uuid) if should_refresh else None
+
+        refresh_due: Optional[float] = None
+        if mode == "app":
+            last_publish = (
+                now if message is not None else self.last_app_publish_at.get(uuid, now)
+            )
+            refresh_due = last_publish + refresh_interval
+
+        changed = self.previous_messages.get(uuid) != message or uuid in self.regrouped
+        if message is None or (not changed and not should_refresh):
+            return refresh_due
+
+        self.previous_messages[uuid] = message
+        if mode == "app":
+            self.last_app_publish_at[uuid] = now
+
+        if group and mode == "app":
+            self.page_groups[uuid] = group
+            if uuid in self.app_payloads:
+                # Bisher eigene App: auf der Uhr entfernen.
+                own_topic, _message = self.app_payloads.pop(uuid)
+                connection.publish(own_topic, "{}", key=uuid)
+            if changed or now - self.group_published_at.get(group, float("-inf")) >= refresh_interval:
+                self.dirty_groups.add(group)
+            return refresh_due
+
+        if mode == "notification":
+            topic = resolve_notification_topic(self.topic)
+        else:
+            topic = resolve_target_topic(self.topic, uuid)
+
+        if mode == "app":
+            self.app_payloads[uuid] = (topic, message)
+        else:
+            self.app_payloads.pop(uuid, None)
+        connection.publish(topic, message, key=uuid)
+        logger.info(
+            "Automatikmodus veröffentlichte Nachricht (%s) – Topic: %s, Nachricht: %s",
+            mode,
+            topic,
+            message,
+        )
+        return refresh_due
+
+    def publish_groups(
+        self, connection: MqttConnection, now: float, controls: Mapping[str, ControlRow]
+    ) -> None:
+        """Publish every group with changed pages as one multi-page app."""
+
+        for group in sorted(self.dirty_groups):
+            members = sorted(
+                (uuid for uuid, page_group in self.page_groups.items() if page_group == group),
+                key=lambda uuid: (
+                    controls[uuid].name.lower() if uuid in controls else "",
+                    uuid,
+                ),
+            )
+            pages = [self.previous_messages[uuid] for uuid in members if uuid in self.previous_messages]
+            topic = resolve_target_topic(self.topic, group)
+            key = f"group:{group}"
+            if pages:
+                # Die Seiten sind bereits fertiges JSON und werden nur verkettet.
+                message = "[" + ",".join(pages) + "]"
+                self.app_payloads[key] = (topic, message)
+            else:
+                message = "{}"
+                self.app_payloads.pop(key, None)
+            self.group_published_at[group] = now
+            connection.publish(topic, message, key=key)
+            logger.info(
+                "Automatikmodus veröffentlichte Gruppe %s (%d Seiten) – Topic: %s",
+                group,
+                len(pages),
+                topic,
+            )
+        self.dirty_groups.clear()
+
+
 def automatic_mode(
     config: Config,
     store: "AutoConfigStore",
     fetcher_factory: Callable[[], LoxoneDataFetcher],
     *,
     interval_override: Optional[float] = None,
+    state_stream: Optional["LoxoneStateStream"] = None,
+    adaptive: Optional[AdaptivePoller] = None,
+    connection: Optional[MqttConnection] = None,
 ) -> None:
-    """Publish selected control values to MQTT based on the stored configuration."""
+    """Publish selected control values to MQTT based on the stored configuration.
+
+    Every control is polled at its own interval (``ControlSchedule`` in the
+    store, falling back to the automatic interval); app mode messages are
+    re-sent after the control's refresh interval without asking the
+    Miniserver again.  The structure itself is reloaded once per automatic
+    interval.  With a ``state_stream`` the loop wakes up as soon as the
+    Miniserver pushes a changed state of an enabled control, re-renders only
+    the controls showing that state (other states come from the last HTTP
+    poll) and prefers the streamed values over HTTP lookups.  With ``config.adaptive_polling`` (or an ``adaptive``
+    poller) the poll intervals shrink after changes and grow while static.
+    App mode controls assigned to a group (``AutoConfigStore.set_group``) are
+    published together as one multi-page custom app named after the group,
+    re-sent only when one of its pages changed.  Without a shared
+    ``connection`` the loop opens its own broker connection.
+
+    Besides the default clock (``config.mqtt_topic``) every display profile
+    of the store (``AutoConfigStore.add_profile``, seeded from
+    ``config.mqtt_displays``) is served by the same loop: each control is
+    polled and resolved once, rendered once per icon and published to every
+    clock that has it enabled.
+    """
 
     app_refresh_interval_seconds = 60.0
-    client = create_mqtt_client(config)
-    client.loop_start()
+    interval = config.automatic_interval if interval_override is None else interval_override
+    if adaptive is None and config.adaptive_polling:
+        adaptive = AdaptivePoller(config.adaptive_min_interval, config.adaptive_max_interval)
+    for prefix in config.mqtt_displays:
+        store.add_profile(prefix)
+
+    def wait_for_next_cycle(timeout: float) -> None:
+        if state_stream is not None:
+            state_stream.wait_for_change(timeout)
+        else:
+            time.sleep(timeout)
+
+    own_connection = connection is None
+    if connection is None:
+        connection = create_mqtt_connection(config)
+    clocks: Dict[str, _ClockState] = {config.mqtt_topic: _ClockState(config.mqtt_topic, store)}
+
+    def resync_clocks() -> None:
+        # Nach einem Broker-Neustart nicht bis zur nächsten Wertänderung warten.
+        for clock in list(clocks.values()):
+            for uuid, (topic, message) in list(clock.app_payloads.items()):
+                connection.publish(topic, message, key=uuid)
+
+    connection.add_connect_listener(resync_clocks)
+    if own_connection:
+        connection.start()
     fetch_failures = 0
     previous_enabled: Set[str] = set()
-    previous_messages: Dict[str, str] = {}
-    last_app_publish_at: Dict[str, float] = {}
+    structure = StructureModel()
+    render_plans: Dict[str, RenderPlan] = {}
+    change_gates: Dict[str, ChangeGate] = {}
+    scheduler = PollScheduler()
+    next_poll_at: Dict[str, float] = {}
+    registered_endpoints: object = None
+    fetcher: Optional[LoxoneDataFetcher] = None
+    state_resolver: Callable[[str], Optional[str]] = lambda _candidate: None
+    next_structure_at = float("-inf")
+    # Zuletzt per HTTP gelesene Werte; dienen beim Neuformatieren nach
+    # gepushten Änderungen für die übrigen Zustände des Controls.
+    http_values: Dict[str, Optional[str]] = {}
+    watched_states: Set[str] = set()
+
     try:
         while True:
-            enabled = store.enabled_ids()
-            disabled = previous_enabled - enabled
-            if disabled:
-                for uuid in disabled:
-                    topic = resolve_target_topic(config.mqtt_topic, uuid)
-                    empty_payload = "{}"
-                    record_local_mqtt_message(empty_payload)
-                    client.publish(topic, empty_payload)
-                    previous_messages.pop(uuid, None)
-                    last_app_publish_at.pop(uuid, None)
-                    logger.info(
-                        "Automatikmodus setzte Nachricht zurück – Topic: %s", topic
-                    )
+            # Weitere Uhren können zur Laufzeit hinzukommen oder wegfallen.
+            selections = {config.mqtt_topic: store}
+            for prefix in store.profiles():
+                selections.setdefault(prefix, store.profile(prefix))
+            for prefix, selection in selections.items():
+                if prefix not in clocks:
+                    clocks[prefix] = _ClockState(prefix, selection)
+            for prefix, clock in clocks.items():
+                clock.selection = selections.get(prefix)
+                clock.enabled = set() if clock.selection is None else clock.selection.enabled_ids()
+            enabled = set().union(*(clock.enabled for clock in clocks.values()))
+            now = time.monotonic()
+
+            for clock in clocks.values():
+                clock.reset_disabled(connection)
+            for uuid in previous_enabled - enabled:
+                change_gates.pop(uuid, None)
+                scheduler.remove(uuid)
+                next_poll_at.pop(uuid, None)
+                if adaptive is not None:
+                    adaptive.forget(uuid)
+            for prefix in [prefix for prefix in clocks if prefix not in selections]:
+                # Entfernte Uhr: Gruppen leeren, danach vergessen.
+                clocks.pop(prefix).publish_groups(connection, now, structure.controls)
+
+            # Controls, deren Gruppe sich geändert hat, sofort neu zuordnen.
+            groups = store.groups_mapping()
+            for clock in clocks.values():
+                for uuid in clock.regroup(groups):
+                    scheduler.schedule(uuid, now)
 
             if not enabled:
                 previous_enabled = enabled
-                time.sleep(config.automatic_interval if interval_override is None else interval_override)
+                for clock in clocks.values():
+                    clock.previous_enabled = clock.enabled
+                    clock.publish_groups(connection, now, structure.controls)
+                if state_stream is not None and watched_states:
+                    watched_states = set()
+                    state_stream.watch(watched_states)
+                http_values.clear()
+                wait_for_next_cycle(interval)
                 continue
 
             try:
-                fetcher = fetcher_factory()
-                payload = fetcher.load()
-                controls = {
-                    row.uuid: row
-                    for row in LoxoneDataFetcher.extract_controls(payload)
-                }
-                store.sync_from(controls.keys())
+                if fetcher is None or now >= next_structure_at:
+                    fetcher = fetcher_factory()
+                    payload = fetcher.load()
+                    next_structure_at = now + interval
+                    # Nur die Änderungen gegenüber der vorigen Struktur verarbeiten.
+                    diff = structure.update(payload)
+                    for uuid in diff.removed + diff.changed:
+                        render_plans.pop(uuid, None)
+                    if diff.initial:
+                        render_plans.clear()
+                    if diff.complete:
+                        # Erst wenn jeder Miniserver geliefert hat, fehlende
+                        # Controls als gelöscht behandeln.
+                        store.sync_from(structure.controls.keys())
+                    elif diff.removed:
+                        store.forget(diff.removed)
+                    for uuid in diff.removed:
+                        for clock in clocks.values():
+                            clock.forget(uuid)
+                        change_gates.pop(uuid, None)
+                    if fetcher.endpoints is not registered_endpoints:
+                        fetcher.register_controls(structure.controls.values())
+                        registered_endpoints = fetcher.endpoints
+                    elif diff.changed:
+                        fetcher.register_controls(structure.controls[uuid] for uuid in diff.changed)
+                    state_resolver = fetcher.resolve_state_value
+                controls = structure.controls
+
+                # Welche Controls zeigt welcher Zustand? Nur diese Zustände
+                # wecken die Schleife, wenn der Miniserver Änderungen pusht.
+                state_owners: Dict[str, Set[str]] = {}
                 for uuid in enabled:
                     control = controls.get(uuid)
-                    if not control:
+                    if control is None:
                         continue
-                    icon = store.get_icon(uuid)
-                    message = format_control_message(
-                        control, fetcher.resolve_state_value, icon=icon or None,
-                    )
-                    mode = store.get_mode(uuid)
-                    now = time.monotonic()
+                    plan = render_plans.get(uuid)
+                    if plan is None:
+                        plan = render_plans[uuid] = compile_render_plan(control)
+                    for state_uuid in plan.state_uuids or ():
+                        if state_uuid:
+                            state_owners.setdefault(state_uuid, set()).add(uuid)
+                if state_stream is not None and state_owners.keys() != watched_states:
+                    watched_states = set(state_owners)
+                    state_stream.watch(watched_states)
+                for state_uuid in [s for s in http_values if s not in state_owners]:
+                    del http_values[state_uuid]
 
-                    should_skip_due_to_no_change = previous_messages.get(uuid) == message
-                    if mode == "app":
-                        should_refresh = (
-                            now - last_app_publish_at.get(uuid, float("-inf"))
-                        ) >= app_refresh_interval_seconds
-                        should_skip_due_to_no_change = should_skip_due_to_no_change and not should_refresh
-
-                    if should_skip_due_to_no_change:
+                for uuid in enabled:
+                    if uuid not in scheduler:
+                        scheduler.schedule(uuid, now)
+                due = [uuid for uuid in scheduler.pop_due(now) if uuid in enabled]
+                # Gepushte Änderungen: nur die betroffenen Controls neu formatieren.
+                streamed: Set[str] = set()
+                if state_stream is not None:
+                    for state_uuid in state_stream.take_changes():
+                        streamed.update(state_owners.get(state_uuid, ()))
+                    due += sorted(streamed.difference(due))
+
+                # Alle fälligen Zustände zuerst gebündelt und parallel
+                # auflösen; die Formatierung liest danach nur noch den Cache.
+                plans: Dict[str, RenderPlan] = {}
+                polled: Set[str] = set()
+                for uuid in due:
+                    control = controls.get(uuid)
+                    if control is None:
                         continue
-
-                    previous_messages[uuid] = message
-                    if mode == "app":
-                        last_app_publish_at[uuid] = now
-
-                    if mode == "notification":
-                        topic = resolve_notification_topic(config.mqtt_topic)
-                    else:
-                        topic = resolve_target_topic(config.mqtt_topic, uuid)
-
-                    record_local_mqtt_message(message)
-                    client.publish(topic, message)
-                    logger.info(
-                        "Automatikmodus veröffentlichte Nachricht (%s) – Topic: %s, Nachricht: %s",
-                        mode,
-                        topic,
-                        message,
+                    plan = render_plans.get(uuid)
+                    if plan is None:
+                        plan = render_plans[uuid] = compile_render_plan(control)
+                    plans[uuid] = plan
+                    if now >= next_poll_at.get(uuid, now):
+                        polled.add(uuid)
+
+                pending_states = [
+                    state_uuid
+                    for uuid in polled
+                    for state_uuid in plans[uuid].state_uuids or ()
+                    if state_uuid
+                    and (
+                        state_stream is None
+                        or state_stream.resolve_state_value(state_uuid) is None
                     )
+                ]
+                if pending_states:
+                    # Mit den Werten des Stapels formatieren: bei vielen Zuständen
+                    # und Ratenlimit wären die ersten im Cache schon abgelaufen.
+                    http_values.update(fetcher.resolve_many(pending_states))
+                resolver = _batch_first_resolver(http_values, state_resolver)
+                if state_stream is not None:
+                    resolver = _stream_first_resolver(state_stream, resolver)
+                # Gepushte Änderungen ohne fälligen Abruf: ohne HTTP neu formatieren.
+                fresh = polled | streamed.intersection(plans)
+                for uuid in due:
+                    schedule = store.get_schedule(uuid)
+                    poll_interval = schedule.poll_interval or interval
+                    refresh_interval = schedule.refresh_interval or app_refresh_interval_seconds
+                    plan = plans.get(uuid)
+                    if plan is None:
+                        scheduler.schedule(uuid, now + poll_interval)
+                        continue
+
+                    subscribers = [clock for clock in clocks.values() if uuid in clock.enabled]
+                    icons = [clock.selection.get_icon(uuid) for clock in subscribers]
+                    change_filter = store.get_filter(uuid) if uuid in fresh else None
+                    values: Tuple[Optional[str], ...] = ()
+                    if uuid in fresh and (change_filter or adaptive is not None):
+                        values = tuple(
+                            resolver(state_uuid) for state_uuid in plan.state_uuids or ()
+                        )
+                        if adaptive is not None:
+                            poll_interval = adaptive.observe(uuid, values, now, poll_interval)
+
+                    # Einmal je Control entscheiden und je Symbol formatieren,
+                    # unabhängig davon, wie viele Uhren es anzeigen.
+                    accepted = uuid in fresh
+                    if accepted and change_filter and plan.state_uuids is not None:
+                        gate_key = (change_filter, tuple(icons))
+                        gate = change_gates.get(uuid)
+                        if gate is None or gate.key != gate_key:
+                            gate = change_gates[uuid] = ChangeGate(change_filter, key=gate_key)
+                        accepted = gate.accept(values, now)
+                    rendered: Dict[str, str] = {}
+
+                    if uuid in polled:
+                        next_poll_at[uuid] = now + poll_interval
+                    next_due = next_poll_at[uuid]
+
+                    def render(icon: str, plan: RenderPlan = plan) -> str:
+                        message = rendered.get(icon)
+                        if message is None:
+                            message = rendered[icon] = render_plan_message(
+                                plan, resolver, icon=icon or None
+                            )
+                        return message
+
+                    for clock, icon in zip(subscribers, icons):
+                        refresh_due = clock.publish_control(
+                            uuid,
+                            icon,
+                            render,
+                            fresh=uuid in fresh,
+                            accepted=accepted,
+                            group=groups.get(uuid, ""),
+                            refresh_interval=refresh_interval,
+                            now=now,
+                            connection=connection,
+                        )
+                        if refresh_due is not None:
+                            next_due = min(next_due, refresh_due)
+                    scheduler.schedule(uuid, next_due)
+                for clock in clocks.values():
+                    clock.publish_groups(connection, now, structure.controls)
+                    clock.previous_enabled = clock.enabled
                 fetch_failures = 0
                 previous_enabled = enabled
-            except Exception as exc:  # pragma: no cover - defensive logging only
+            except Exception as exc:
                 fetch_failures += 1
-                print(f"Automatikmodus Fehler ({fetch_failures}): {exc}")
+                # Bei einem Ausfall nicht im Kreis fragen: Wartezeit verdoppeln,
+                # höchstens ein Automatik-Intervall, mindestens eine Sekunde.
+                retry_in = max(
+                    _AUTOMATIC_RETRY_MIN,
+                    min(interval, _AUTOMATIC_RETRY_MIN * 2 ** (fetch_failures - 1)),
+                )
+                print(
+                    f"Automatikmodus Fehler ({fetch_failures}): {exc} – "
+                    f"neuer Versuch in {retry_in:.0f} s"
+                )
+                # Struktur beim nächsten Versuch neu laden.
+                fetcher = None
+                time.sleep(retry_in)
+                continue
 
-            time.sleep(config.automatic_interval if interval_override is None else interval_override)
+            # Bis zum nächsten fälligen Control warten, spätestens nach einem
+            # Automatik-Intervall (neu aktivierte Controls, Strukturabgleich).
+            wake_at = min(next_structure_at, scheduler.next_due() or next_structure_at)
+            wait_for_next_cycle(max(0.0, min(interval, wake_at - now)))
     finally:
-        client.loop_stop()
-        client.disconnect()
+        connection.remove_connect_listener(resync_clocks)
+        if own_connection:
+            connection.stop()
 
 
 def main(argv=None) -> None:
     config = parse_args(argv)
-    publisher_client = create_mqtt_client(config)
-    publisher_client.loop_start()
+    connection = create_mqtt_connection(config)
+    mqtt_to_udp(config, connection)
+    connection.start()
 
-    mqtt_thread = threading.Thread(target=mqtt_to_udp, args=(config,))
-    mqtt_thread.start()
-
-    udp_thread = threading.Thread(target=udp_to_mqtt, args=(publisher_client, config))
+    udp_thread = threading.Thread(target=udp_to_mqtt, args=(connection, config))
     udp_thread.start()
-
-    mqtt_thread.join()
     udp_thread.join()
 
 
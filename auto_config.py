@@ -3,119 +3,430 @@ from __future__ import annotations
 
 import json
 import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Dict, Iterable, Set
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set
 
 
 VALID_MODES = ("app", "notification")
 
+# Gruppennamen werden Teil des MQTT-Topics und dürfen keine Wildcards enthalten.
+_INVALID_GROUP_CHARACTERS = frozenset("/+#")
+# Anzeige-Präfixe sind Topics und dürfen ebenfalls keine Wildcards enthalten.
+_INVALID_PROFILE_CHARACTERS = frozenset("+#")
 
-class AutoConfigStore:
-    """Store the enabled state and display mode of controls for the automatic mode."""
 
-    def __init__(self, path: Path):
-        self.path = path
-        self._lock = threading.Lock()
+@dataclass(frozen=True)
+class ChangeFilter:
+    """Numeric change filter applied to a control's state values.
+
+    ``absolute`` and ``relative`` (fraction of the last published value) form
+    the deadband a value has to leave before it is published again.  A change
+    that reverses the direction of the previous one additionally has to exceed
+    ``hysteresis``.  ``min_interval`` limits publishing to once per that many
+    seconds.
+    """
+
+    absolute: float = 0.0
+    relative: float = 0.0
+    hysteresis: float = 0.0
+    min_interval: float = 0.0
+
+    def __post_init__(self) -> None:
+        for name, value in asdict(self).items():
+            if value < 0:
+                raise ValueError(f"Ungültiger Filterwert für {name}: {value}")
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any]) -> "ChangeFilter":
+        return cls(**{key: float(raw.get(key) or 0.0) for key in cls.__dataclass_fields__})
+
+    def as_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+    def __bool__(self) -> bool:
+        return any(asdict(self).values())
+
+
+@dataclass(frozen=True)
+class ControlSchedule:
+    """Per-control timing for the automatic mode.
+
+    ``poll_interval`` is how often the control's states are requested,
+    ``refresh_interval`` how often an unchanged app message is re-sent.  ``0``
+    keeps the global defaults (automatic interval and 60 seconds).
+    """
+
+    poll_interval: float = 0.0
+    refresh_interval: float = 0.0
+
+    def __post_init__(self) -> None:
+        for name, value in asdict(self).items():
+            if value < 0:
+                raise ValueError(f"Ungültiges Intervall für {name}: {value}")
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any]) -> "ControlSchedule":
+        return cls(**{key: float(raw.get(key) or 0.0) for key in cls.__dataclass_fields__})
+
+    def as_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+    def __bool__(self) -> bool:
+        return any(asdict(self).values())
+
+
+_DEFAULT_SCHEDULE = ControlSchedule()
+
+
+class DisplayProfile:
+    """Enabled state, display mode and icon of controls on one clock.
+
+    A profile is addressed by the clock's topic prefix (e.g.
+    ``kueche/custom``).  Filters, schedules and groups are shared by all
+    clocks, because the values are fetched once for all of them.
+    """
+
+    def __init__(self, store: "AutoConfigStore", prefix: str):
+        self.store = store
+        self.prefix = prefix
         self._enabled: Dict[str, bool] = {}
         self._modes: Dict[str, str] = {}
         self._icons: Dict[str, str] = {}
-        self._load()
-
-    def _load(self) -> None:
-        if not self.path.exists():
-            return
-
-        try:
-            raw = json.loads(self.path.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            # Wenn die Datei beschädigt ist, ignorieren wir sie und starten frisch.
-            return
 
-        enabled = raw.get("enabled") if isinstance(raw, dict) else None
+    def _load(self, raw: Mapping[str, Any]) -> None:
+        enabled = raw.get("enabled")
         if isinstance(enabled, dict):
             # Sicherstellen, dass nur boolesche Werte gespeichert werden.
-            cleaned = {str(key): bool(value) for key, value in enabled.items()}
-            self._enabled.update(cleaned)
+            self._enabled.update({str(key): bool(value) for key, value in enabled.items()})
 
-        modes = raw.get("modes") if isinstance(raw, dict) else None
+        modes = raw.get("modes")
         if isinstance(modes, dict):
-            cleaned = {
-                str(key): str(value)
-                for key, value in modes.items()
-                if str(value) in VALID_MODES
-            }
-            self._modes.update(cleaned)
-
-        icons = raw.get("icons") if isinstance(raw, dict) else None
+            self._modes.update(
+                {str(key): str(value) for key, value in modes.items() if str(value) in VALID_MODES}
+            )
+
+        icons = raw.get("icons")
         if isinstance(icons, dict):
             self._icons.update({str(k): str(v) for k, v in icons.items()})
 
-    def _save(self) -> None:
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        payload = {"enabled": self._enabled, "modes": self._modes, "icons": self._icons}
-        self.path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+    def _as_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {"enabled": self._enabled, "modes": self._modes, "icons": self._icons}
 
     def as_mapping(self) -> Dict[str, bool]:
-        with self._lock:
+        with self.store.locked():
             return dict(self._enabled)
 
     def set_enabled(self, uuid: str, enabled: bool) -> None:
-        with self._lock:
+        with self.store.updating():
             self._enabled[str(uuid)] = bool(enabled)
-            self._save()
 
     def is_enabled(self, uuid: str) -> bool:
-        with self._lock:
+        with self.store.locked():
             return bool(self._enabled.get(str(uuid)))
 
     def enabled_ids(self) -> Set[str]:
-        with self._lock:
+        with self.store.locked():
             return {uuid for uuid, enabled in self._enabled.items() if enabled}
 
     def get_mode(self, uuid: str) -> str:
-        with self._lock:
+        with self.store.locked():
             return self._modes.get(str(uuid), "app")
 
     def set_mode(self, uuid: str, mode: str) -> None:
         if mode not in VALID_MODES:
             raise ValueError(f"Ungültiger Modus: {mode}")
-        with self._lock:
+        with self.store.updating():
             self._modes[str(uuid)] = mode
-            self._save()
 
     def modes_mapping(self) -> Dict[str, str]:
-        with self._lock:
+        with self.store.locked():
             return dict(self._modes)
 
     def get_icon(self, uuid: str) -> str:
-        with self._lock:
+        with self.store.locked():
             return self._icons.get(str(uuid), "")
 
     def set_icon(self, uuid: str, icon: str) -> None:
-        with self._lock:
+        with self.store.updating():
             if icon:
                 self._icons[str(uuid)] = str(icon)
             else:
                 self._icons.pop(str(uuid), None)
+
+    def icons_mapping(self) -> Dict[str, str]:
+        with self.store.locked():
+            return dict(self._icons)
+
+    def _known(self) -> Set[str]:
+        return set(self._enabled) | set(self._modes) | set(self._icons)
+
+    def _forget(self, uuids: Set[str]) -> bool:
+        changed = False
+        for mapping in (self._enabled, self._modes, self._icons):
+            for key in uuids & mapping.keys():
+                mapping.pop(key, None)
+                changed = True
+        return changed
+
+
+class AutoConfigStore:
+    """Store the enabled state and display mode of controls for the automatic mode.
+
+    The store itself holds the selection of the default clock
+    (``MQTT_TOPIC``); further clocks get their own :class:`DisplayProfile`
+    via :meth:`add_profile`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._default = DisplayProfile(self, "")
+        self._profiles: Dict[str, DisplayProfile] = {}
+        self._filters: Dict[str, ChangeFilter] = {}
+        self._schedules: Dict[str, ControlSchedule] = {}
+        self._groups: Dict[str, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            # Wenn die Datei beschädigt ist, ignorieren wir sie und starten frisch.
+            return
+
+        if not isinstance(raw, dict):
+            return
+
+        self._default._load(raw)
+
+        profiles = raw.get("profiles")
+        if isinstance(profiles, dict):
+            for prefix, value in profiles.items():
+                try:
+                    prefix = _validate_profile(prefix)
+                except ValueError:
+                    continue
+                profile = self._profiles[prefix] = DisplayProfile(self, prefix)
+                if isinstance(value, dict):
+                    profile._load(value)
+
+        filters = raw.get("filters")
+        if isinstance(filters, dict):
+            for key, value in filters.items():
+                try:
+                    change_filter = ChangeFilter.from_dict(value)
+                except (AttributeError, TypeError, ValueError):
+                    continue
+                if change_filter:
+                    self._filters[str(key)] = change_filter
+
+        schedules = raw.get("schedules")
+        if isinstance(schedules, dict):
+            for key, value in schedules.items():
+                try:
+                    schedule = ControlSchedule.from_dict(value)
+                except (AttributeError, TypeError, ValueError):
+                    continue
+                if schedule:
+                    self._schedules[str(key)] = schedule
+
+        groups = raw.get("groups")
+        if isinstance(groups, dict):
+            for key, value in groups.items():
+                try:
+                    self._groups[str(key)] = _validate_group(value)
+                except ValueError:
+                    continue
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the store lock while reading a profile."""
+
+        with self._lock:
+            yield
+
+    @contextmanager
+    def updating(self) -> Iterator[None]:
+        """Hold the store lock and persist the store once the block succeeded."""
+
+        with self._lock:
+            yield
             self._save()
 
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            **self._default._as_dict(),
+            "profiles": {prefix: profile._as_dict() for prefix, profile in self._profiles.items()},
+            "filters": {key: value.as_dict() for key, value in self._filters.items()},
+            "schedules": {key: value.as_dict() for key, value in self._schedules.items()},
+            "groups": self._groups,
+        }
+        self.path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+
+    def as_mapping(self) -> Dict[str, bool]:
+        return self._default.as_mapping()
+
+    def set_enabled(self, uuid: str, enabled: bool) -> None:
+        self._default.set_enabled(uuid, enabled)
+
+    def is_enabled(self, uuid: str) -> bool:
+        return self._default.is_enabled(uuid)
+
+    def enabled_ids(self) -> Set[str]:
+        return self._default.enabled_ids()
+
+    def get_mode(self, uuid: str) -> str:
+        return self._default.get_mode(uuid)
+
+    def set_mode(self, uuid: str, mode: str) -> None:
+        self._default.set_mode(uuid, mode)
+
+    def modes_mapping(self) -> Dict[str, str]:
+        return self._default.modes_mapping()
+
+    def get_icon(self, uuid: str) -> str:
+        return self._default.get_icon(uuid)
+
+    def set_icon(self, uuid: str, icon: str) -> None:
+        self._default.set_icon(uuid, icon)
+
     def icons_mapping(self) -> Dict[str, str]:
+        return self._default.icons_mapping()
+
+    def profiles(self) -> List[str]:
+        """Topic prefixes of the additional clocks."""
+
         with self._lock:
-            return dict(self._icons)
+            return sorted(self._profiles)
+
+    def profile(self, prefix: str) -> DisplayProfile:
+        """Selection of the clock ``prefix``; raises ``KeyError`` for unknown clocks."""
+
+        with self._lock:
+            return self._profiles[prefix]
+
+    def add_profile(self, prefix: str) -> DisplayProfile:
+        """Register a clock by its topic prefix; existing profiles are kept."""
+
+        prefix = _validate_profile(prefix)
+        with self._lock:
+            profile = self._profiles.get(prefix)
+            if profile is None:
+                profile = self._profiles[prefix] = DisplayProfile(self, prefix)
+                self._save()
+            return profile
+
+    def remove_profile(self, prefix: str) -> None:
+        with self._lock:
+            if self._profiles.pop(prefix, None) is not None:
+                self._save()
+
+    def get_filter(self, uuid: str) -> Optional[ChangeFilter]:
+        with self._lock:
+            return self._filters.get(str(uuid))
+
+    def set_filter(self, uuid: str, change_filter: Optional[ChangeFilter]) -> None:
+        """Set the change filter of a control; an empty filter removes it."""
+
+        with self._lock:
+            if change_filter:
+                self._filters[str(uuid)] = change_filter
+            else:
+                self._filters.pop(str(uuid), None)
+            self._save()
+
+    def filters_mapping(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {key: value.as_dict() for key, value in self._filters.items()}
+
+    def get_schedule(self, uuid: str) -> ControlSchedule:
+        with self._lock:
+            return self._schedules.get(str(uuid), _DEFAULT_SCHEDULE)
+
+    def set_schedule(self, uuid: str, schedule: ControlSchedule) -> None:
+        """Set poll and refresh interval of a control; all zero restores the defaults."""
+
+        with self._lock:
+            if schedule:
+                self._schedules[str(uuid)] = schedule
+            else:
+                self._schedules.pop(str(uuid), None)
+            self._save()
+
+    def schedules_mapping(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {key: value.as_dict() for key, value in self._schedules.items()}
+
+    def get_group(self, uuid: str) -> str:
+        with self._lock:
+            return self._groups.get(str(uuid), "")
+
+    def set_group(self, uuid: str, group: str) -> None:
+        """Show the control as a page of the multi-page app ``group``; ``""`` ungroups it."""
+
+        group = _validate_group(group) if group and group.strip() else ""
+        with self._lock:
+            if group:
+                self._groups[str(uuid)] = group
+            else:
+                self._groups.pop(str(uuid), None)
+            self._save()
+
+    def groups_mapping(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._groups)
 
     def sync_from(self, uuids: Iterable[str]) -> None:
         """Ensure that only known UUIDs are present in the configuration."""
 
         with self._lock:
             known = set(str(uuid) for uuid in uuids)
-            stale_enabled = set(self._enabled) - known
-            stale_modes = set(self._modes) - known
-            stale_icons = set(self._icons) - known
-            if stale_enabled or stale_modes or stale_icons:
-                for key in stale_enabled:
-                    self._enabled.pop(key, None)
-                for key in stale_modes:
-                    self._modes.pop(key, None)
-                for key in stale_icons:
-                    self._icons.pop(key, None)
-                self._save()
+            stale = (
+                self._default._known()
+                | set().union(*(profile._known() for profile in self._profiles.values()))
+                | set(self._filters)
+                | set(self._schedules)
+                | set(self._groups)
+            ) - known
+            self._forget(stale)
+
+    def forget(self, uuids: Iterable[str]) -> None:
+        """Remove the given UUIDs, e.g. controls deleted from the structure."""
+
+        with self._lock:
+            self._forget({str(uuid) for uuid in uuids})
+
+    def _forget(self, uuids: Set[str]) -> None:
+        changed = False
+        for profile in (self._default, *self._profiles.values()):
+            changed = profile._forget(uuids) or changed
+        for mapping in (
+            self._filters,
+            self._schedules,
+            self._groups,
+        ):
+            for key in uuids & mapping.keys():
+                mapping.pop(key, None)
+                changed = True
+        if changed:
+            self._save()
+
+
+def _validate_group(group: Any) -> str:
+    name = str(group).strip()
+    if not name or _INVALID_GROUP_CHARACTERS & set(name):
+        raise ValueError(f"Ungültiger Gruppenname: {group}")
+    return name
+
+
+def _validate_profile(prefix: Any) -> str:
+    name = str(prefix).strip().rstrip("/")
+    if not name or _INVALID_PROFILE_CHARACTERS & set(name):
+        raise ValueError(f"Ungültiges Anzeige-Präfix: {prefix}")
+    return name
@@ -0,0 +1,115 @@
+"""AWTRIX payloads for Loxone controls, compiled once and rendered per cycle."""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from json.encoder import encode_basestring
+from typing import Callable, List, Optional, Tuple
+
+from loxone_data import ControlRow
+
+
+# Loxone "error" states contain error flags, not display values.
+SKIP_STATE_KEYS = frozenset({"error"})
+
+
+_NO_DATA = "Keine Daten verfügbar"
+_TEXT_PREFIX = '{"text": '
+
+
+def display_state_uuids(control: ControlRow) -> List[str]:
+    """Return the state UUIDs ``format_control_message`` will resolve."""
+
+    return [value for value in compile_render_plan(control).state_uuids if value]
+
+
+@dataclass(frozen=True)
+class RenderPlan:
+    """Everything about a control's message that does not change per cycle.
+
+    ``state_uuids`` is ``None`` for controls without states; their text is
+    fully known up front and stored in ``static_text``.
+    """
+
+    label: str
+    state_uuids: Optional[Tuple[str, ...]]
+    fallback_values: Tuple[str, ...] = ()
+    static_text: str = ""
+
+
+def compile_render_plan(control: ControlRow) -> RenderPlan:
+    """Precompute the parts of :func:`format_control_message` for ``control``."""
+
+    label = control.name.strip()
+    if control.states:
+        entries = [raw for key, raw in control.states if key not in SKIP_STATE_KEYS]
+        return RenderPlan(
+            label=label,
+            state_uuids=tuple(entries),
+            fallback_values=tuple(str(raw).strip() for raw in entries if raw),
+        )
+
+    texts = [f"{key}: {value}".strip() for key, value in control.details]
+    static_text = " ".join(text for text in texts if text)
+    return RenderPlan(label=label, state_uuids=None, static_text=static_text or _NO_DATA)
+
+
+@lru_cache(maxsize=256)
+def _payload_suffix(icon: Optional[str]) -> str:
+    """Return the pre-encoded JSON tail following the text value."""
+
+    if not icon:
+        return "}"
+    try:
+        value: object = int(icon)
+    except (ValueError, TypeError):
+        value = icon
+    return ", " + json.dumps({"icon": value}, ensure_ascii=False)[1:]
+
+
+def render_plan_message(
+    plan: RenderPlan,
+    state_resolver: Optional[Callable[[str], Optional[str]]] = None,
+    *,
+    icon: Optional[str] = None,
+) -> str:
+    """Substitute the current state values into a compiled :class:`RenderPlan`."""
+
+    if plan.state_uuids is None:
+        value_text = plan.static_text
+    else:
+        candidates: List[str] = []
+        if state_resolver is not None:
+            for state_uuid in plan.state_uuids:
+                resolved = state_resolver(state_uuid)
+                if resolved:
+                    candidates.append(str(resolved).strip())
+        candidates = candidates or list(plan.fallback_values)
+        value_text = " ".join(filter(None, candidates)) if candidates else _NO_DATA
+
+    label = plan.label
+    # Wenn ein Icon gesetzt ist, ersetzt es den Namen – nur den Wert anzeigen.
+    if icon and value_text:
+        text = value_text
+    elif label and value_text:
+        text = f"{label}: {value_text}"
+    elif label:
+        text = label
+    else:
+        text = value_text or _NO_DATA
+
+    # Entspricht json.dumps({"text": ..., "icon": ...}, ensure_ascii=False),
+    # ohne dafür jedes Mal ein Dict aufzubauen und komplett zu serialisieren.
+    return _TEXT_PREFIX + encode_basestring(text) + _payload_suffix(icon)
+
+
+def format_control_message(
+    control: ControlRow,
+    state_resolver: Optional[Callable[[str], Optional[str]]] = None,
+    *,
+    icon: Optional[str] = None,
+) -> str:
+    """Render an AWTRIX compatible payload for a control."""
+
+    return render_plan_message(compile_render_plan(control), state_resolver, icon=icon)
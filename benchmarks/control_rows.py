@@ -0,0 +1,97 @@
+"""Memory benchmark for ControlRow lists built from synthetic LoxAPP3.json data.
+
+Run with ``python benchmarks/control_rows.py``.  The "legacy" column rebuilds
+the previous representation (regular dataclass, eagerly stringified details,
+no interning) for comparison.
+"""
+from __future__ import annotations
+
+import gc
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from loxone_data import _build_rows, _flatten_mapping  # noqa: E402
+
+SIZES = (1_000, 10_000, 50_000)
+TYPES = ("Switch", "Dimmer", "InfoOnlyAnalog", "Jalousie", "TimedSwitch", "IRoomControllerV2")
+
+
+@dataclass
+class LegacyControlRow:
+    uuid: str
+    name: str
+    type: str
+    room: str
+    category: str
+    details: Sequence[Tuple[str, str]]
+    states: Sequence[Tuple[str, str]]
+    links: Sequence[str]
+
+
+def _legacy_rows(data: Dict[str, Any]) -> List[LegacyControlRow]:
+    rooms = {key: str(value["name"]) for key, value in data["rooms"].items()}
+    cats = {key: str(value["name"]) for key, value in data["cats"].items()}
+    return [
+        LegacyControlRow(
+            uuid=uuid,
+            name=str(control.get("name", "")),
+            type=str(control.get("type", "")),
+            room=rooms.get(control.get("room"), ""),
+            category=cats.get(control.get("cat"), ""),
+            details=_flatten_mapping(control.get("details")),
+            states=_flatten_mapping(control.get("states")),
+            links=tuple(str(link) for link in control.get("links", []) if link),
+        )
+        for uuid, control in data["controls"].items()
+    ]
+
+
+def synthetic_structure(count: int) -> Dict[str, Any]:
+    rooms = {f"room-{index}": {"name": f"Raum {index}"} for index in range(40)}
+    cats = {f"cat-{index}": {"name": f"Kategorie {index}"} for index in range(12)}
+    controls = {}
+    for index in range(count):
+        controls[f"0f8a1b2c-{index:04x}-4567-89abcdef0123{index % 10000:04x}"] = {
+            "name": f"Control {index}",
+            "type": TYPES[index % len(TYPES)],
+            "room": f"room-{index % 40}",
+            "cat": f"cat-{index % 12}",
+            "details": {"format": "%.1f°C", "min": 0, "max": 100, "step": 0.5},
+            "states": {
+                "value": f"1a2b3c4d-{index:04x}-0002-0003000400050006",
+                "error": f"1a2b3c4d-{index:04x}-0002-0003000400050007",
+            },
+            "links": [f"2b3c4d5e-{index:04x}-0002-0003000400050006"],
+        }
+    # Über JSON laufen lassen, damit die Strings wie beim echten Laden entstehen.
+    return json.loads(json.dumps({"rooms": rooms, "cats": cats, "controls": controls}))
+
+
+def measure(build: Callable[[Dict[str, Any]], List[Any]], data: Dict[str, Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    rows = build(data)
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return current
+
+
+def main() -> None:
+    print(f"{'Controls':>9} {'legacy':>12} {'compact':>12} {'Ersparnis':>10}")
+    for size in SIZES:
+        data = synthetic_structure(size)
+        legacy = measure(_legacy_rows, data)
+        compact = measure(_build_rows, data)
+        saving = 100.0 * (legacy - compact) / legacy
+        print(f"{size:>9} {legacy / 1024:>10.0f}KB {compact / 1024:>10.0f}KB {saving:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Compare the per-cycle cost of rendering AWTRIX payloads.
+
+Run with ``python benchmarks/render_plans.py``.  "legacy" is the former
+``format_control_message`` that rebuilt and serialised a dict on every call,
+"plan" renders a :class:`RenderPlan` compiled once per control.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from awtrix_messages import SKIP_STATE_KEYS, compile_render_plan, render_plan_message  # noqa: E402
+from loxone_data import ControlRow  # noqa: E402
+
+CONTROLS = 200
+REPEAT = 50
+
+
+def legacy_format(
+    control: ControlRow,
+    state_resolver: Optional[Callable[[str], Optional[str]]] = None,
+    *,
+    icon: Optional[str] = None,
+) -> str:
+    values = []
+    if control.states:
+        resolved_values = []
+        fallback_values = []
+        for key, raw_value in control.states:
+            if key in SKIP_STATE_KEYS:
+                continue
+            resolved = state_resolver(raw_value) if state_resolver else None
+            if resolved:
+                resolved_values.append(str(resolved).strip())
+            elif raw_value:
+                fallback_values.append(str(raw_value).strip())
+        candidates = resolved_values or fallback_values
+        if candidates:
+            values.append(candidates[0])
+            values.extend(candidate for candidate in candidates[1:] if candidate)
+    if not values:
+        values.append("Keine Daten verfügbar")
+    label = control.name.strip()
+    value_text = " ".join(filter(None, values)).strip()
+    if icon and value_text:
+        text = value_text
+    elif label and value_text:
+        text = f"{label}: {value_text}".strip()
+    else:
+        text = label or value_text
+    payload: Dict[str, object] = {"text": text}
+    if icon:
+        try:
+            payload["icon"] = int(icon)
+        except (ValueError, TypeError):
+            payload["icon"] = icon
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def main() -> None:
+    controls = [
+        ControlRow(
+            uuid=f"uuid-{index}",
+            name=f"Temperatur {index}",
+            type="InfoOnlyAnalog",
+            room="",
+            category="",
+            details=(),
+            states=(("error", f"err-{index}"), ("value", f"val-{index}")),
+            links=(),
+        )
+        for index in range(CONTROLS)
+    ]
+    values = {f"val-{index}": f"{20 + index % 10}.5°C" for index in range(CONTROLS)}
+    icons = [str(2000 + index) if index % 2 else "" for index in range(CONTROLS)]
+    plans = [compile_render_plan(control) for control in controls]
+
+    for control, plan, icon in zip(controls, plans, icons):
+        assert legacy_format(control, values.get, icon=icon) == render_plan_message(
+            plan, values.get, icon=icon
+        )
+
+    legacy = timeit.timeit(
+        lambda: [legacy_format(c, values.get, icon=i) for c, i in zip(controls, icons)],
+        number=REPEAT,
+    )
+    planned = timeit.timeit(
+        lambda: [render_plan_message(p, values.get, icon=i) for p, i in zip(plans, icons)],
+        number=REPEAT,
+    )
+    per_call = 1e6 / (CONTROLS * REPEAT)
+    print(f"legacy: {legacy * per_call:.2f} µs/Control")
+    print(f"plan:   {planned * per_call:.2f} µs/Control ({legacy / planned:.1f}x schneller)")
+
+
+if __name__ == "__main__":
+    main()
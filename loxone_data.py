@@ -1,15 +1,43 @@
 """Utilities for loading and presenting data from a Loxone Miniserver."""
 from __future__ import annotations
 
+import contextvars
+import heapq
+import io
 import json
+import logging
 import os
+import random
 import re
-from dataclasses import dataclass
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from urllib.parse import urlparse, urlunparse
 
 
+logger = logging.getLogger(__name__)
+
+
 @dataclass
 class LoxoneDataSource:
     """Configuration describing where the JSON payload can be loaded from."""
@@ -19,6 +47,17 @@ class LoxoneDataSource:
     password: Optional[str] = None
     json_path: Optional[Path] = None
     state_url_template: Optional[str] = None
+    websocket_url: Optional[str] = None
+    version_url: Optional[str] = None
+    cache_path: Optional[Path] = None
+    pool_size: int = 4
+    max_retries: int = 2
+    keep_alive: bool = True
+    state_ttl: float = 5.0
+    state_cache_size: int = 4096
+    stream_parse: bool = False
+    rate_limit: float = 0.0
+    rate_burst: int = 20
 
     @property
     def auth(self) -> Optional[Tuple[str, str]]:
@@ -28,6 +67,19 @@ class LoxoneDataSource:
             return (self.username or "", self.password or "")
         return None
 
+    def for_host(self, hostname: str) -> "LoxoneDataSource":
+        """Return a copy of this source that points at another Miniserver."""
+
+        base = f"http://{hostname}"
+        return replace(
+            self,
+            url=f"{base}/data/LoxAPP3.json",
+            json_path=None,
+            state_url_template=f"{base}/jdev/sps/io/{{uuid}}/state",
+            version_url=f"{base}/jdev/sps/LoxAPPversion3",
+            websocket_url=f"ws://{hostname}/ws/rfc6455" if self.websocket_url else None,
+        )
+
     @staticmethod
     def _resolve_hostname() -> Optional[str]:
         for key in (
@@ -49,6 +101,19 @@ class LoxoneDataSource:
             LOXONE_USERNAME:   Optional username for HTTP basic authentication.
             LOXONE_PASSWORD:   Optional password for HTTP basic authentication.
             LOXONE_JSON_PATH:  Optional fallback path to a local JSON file.
+            LOXONE_WEBSOCKET:  Enable the WebSocket value stream (``1``/``true``).
+            LOXONE_WEBSOCKET_URL: Optional explicit ``ws://`` URL of the stream.
+            LOXONE_VERSION_URL: Optional URL of the structure version endpoint.
+            LOXONE_CACHE_PATH: Optional file for the persistent structure cache.
+            LOXONE_POOL_SIZE:  Connections kept open to the Miniserver (default 4).
+            LOXONE_RETRIES:    Retries for connection errors and 502/503/504.
+            LOXONE_KEEP_ALIVE: ``0`` disables HTTP keep-alive.
+            LOXONE_STATE_TTL:  Maximum age in seconds of cached state values.
+            LOXONE_STATE_CACHE_SIZE: Maximum number of cached state values.
+            LOXONE_STREAM_PARSE: ``1`` parses LoxAPP3.json incrementally.
+            LOXONE_RATE_LIMIT: Requests per second to the Miniserver (``0``, the
+                default, turns the limiter off).
+            LOXONE_RATE_BURST: Requests allowed in a burst above the rate.
         """
 
         hostname = cls._resolve_hostname()
@@ -60,15 +125,31 @@ class LoxoneDataSource:
         if not url and hostname:
             url = f"http://{hostname}/data/LoxAPP3.json"
 
+        base: Optional[str] = None
+        if hostname:
+            base = f"http://{hostname}"
+        elif url:
+            parsed = urlparse(url)
+            if parsed.scheme and parsed.netloc:
+                base = urlunparse((parsed.scheme, parsed.netloc, "", "", "", ""))
+
         template = os.getenv("LOXONE_STATE_URL_TEMPLATE") or None
-        if not template:
-            if hostname:
-                template = f"http://{hostname}/jdev/sps/io/{{uuid}}/state"
-            elif url:
-                parsed = urlparse(url)
-                if parsed.scheme and parsed.netloc:
-                    base = urlunparse((parsed.scheme, parsed.netloc, "", "", "", ""))
-                    template = f"{base}/jdev/sps/io/{{uuid}}/state"
+        if not template and base:
+            template = f"{base}/jdev/sps/io/{{uuid}}/state"
+
+        cache_value = os.getenv("LOXONE_CACHE_PATH") or None
+
+        version_url = os.getenv("LOXONE_VERSION_URL") or None
+        if not version_url and base:
+            version_url = f"{base}/jdev/sps/LoxAPPversion3"
+
+        websocket_url = os.getenv("LOXONE_WEBSOCKET_URL") or None
+        if not websocket_url and _is_truthy(os.getenv("LOXONE_WEBSOCKET")):
+            netloc = hostname
+            if not netloc and url:
+                netloc = urlparse(url).netloc or None
+            if netloc:
+                websocket_url = f"ws://{netloc}/ws/rfc6455"
 
         return cls(
             url=url,
@@ -76,49 +157,498 @@ class LoxoneDataSource:
             password=os.getenv("LOXONE_PASSWORD") or None,
             json_path=json_path,
             state_url_template=template,
+            websocket_url=websocket_url,
+            version_url=version_url,
+            cache_path=Path(cache_value) if cache_value else None,
+            pool_size=int(os.getenv("LOXONE_POOL_SIZE", "4")),
+            max_retries=int(os.getenv("LOXONE_RETRIES", "2")),
+            keep_alive=os.getenv("LOXONE_KEEP_ALIVE", "1").strip().lower()
+            not in ("0", "false", "no", "off"),
+            state_ttl=float(os.getenv("LOXONE_STATE_TTL", "5")),
+            state_cache_size=int(os.getenv("LOXONE_STATE_CACHE_SIZE", "4096")),
+            stream_parse=_is_truthy(os.getenv("LOXONE_STREAM_PARSE")),
+            rate_limit=float(os.getenv("LOXONE_RATE_LIMIT", "0")),
+            rate_burst=int(os.getenv("LOXONE_RATE_BURST", "20")),
         )
 
 
-@dataclass
 class ControlRow:
-    """Flattened representation of a single control entry."""
+    """Flattened representation of a single control entry.
+
+    Rows are slotted and share their type, room and category strings with
+    every other row.  ``details`` may be handed over as the raw mapping from
+    LoxAPP3.json; it is flattened into display pairs on first access only.
+    """
+
+    __slots__ = ("uuid", "name", "type", "room", "category", "_details", "states", "links")
+
+    def __init__(
+        self,
+        uuid: str,
+        name: str,
+        type: str,
+        room: str,
+        category: str,
+        details: Union[Sequence[Tuple[str, str]], Mapping[str, Any]],
+        states: Sequence[Tuple[str, str]],
+        links: Sequence[str],
+    ) -> None:
+        self.uuid = uuid
+        self.name = name
+        self.type = type
+        self.room = room
+        self.category = category
+        self._details = details
+        self.states = states
+        self.links = links
+
+    @property
+    def details(self) -> Sequence[Tuple[str, str]]:
+        details = self._details
+        if isinstance(details, Mapping):
+            details = self._details = _flatten_mapping(details)
+        return details
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        if (
+            self.uuid != other.uuid
+            or self.name != other.name
+            or self.type != other.type
+            or self.room != other.room
+            or self.category != other.category
+            or tuple(self.states) != tuple(other.states)
+            or tuple(self.links) != tuple(other.links)
+        ):
+            return False
+        if isinstance(self._details, Mapping) and isinstance(other._details, Mapping):
+            # Rohdaten vergleichen, ohne die Details in Text umzuwandeln.
+            return self._details == other._details
+        return tuple(self.details) == tuple(other.details)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"ControlRow(uuid={self.uuid!r}, name={self.name!r}, type={self.type!r}, "
+            f"room={self.room!r}, category={self.category!r}, details={self.details!r}, "
+            f"states={self.states!r}, links={self.links!r})"
+        )
+
+
+_MISSING = object()
+
+
+class StateCache:
+    """Thread-safe LRU cache for resolved state values with a maximum age.
+
+    One instance can be shared by several fetchers (web app and automatic
+    mode) so they reuse each other's lookups without serving values older
+    than ``ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 5.0,
+        max_entries: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self._clock() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def get_stale(self, key: str, default: Any = None) -> Any:
+        """Return the last stored value regardless of its age.
+
+        Expired entries stay in the cache until they are evicted, so during a
+        Miniserver outage the last known values remain available.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else default
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and self._clock() - entry[0] <= self.ttl
+
+    def put(self, key: str, value: Optional[str]) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of contacting a Miniserver that is known to be down."""
+
+
+class StateEndpointError(RuntimeError):
+    """The Miniserver answered, but no endpoint variant returned a state."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for Miniserver requests.
+
+    After ``failure_threshold`` consecutive connection failures the circuit
+    opens and every request fails immediately.  Once the (jittered,
+    exponentially growing) backoff elapsed a single trial request is let
+    through; its outcome closes the circuit again or reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        base_backoff: float = 2.0,
+        max_backoff: float = 120.0,
+        clock: Callable[[], float] = time.monotonic,
+        jitter: Callable[[], float] = lambda: random.uniform(0.5, 1.0),
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._jitter = jitter
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._openings = 0
+        self._open_until = 0.0
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() >= self._open_until:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self) -> None:
+        """Raise :class:`CircuitOpenError` if the request must not be sent."""
+
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and self._clock() >= self._open_until:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError("Miniserver nicht erreichbar (Circuit offen)")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._openings = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            trial_failed = self._state == self.HALF_OPEN
+            self._trial_running = False
+            if trial_failed or self._failures >= self.failure_threshold:
+                self._openings += 1
+                delay = min(self.base_backoff * 2 ** (self._openings - 1), self.max_backoff)
+                self._open_until = self._clock() + delay * self._jitter()
+                self._state = self.OPEN
+
+
+def _is_outage(exc: BaseException) -> bool:
+    """Whether ``exc`` means the Miniserver did not answer at all."""
+
+    # HTTP-Fehler tragen die Antwort des Servers, Verbindungsfehler nicht.
+    return isinstance(exc, CircuitOpenError) or getattr(exc, "response", None) is None
+
+
+PRIORITY_AUTOMATIC = 0
+PRIORITY_UI = 1
+PRIORITY_DEBUG = 2
+_PRIORITY_NAMES = {PRIORITY_AUTOMATIC: "automatic", PRIORITY_UI: "ui", PRIORITY_DEBUG: "debug"}
+
+_request_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "loxone_request_priority", default=PRIORITY_AUTOMATIC
+)
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Send all Miniserver requests made in this block with ``priority``."""
+
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a request waited too long for a rate limiter token."""
+
+
+class RateLimiter:
+    """Token bucket shared by all requests to one Miniserver.
+
+    ``rate`` tokens per second refill the bucket up to ``burst``.  Waiting
+    requests are served strictly by priority (lower value first, FIFO within
+    a class); a request that cannot get a token within the ``max_wait`` of
+    its class is dropped with :class:`RateLimitExceeded`.
+    """
+
+    DEFAULT_MAX_WAIT = {PRIORITY_AUTOMATIC: 30.0, PRIORITY_UI: 10.0, PRIORITY_DEBUG: 2.0}
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_wait: Optional[Dict[int, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_wait = dict(self.DEFAULT_MAX_WAIT if max_wait is None else max_wait)
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._waiting: List[Tuple[int, int]] = []
+        self._sequence = 0
+        self.granted = 0
+        self.queued = 0
+        self.dropped: Dict[str, int] = {name: 0 for name in _PRIORITY_NAMES.values()}
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: int = PRIORITY_AUTOMATIC) -> None:
+        with self._condition:
+            now = self._clock()
+            self._refill(now)
+            if not self._waiting and self._tokens >= 1:
+                self._tokens -= 1
+                self.granted += 1
+                return
+
+            self._sequence += 1
+            entry = (priority, self._sequence)
+            heapq.heappush(self._waiting, entry)
+            self.queued += 1
+            deadline = now + self.max_wait.get(priority, 0.0)
+            try:
+                while True:
+                    self._refill(now)
+                    if self._waiting[0] == entry and self._tokens >= 1:
+                        self._tokens -= 1
+                        self.granted += 1
+                        return
+                    if now >= deadline:
+                        name = _PRIORITY_NAMES.get(priority, str(priority))
+                        self.dropped[name] = self.dropped.get(name, 0) + 1
+                        raise RateLimitExceeded(
+                            "Miniserver-Anfragelimit erreicht, Anfrage verworfen"
+                        )
+                    next_token = max(0.0, (1 - self._tokens) / self.rate)
+                    self._condition.wait(min(deadline - now, next_token or 0.05))
+                    now = self._clock()
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "waiting": len(self._waiting),
+                "granted": self.granted,
+                "queued": self.queued,
+                "dropped": dict(self.dropped),
+            }
+
+
+class StateEndpointMemory:
+    """Remember which state endpoint variant answers for a UUID.
+
+    Not every control type supports ``/jdev/sps/io/<uuid>/state``.  Once a
+    variant worked for a UUID it is tried first for that UUID and for all
+    other states of the same control type; every ``reprobe_every`` lookups
+    the default order is probed again.  UUIDs for which every variant fails
+    are blocked with exponential backoff.  Per-UUID entries (preferred
+    variant, use counter, failures) are kept for the ``max_entries`` most
+    recently used UUIDs.
+    """
+
+    def __init__(
+        self,
+        reprobe_every: int = 50,
+        failure_backoff: float = 30.0,
+        max_failure_backoff: float = 900.0,
+        max_entries: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.reprobe_every = reprobe_every
+        self.failure_backoff = failure_backoff
+        self.max_failure_backoff = max_failure_backoff
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._types: Dict[str, str] = {}
+        self._by_uuid: "OrderedDict[str, int]" = OrderedDict()
+        self._by_type: Dict[str, int] = {}
+        self._uses: "OrderedDict[str, int]" = OrderedDict()
+        self._failures: "OrderedDict[str, Tuple[int, float, str]]" = OrderedDict()
+
+    def register_controls(self, rows: Iterable[ControlRow]) -> None:
+        """Learn the control type behind every state UUID."""
+
+        with self._lock:
+            for row in rows:
+                for _key, state_uuid in row.states:
+                    if state_uuid:
+                        self._types[state_uuid] = row.type
+
+    def order(self, uuid: str, count: int) -> List[int]:
+        """Return the indices of the endpoint variants in the order to try."""
+
+        default = list(range(count))
+        with self._lock:
+            preferred = self._by_uuid.get(uuid)
+            if preferred is not None:
+                self._by_uuid.move_to_end(uuid)
+            else:
+                preferred = self._by_type.get(self._types.get(uuid, ""))
+            if preferred is None or preferred >= count:
+                return default
+            uses = self._uses[uuid] = self._uses.get(uuid, 0) + 1
+            self._remember(self._uses, uuid)
+        if self.reprobe_every and uses % self.reprobe_every == 0:
+            return default
+        return [preferred] + [index for index in default if index != preferred]
+
+    def _remember(self, entries: "OrderedDict[str, Any]", uuid: str) -> None:
+        # Wie StateCache: zuletzt genutzte UUIDs behalten, älteste verdrängen.
+        entries.move_to_end(uuid)
+        while len(entries) > self.max_entries:
+            evicted, _value = entries.popitem(last=False)
+            if entries is self._by_uuid:
+                # Ohne bekannten Endpunkt ist auch der Fehlerzähler hinfällig.
+                self._failures.pop(evicted, None)
+
+    def blocked_message(self, uuid: str) -> Optional[str]:
+        """Return the last error while ``uuid`` is backing off, else ``None``."""
+
+        with self._lock:
+            failure = self._failures.get(uuid)
+        if failure is not None and self._clock() < failure[1]:
+            return failure[2]
+        return None
+
+    def record_success(self, uuid: str, variant: int) -> None:
+        with self._lock:
+            self._by_uuid[uuid] = variant
+            self._remember(self._by_uuid, uuid)
+            control_type = self._types.get(uuid)
+            if control_type:
+                self._by_type[control_type] = variant
+            self._failures.pop(uuid, None)
 
-    uuid: str
-    name: str
-    type: str
-    room: str
-    category: str
-    details: Sequence[Tuple[str, str]]
-    states: Sequence[Tuple[str, str]]
-    links: Sequence[str]
+    def record_failure(self, uuid: str, message: str) -> None:
+        with self._lock:
+            count = self._failures.get(uuid, (0, 0.0, ""))[0] + 1
+            delay = min(self.failure_backoff * 2 ** (count - 1), self.max_failure_backoff)
+            self._failures[uuid] = (count, self._clock() + delay, message)
+            self._remember(self._failures, uuid)
 
 
 class LoxoneDataFetcher:
     """Load and normalise data returned by the Loxone Miniserver."""
 
-    def __init__(self, source: LoxoneDataSource, timeout: float = 10.0):
+    def __init__(
+        self,
+        source: LoxoneDataSource,
+        timeout: float = 10.0,
+        state_cache: Optional[StateCache] = None,
+        endpoints: Optional[StateEndpointMemory] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
         self.source = source
         self.timeout = timeout
-        self._state_cache: Dict[str, Optional[str]] = {}
+        if state_cache is None:
+            state_cache = StateCache(source.state_ttl, source.state_cache_size)
+        self.state_cache = state_cache
+        self.endpoints = endpoints if endpoints is not None else StateEndpointMemory()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._revalidation: Optional[threading.Thread] = None
 
     def load(self) -> Dict[str, Any]:
-        """Load JSON data either from the configured URL or the local file."""
+        """Load JSON data either from the configured URL or the local file.
+
+        With a ``cache_path`` the first load after a restart is answered from
+        the on-disk cache while the Miniserver is revalidated in the background.
+        """
 
         if self.source.url:
+            if _structure_cache_get(self.source.url) is None and self.source.cache_path:
+                entry = _read_disk_cache(
+                    self.source.cache_path, self.source.url, self.source.stream_parse
+                )
+                if entry is not None:
+                    _structure_cache_put(self.source.url, entry)
+                    self._revalidation = threading.Thread(
+                        target=self._revalidate, daemon=True
+                    )
+                    self._revalidation.start()
+                    return entry.payload
             try:
-                import requests  # type: ignore
-            except ModuleNotFoundError as exc:  # pragma: no cover - optional dependency
-                raise RuntimeError(
-                    "Zum Abrufen per HTTP wird das 'requests'-Paket benötigt."
-                ) from exc
-
-            response = requests.get(
-                self.source.url,
-                auth=self.source.auth,
-                timeout=self.timeout,
-            )
-            response.raise_for_status()
-            return response.json()
+                return self._load_remote()
+            except Exception as exc:
+                # Während eines Ausfalls die letzte gute Struktur ausliefern.
+                cached = _structure_cache_get(self.source.url)
+                if cached is None or not _is_outage(exc):
+                    raise
+                logger.warning("Miniserver nicht erreichbar, nutze Struktur-Cache: %s", exc)
+                return cached.payload
 
         if not self.source.json_path:
             raise FileNotFoundError("No local JSON path configured and no URL provided")
@@ -128,58 +658,197 @@ class LoxoneDataFetcher:
             path = (Path(__file__).resolve().parent / path).resolve()
 
         with path.open(encoding="utf-8") as handle:
+            if self.source.stream_parse:
+                return self._parse_streaming(handle, str(path))
             return json.load(handle)
 
-    def resolve_state_value(self, candidate: str) -> Optional[str]:
-        """Resolve a state UUID to its current value using the Miniserver API."""
+    def _parse_streaming(self, handle: Any, key: str, version: Optional[str] = None) -> Dict[str, Any]:
+        """Parse ``handle`` incrementally and cache the rows under ``key``.
 
-        if not candidate or not isinstance(candidate, str):
-            return None
+        The slim payload only carries the sections the application reads; the
+        rows are handed to :meth:`extract_controls` through the structure cache.
+        """
 
-        if candidate in self._state_cache:
-            return self._state_cache[candidate]
+        from loxone_structure import parse_structure
 
-        template = self.source.state_url_template
-        if not template or not _UUID_PATTERN.fullmatch(candidate):
-            self._state_cache[candidate] = None
+        entry = _parsed_entry(parse_structure(handle), version)
+        _structure_cache_put(key, entry)
+        return entry.payload
+
+    def _load_remote(self) -> Dict[str, Any]:
+        try:
+            import requests  # type: ignore
+        except ModuleNotFoundError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError(
+                "Zum Abrufen per HTTP wird das 'requests'-Paket benötigt."
+            ) from exc
+
+        url = self.source.url or ""
+        version = self._fetch_structure_version(requests)
+        if version is not None:
+            cached = _structure_cache_get(url)
+            if cached is not None and cached.version == version:
+                return cached.payload
+
+        if self.source.stream_parse:
+            response = self._http_get(requests, url, stream=True)
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with io.TextIOWrapper(response.raw, encoding="utf-8") as handle:
+                if not self.source.cache_path:
+                    return self._parse_streaming(handle, url, version)
+                # Der Text wird beim Parsen mitgeschrieben, die schlanke
+                # Nutzlast allein reicht für den Datei-Cache nicht.
+                with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+                    payload = self._parse_streaming(_TeeReader(handle, spool), url, version)
+                    spool.seek(0)
+                    _write_disk_cache(
+                        self.source.cache_path,
+                        url,
+                        _structure_cache_get(url).version,
+                        lambda target: shutil.copyfileobj(spool, target),
+                    )
+            return payload
+
+        response = self._http_get(requests, url)
+        response.raise_for_status()
+        payload = response.json()
+        version = version or _payload_version(payload)
+        if version:
+            _structure_cache_put(url, _CachedStructure(version, payload))
+            if self.source.cache_path:
+                _write_disk_cache(
+                    self.source.cache_path,
+                    url,
+                    version,
+                    lambda target: json.dump(payload, target, ensure_ascii=False),
+                )
+        return payload
+
+    def _http_get(self, requests: Any, url: str, **kwargs: Any) -> Any:
+        """GET ``url`` through the shared session, guarded by limiter and breaker."""
+
+        limiter = shared_rate_limiter(self.source)
+        if limiter is not None:
+            limiter.acquire(_request_priority.get())
+        self.breaker.before_call()
+        try:
+            response = shared_session(requests, self.source).get(
+                url,
+                auth=self.source.auth,
+                timeout=self.timeout,
+                **kwargs,
+            )
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return response
+
+    def _revalidate(self) -> None:
+        try:
+            self._load_remote()
+        except Exception as exc:
+            logger.warning("Revalidierung der Loxone-Struktur fehlgeschlagen: %s", exc)
+
+    def _fetch_structure_version(self, requests: Any) -> Optional[str]:
+        """Ask the Miniserver for the ``lastModified`` stamp of LoxAPP3.json.
+
+        The response is tiny compared to the structure file, so every load
+        starts with it and only downloads the full file when it changed.
+        """
+
+        if not self.source.version_url:
             return None
+        try:
+            response = self._http_get(requests, self.source.version_url)
+            response.raise_for_status()
+            extracted = _extract_state_payload(response.json())
+        except Exception:
+            return None
+        if extracted is None or isinstance(extracted, (dict, list)):
+            return None
+        return str(extracted)
+
+    def register_controls(self, rows: Iterable[ControlRow]) -> None:
+        """Tell the endpoint memory which control type owns each state UUID."""
+
+        self.endpoints.register_controls(rows)
 
+    def _state_urls(self, candidate: str) -> List[str]:
+        template = self.source.state_url_template or ""
         url = template.format(uuid=candidate)
 
         # Build a list of URLs to try.  If the configured template ends with
         # ``/state`` we additionally try the variant without that suffix
         # because not all Loxone control types respond to the ``/state``
         # endpoint (e.g. TimedSwitch).
-        urls_to_try = [url]
+        urls = [url]
         if url.endswith("/state"):
-            urls_to_try.append(url[: -len("/state")])
+            urls.append(url[: -len("/state")])
+        return urls
 
-        try:
-            import requests as _requests  # type: ignore
-        except ModuleNotFoundError as exc:
-            message = f"Fehler bei Statusabfrage ({url}): {exc}"
-            self._state_cache[candidate] = message
-            return message
+    def _get_state_response(self, candidate: str, requests: Any) -> Any:
+        """Request ``candidate`` from the learned endpoint variants in order."""
 
+        urls = self._state_urls(candidate)
         last_exc: Optional[Exception] = None
-        response = None
-        for try_url in urls_to_try:
+        for index in self.endpoints.order(candidate, len(urls)):
+            # Verbindungsfehler brechen sofort ab, HTTP-Fehler probieren die
+            # nächste Endpunkt-Variante.
+            response = self._http_get(requests, urls[index])
             try:
-                response = _requests.get(
-                    try_url,
-                    auth=self.source.auth,
-                    timeout=self.timeout,
-                )
                 response.raise_for_status()
-                last_exc = None
-                break
             except Exception as exc:
                 last_exc = exc
-                response = None
+                continue
+            self.endpoints.record_success(candidate, index)
+            return response
+        raise StateEndpointError(str(last_exc or "Kein Status-Endpunkt verfügbar"))
+
+    def resolve_state_value(self, candidate: str) -> Optional[str]:
+        """Resolve a state UUID to its current value using the Miniserver API."""
+
+        if not candidate or not isinstance(candidate, str):
+            return None
+
+        cached = self.state_cache.get(candidate, _MISSING)
+        if cached is not _MISSING:
+            return cached
+
+        template = self.source.state_url_template
+        if not template or not _UUID_PATTERN.fullmatch(candidate):
+            self.state_cache.put(candidate, None)
+            return None
+
+        url = template.format(uuid=candidate)
+        blocked = self.endpoints.blocked_message(candidate)
+        if blocked is not None:
+            self.state_cache.put(candidate, blocked)
+            return blocked
 
-        if last_exc is not None or response is None:
-            message = f"Fehler bei Statusabfrage ({url}): {last_exc}"
-            self._state_cache[candidate] = message
+        try:
+            import requests as _requests  # type: ignore
+        except ModuleNotFoundError as exc:
+            message = f"Fehler bei Statusabfrage ({url}): {exc}"
+            self.state_cache.put(candidate, message)
+            return message
+
+        try:
+            response = self._get_state_response(candidate, _requests)
+        except RateLimitExceeded as exc:
+            # Verworfene Anfragen nicht cachen, sonst sähe die Automatik den Fehler.
+            stale = self.state_cache.get_stale(candidate)
+            return stale if stale is not None else f"Fehler bei Statusabfrage ({url}): {exc}"
+        except Exception as exc:
+            message = f"Fehler bei Statusabfrage ({url}): {exc}"
+            if isinstance(exc, StateEndpointError):
+                self.endpoints.record_failure(candidate, message)
+            else:
+                stale = self.state_cache.get_stale(candidate)
+                if stale is not None:
+                    return stale
+            self.state_cache.put(candidate, message)
             return message
 
         try:
@@ -195,9 +864,39 @@ class LoxoneDataFetcher:
             extracted = json.dumps(extracted, ensure_ascii=False)
 
         resolved = str(extracted)
-        self._state_cache[candidate] = resolved
+        self.state_cache.put(candidate, resolved)
         return resolved
 
+    def resolve_many(self, candidates: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Resolve several state UUIDs concurrently and return their values.
+
+        At most ``source.pool_size`` requests run in parallel so the batch
+        never needs more connections than the shared pool keeps open.  The
+        returned values come straight from the batch: with a rate limit a
+        large batch can take longer than the state cache TTL, so callers
+        should render from this result instead of asking
+        ``resolve_state_value`` again (which may have to refetch).
+        """
+
+        unique = list(dict.fromkeys(candidate for candidate in candidates if candidate))
+        pending = [candidate for candidate in unique if candidate not in self.state_cache]
+        fetched: Dict[str, Optional[str]] = {}
+        if len(pending) > 1:
+            workers = max(1, min(self.source.pool_size, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Je Aufgabe eine Kontextkopie, damit die Anfrage-Priorität im Worker gilt.
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self.resolve_state_value, candidate)
+                    for candidate in pending
+                ]
+                fetched = {candidate: future.result() for candidate, future in zip(pending, futures)}
+        elif pending:
+            fetched[pending[0]] = self.resolve_state_value(pending[0])
+        return {
+            candidate: fetched[candidate] if candidate in fetched else self.resolve_state_value(candidate)
+            for candidate in unique
+        }
+
     def resolve_state_raw(self, candidate: str) -> Optional[str]:
         """Return the raw JSON response for a state UUID (for debug display)."""
 
@@ -208,67 +907,317 @@ class LoxoneDataFetcher:
         if not template or not _UUID_PATTERN.fullmatch(candidate):
             return None
 
-        url = template.format(uuid=candidate)
-        urls_to_try = [url]
-        if url.endswith("/state"):
-            urls_to_try.append(url[: -len("/state")])
-
         try:
             import requests as _requests  # type: ignore
         except ModuleNotFoundError:
             return None
 
-        for try_url in urls_to_try:
-            try:
-                response = _requests.get(
-                    try_url,
-                    auth=self.source.auth,
-                    timeout=self.timeout,
-                )
-                response.raise_for_status()
-                try:
-                    data = response.json()
-                    return json.dumps(data, ensure_ascii=False, indent=2)
-                except ValueError:
-                    return response.text.strip()
-            except Exception:
-                continue
-
-        return None
+        try:
+            response = self._get_state_response(candidate, _requests)
+        except Exception:
+            return None
+        try:
+            data = response.json()
+            return json.dumps(data, ensure_ascii=False, indent=2)
+        except ValueError:
+            return response.text.strip()
 
     @staticmethod
     def extract_controls(data: Dict[str, Any]) -> List[ControlRow]:
-        """Transform the controls payload into table friendly rows."""
+        """Transform the controls payload into table friendly rows.
+
+        Rows of a payload served from the structure cache are built only once.
+        """
 
+        cached = _structure_cache_find(data)
+        if cached is not None and cached.controls is not None:
+            return list(cached.controls)
+
+        rows = _build_rows(data, cached)
+        if cached is not None:
+            cached.controls = tuple(rows)
+        return rows
+
+
+def _control_row(
+    uuid: str,
+    control: Dict[str, Any],
+    room_lookup: Dict[str, str],
+    category_lookup: Dict[str, str],
+) -> ControlRow:
+    details = control.get("details")
+    return ControlRow(
+        uuid=uuid,
+        name=str(control.get("name", "")),
+        type=sys.intern(str(control.get("type", ""))),
+        room=room_lookup.get(control.get("room"), ""),
+        category=category_lookup.get(control.get("cat"), ""),
+        # Details werden erst bei Bedarf (Tabelle/Formatierung) in Text umgewandelt.
+        details=details if isinstance(details, Mapping) and details else (),
+        states=_flatten_mapping(control.get("states"), intern_keys=True),
+        links=tuple(str(link) for link in control.get("links", []) if link),
+    )
+
+
+def _build_rows(data: Dict[str, Any], cached: Optional["_CachedStructure"] = None) -> List[ControlRow]:
+    if cached is not None and cached.rooms is not None and cached.categories is not None:
+        room_lookup, category_lookup = cached.rooms, cached.categories
+    else:
         rooms = data.get("rooms", {})
         categories = data.get("cats", {})
         room_lookup = _build_lookup(rooms, default_label="Raum unbekannt")
         category_lookup = _build_lookup(categories, default_label="Kategorie unbekannt")
+        if cached is not None:
+            cached.rooms, cached.categories = room_lookup, category_lookup
 
-        controls = data.get("controls", {})
-        rows: List[ControlRow] = []
-        for uuid, control in controls.items():
-            row = ControlRow(
-                uuid=uuid,
-                name=str(control.get("name", "")),
-                type=str(control.get("type", "")),
-                room=room_lookup.get(control.get("room"), ""),
-                category=category_lookup.get(control.get("cat"), ""),
-                details=_flatten_mapping(control.get("details")),
-                states=_flatten_mapping(control.get("states")),
-                links=tuple(str(link) for link in control.get("links", []) if link),
-            )
-            rows.append(row)
+    controls = data.get("controls", {})
+    rows = [
+        _control_row(uuid, control, room_lookup, category_lookup)
+        for uuid, control in controls.items()
+    ]
 
-        rows.sort(key=lambda item: (item.room.lower(), item.name.lower(), item.uuid))
-        return rows
+    rows.sort(key=lambda item: (item.room.lower(), item.name.lower(), item.uuid))
+    return rows
+
+
+# Verbindungspools überleben einzelne Fetcher-Instanzen; der Automatikmodus
+# erzeugt pro Durchlauf einen neuen Fetcher über ``fetcher_factory``.
+_sessions: Dict[Tuple[Any, int, int, bool], Any] = {}
+_sessions_lock = threading.Lock()
+
+
+def shared_session(requests: Any, source: LoxoneDataSource) -> Any:
+    """Return the process wide ``requests.Session`` for the pool settings.
+
+    Sessions are thread-safe for concurrent ``get`` calls and keep their TCP
+    connections alive, so each state lookup costs a single round trip.
+    """
+
+    key = (requests, source.pool_size, source.max_retries, source.keep_alive)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _create_session(requests, source)
+            _sessions[key] = session
+        return session
+
+
+def close_shared_sessions() -> None:
+    """Close and forget all pooled sessions (hauptsächlich für Tests)."""
+
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+# Ein Token-Bucket pro Miniserver, gemeinsam für Automatik, UI und Debug.
+_rate_limiters: Dict[Tuple[str, float, int], RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def shared_rate_limiter(source: LoxoneDataSource) -> Optional[RateLimiter]:
+    """Return the process wide rate limiter of the source's Miniserver."""
+
+    if source.rate_limit <= 0:
+        return None
+    host = urlparse(source.url or source.state_url_template or "").netloc
+    key = (host, source.rate_limit, source.rate_burst)
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = _rate_limiters[key] = RateLimiter(source.rate_limit, source.rate_burst)
+        return limiter
+
+
+def rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    with _rate_limiters_lock:
+        limiters = dict(_rate_limiters)
+    return {host or "default": limiter.stats() for (host, _rate, _burst), limiter in limiters.items()}
+
+
+def clear_rate_limiters() -> None:
+    """Forget all rate limiters (hauptsächlich für Tests)."""
+
+    with _rate_limiters_lock:
+        _rate_limiters.clear()
+
+
+def _create_session(requests: Any, source: LoxoneDataSource) -> Any:
+    adapters = requests.adapters
+    retry = adapters.Retry(
+        total=source.max_retries,
+        read=0,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = adapters.HTTPAdapter(
+        pool_connections=source.pool_size,
+        pool_maxsize=source.pool_size,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not source.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+@dataclass
+class _CachedStructure:
+    """Parsed LoxAPP3.json plus derived rows for one structure version."""
+
+    version: str
+    payload: Dict[str, Any]
+    controls: Optional[Tuple[ControlRow, ...]] = None
+    rooms: Optional[Dict[str, str]] = None
+    categories: Optional[Dict[str, str]] = None
+
+
+# Strukturen werden pro URL zwischengespeichert, damit auch kurzlebige
+# Fetcher-Instanzen (eine pro Automatikdurchlauf) davon profitieren.
+_structure_cache: Dict[str, _CachedStructure] = {}
+_structure_cache_lock = threading.Lock()
+
+
+def clear_structure_cache() -> None:
+    """Forget all cached structures (hauptsächlich für Tests)."""
+
+    with _structure_cache_lock:
+        _structure_cache.clear()
+
+
+def cache_structure_rows(
+    key: str, payload: Dict[str, Any], rows: Iterable[ControlRow], version: str = ""
+) -> None:
+    """Let :meth:`LoxoneDataFetcher.extract_controls` answer ``payload`` with ``rows``.
+
+    The entry replaces any earlier one stored under ``key``, so the key
+    should name the data source rather than a single object.
+    """
+
+    _structure_cache_put(key, _CachedStructure(version, payload, controls=tuple(rows)))
+
+
+def _structure_cache_get(key: str) -> Optional[_CachedStructure]:
+    with _structure_cache_lock:
+        return _structure_cache.get(key)
+
+
+def _structure_cache_put(key: str, entry: _CachedStructure) -> None:
+    with _structure_cache_lock:
+        _structure_cache[key] = entry
+
+
+def _structure_cache_find(payload: Dict[str, Any]) -> Optional[_CachedStructure]:
+    with _structure_cache_lock:
+        for entry in _structure_cache.values():
+            if entry.payload is payload:
+                return entry
+    return None
+
+
+def _parsed_entry(parsed: Any, version: Optional[str] = None) -> _CachedStructure:
+    """Cache entry for a structure read by ``loxone_structure.parse_structure``."""
+
+    return _CachedStructure(
+        version=version or _payload_version(parsed.payload) or "",
+        payload=parsed.payload,
+        controls=tuple(parsed.rows),
+        rooms=parsed.rooms,
+        categories=parsed.categories,
+    )
+
+
+class _TeeReader:
+    """Text reader that copies everything it returns into ``sink``."""
+
+    def __init__(self, handle: Any, sink: Any):
+        self._handle = handle
+        self._sink = sink
+
+    def read(self, size: int = -1) -> str:
+        chunk = self._handle.read(size)
+        self._sink.write(chunk)
+        return chunk
+
+
+_DISK_CACHE_FORMAT = 3
+
+
+def _read_disk_cache(path: Path, url: str, stream_parse: bool = False) -> Optional[_CachedStructure]:
+    """Load a structure cache file written by :func:`_write_disk_cache`.
+
+    Only the raw structure is stored; rows and lookups are rebuilt like
+    after a download, so the file survives changes of :class:`ControlRow`.
+    """
+
+    parsed = None
+    try:
+        with path.open(encoding="utf-8") as handle:
+            if stream_parse:
+                from loxone_structure import parse_wrapped_structure
+
+                raw, parsed = parse_wrapped_structure(handle)
+            else:
+                raw = json.load(handle)
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        # Eine beschädigte Cache-Datei wird ignoriert und später überschrieben.
+        logger.warning("Struktur-Cache %s unlesbar: %s", path, exc)
+        return None
+
+    if not isinstance(raw, dict) or raw.get("format") != _DISK_CACHE_FORMAT:
+        return None
+    if raw.get("url") != url or not isinstance(raw.get("version"), str):
+        return None
+    if parsed is not None:
+        return _parsed_entry(parsed, raw["version"])
+    if not isinstance(raw.get("payload"), dict):
+        return None
+    return _CachedStructure(version=raw["version"], payload=raw["payload"])
+
+
+def _write_disk_cache(
+    path: Path, url: str, version: str, write_payload: Callable[[Any], None]
+) -> None:
+    """Persist one structure as plain JSON (``format``, ``url``, ``version``, ``payload``).
+
+    ``write_payload`` writes the raw LoxAPP3.json text to the handle it is given.
+    """
+
+    header = json.dumps({"format": _DISK_CACHE_FORMAT, "url": url, "version": version})
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(path.name + ".tmp")
+        with temporary.open("w", encoding="utf-8") as handle:
+            handle.write(header[:-1] + ', "payload": ')
+            write_payload(handle)
+            handle.write("}")
+        os.replace(temporary, path)
+    except OSError as exc:
+        logger.warning("Struktur-Cache %s konnte nicht geschrieben werden: %s", path, exc)
+
+
+def _payload_version(payload: Any) -> Optional[str]:
+    if isinstance(payload, dict) and payload.get("lastModified"):
+        return str(payload["lastModified"])
+    return None
+
+
+def _is_truthy(value: Optional[str]) -> bool:
+    return bool(value) and value.strip().lower() in ("1", "true", "yes", "on")
 
 
 def _build_lookup(entries: Dict[str, Dict[str, Any]], default_label: str) -> Dict[str, str]:
     lookup: Dict[str, str] = {}
     for key, payload in entries.items():
         name = payload.get("name") if isinstance(payload, dict) else None
-        lookup[key] = str(name) if name is not None else default_label
+        lookup[key] = sys.intern(str(name)) if name is not None else default_label
     return lookup
 
 
@@ -304,13 +1253,16 @@ def _extract_state_payload(payload: Any) -> Optional[Any]:
     return payload
 
 
-def _flatten_mapping(mapping: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, str], ...]:
+def _flatten_mapping(
+    mapping: Optional[Dict[str, Any]], intern_keys: bool = False
+) -> Tuple[Tuple[str, str], ...]:
     if not mapping:
         return tuple()
 
     flattened: List[Tuple[str, str]] = []
     for key, value in mapping.items():
-        flattened.append((str(key), _stringify(value)))
+        name = sys.intern(str(key)) if intern_keys else str(key)
+        flattened.append((name, _stringify(value)))
 
     flattened.sort(key=lambda item: item[0].lower())
     return tuple(flattened)
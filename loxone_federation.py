@@ -0,0 +1,307 @@
+"""Several Miniservers (main plus clients) behind one fetcher interface."""
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from loxone_data import ControlRow, LoxoneDataFetcher, LoxoneDataSource, cache_structure_rows
+
+logger = logging.getLogger(__name__)
+
+MAIN_SERVER = "main"
+
+
+@dataclass
+class ServerHealth:
+    """Availability and latency of one Miniserver in a federation."""
+
+    name: str
+    status: str = "unknown"
+    load_latency: Optional[float] = None
+    state_latency: Optional[float] = None
+    last_success: Optional[float] = None
+    last_error: Optional[str] = None
+    failures: int = 0
+    controls: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "load_latency": self.load_latency,
+            "state_latency": self.state_latency,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+            "failures": self.failures,
+            "controls": self.controls,
+        }
+
+
+def federation_sources_from_env(
+    base: Optional[LoxoneDataSource] = None,
+) -> Dict[str, LoxoneDataSource]:
+    """Return all configured Miniservers, the main server first.
+
+    ``LOXONE_SERVERS`` lists the client Miniservers as ``name=host`` entries
+    separated by commas (a bare ``host`` is its own name).  They inherit the
+    settings of the main server; ``LOXONE_<NAME>_USERNAME`` and
+    ``LOXONE_<NAME>_PASSWORD`` override the credentials per server.
+    """
+
+    main = base if base is not None else LoxoneDataSource.from_env()
+    sources: Dict[str, LoxoneDataSource] = {MAIN_SERVER: main}
+    for entry in (os.getenv("LOXONE_SERVERS") or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, host = entry.partition("=")
+        name, host = name.strip(), (host or name).strip()
+        if not host or name in sources:
+            logger.warning("Ungültiger oder doppelter Miniserver-Eintrag ignoriert: %s", entry)
+            continue
+        source = main.for_host(host)
+        prefix = "LOXONE_" + "".join(char if char.isalnum() else "_" for char in name).upper()
+        source.username = os.getenv(f"{prefix}_USERNAME") or main.username
+        source.password = os.getenv(f"{prefix}_PASSWORD") or main.password
+        if main.cache_path is not None:
+            path = Path(main.cache_path)
+            source.cache_path = path.with_name(f"{path.stem}-{name}{path.suffix}")
+        sources[name] = source
+    return sources
+
+
+class MiniserverFederation:
+    """Fetcher compatible facade that merges the controls of several Miniservers.
+
+    Structures and states are fetched from all servers in parallel.  A server
+    that does not answer within ``timeout`` is marked ``slow`` and served from
+    its last good structure or stale state values while its request finishes
+    in the background, so it never holds up the other servers.
+    """
+
+    extract_controls = staticmethod(LoxoneDataFetcher.extract_controls)
+
+    def __init__(
+        self,
+        fetchers: Mapping[str, LoxoneDataFetcher],
+        timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not fetchers:
+            raise ValueError("Mindestens ein Miniserver erforderlich")
+        self.fetchers: Dict[str, LoxoneDataFetcher] = dict(fetchers)
+        self.timeout = timeout
+        self.health: Dict[str, ServerHealth] = {name: ServerHealth(name) for name in self.fetchers}
+        self._default = MAIN_SERVER if MAIN_SERVER in self.fetchers else next(iter(self.fetchers))
+        self.source = self.fetchers[self._default].source
+        # Gleiche Server teilen sich einen Eintrag im Struktur-Cache.
+        self.cache_key = "federation:" + ",".join(
+            f"{name}={fetcher.source.url or fetcher.source.json_path}"
+            for name, fetcher in self.fetchers.items()
+        )
+        self.endpoints = tuple(fetcher.endpoints for fetcher in self.fetchers.values())
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Zwei Aufträge je Server: Strukturabruf und Statusabfrage.
+        self._executor = ThreadPoolExecutor(
+            max_workers=2 * len(self.fetchers), thread_name_prefix="loxone-federation"
+        )
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._loading: Dict[str, Future] = {}
+        self._resolving: Dict[str, Future] = {}
+        self._owners: Dict[str, str] = {}
+        self._merged: Optional[Dict[str, Any]] = None
+        self._merged_from: Tuple[Dict[str, Any], ...] = ()
+
+    def load(self) -> Dict[str, Any]:
+        """Load all structures in parallel and return the merged payload.
+
+        Servers that have not delivered a structure yet are listed under
+        ``missing``; their controls are absent, not deleted.
+        """
+
+        with self._lock:
+            futures = {}
+            for name, fetcher in self.fetchers.items():
+                future = self._loading.get(name)
+                if future is None or future.done():
+                    # Kontext mitgeben, damit die Anfrage-Priorität im Worker gilt.
+                    future = self._executor.submit(
+                        contextvars.copy_context().run, self._load_server, name, fetcher
+                    )
+                    self._loading[name] = future
+                futures[name] = future
+
+        wait(futures.values(), timeout=self.timeout)
+
+        errors: List[BaseException] = []
+        for name, future in futures.items():
+            if not future.done():
+                self._mark_slow(name, "Strukturabruf")
+            elif future.exception() is not None:
+                errors.append(future.exception())
+
+        with self._lock:
+            available = [
+                (name, self._payloads[name]) for name in self.fetchers if name in self._payloads
+            ]
+            if not available:
+                if errors:
+                    raise errors[0]
+                raise TimeoutError("Kein Miniserver hat rechtzeitig geantwortet")
+            return self._merge(available)
+
+    def _load_server(self, name: str, fetcher: LoxoneDataFetcher) -> Dict[str, Any]:
+        started = self._clock()
+        try:
+            payload = fetcher.load()
+        except Exception as exc:
+            self._record_failure(name, exc)
+            raise
+        health = self.health[name]
+        with self._lock:
+            self._payloads[name] = payload
+            health.load_latency = self._clock() - started
+            health.status = "ok"
+            health.last_success = time.time()
+            health.failures = 0
+        return payload
+
+    def _merge(self, available: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        payloads = tuple(payload for _name, payload in available)
+        if (
+            self._merged is not None
+            and len(payloads) == len(self._merged_from)
+            and all(new is old for new, old in zip(payloads, self._merged_from))
+        ):
+            return self._merged
+
+        rows: List[ControlRow] = []
+        merged: Dict[str, Any] = {"rooms": {}, "cats": {}, "controls": {}, "servers": {}}
+        owners: Dict[str, str] = {}
+        for name, payload in available:
+            server_rows = LoxoneDataFetcher.extract_controls(payload)
+            self.health[name].controls = len(server_rows)
+            rows.extend(server_rows)
+            for section in ("rooms", "cats", "controls"):
+                merged[section].update(payload.get(section) or {})
+            merged["servers"][name] = payload.get("lastModified")
+            for row in server_rows:
+                owners[row.uuid] = name
+                for _key, state_uuid in row.states:
+                    if state_uuid:
+                        owners[state_uuid] = name
+
+        versions = [str(version) for version in merged["servers"].values() if version]
+        merged["lastModified"] = max(versions) if versions else None
+        merged["missing"] = [name for name in self.fetchers if name not in merged["servers"]]
+        rows.sort(key=lambda item: (item.room.lower(), item.name.lower(), item.uuid))
+        # Die zusammengeführten Zeilen über den Struktur-Cache bereitstellen,
+        # damit ``extract_controls`` sie für dieses Payload direkt liefert.
+        cache_structure_rows(
+            self.cache_key,
+            merged,
+            rows,
+            version="|".join(f"{name}={merged['servers'][name]}" for name, _ in available),
+        )
+        self._owners = owners
+        self._merged = merged
+        self._merged_from = payloads
+        return merged
+
+    def _owner(self, uuid: str) -> str:
+        return self._owners.get(uuid, self._default)
+
+    def register_controls(self, rows: Iterable[ControlRow]) -> None:
+        grouped: Dict[str, List[ControlRow]] = {}
+        for row in rows:
+            grouped.setdefault(self._owner(row.uuid), []).append(row)
+        for name, server_rows in grouped.items():
+            self.fetchers[name].register_controls(server_rows)
+
+    def resolve_state_value(self, candidate: str) -> Optional[str]:
+        name = self._owner(candidate)
+        fetcher = self.fetchers[name]
+        future = self._resolving.get(name)
+        if future is not None and not future.done():
+            # Server hängt noch an der letzten Abfrage – nicht blockieren.
+            return fetcher.state_cache.get_stale(candidate)
+        return fetcher.resolve_state_value(candidate)
+
+    def resolve_many(self, candidates: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Resolve state UUIDs grouped by owning Miniserver, all servers in parallel."""
+
+        grouped: Dict[str, List[str]] = {}
+        for candidate in dict.fromkeys(candidate for candidate in candidates if candidate):
+            grouped.setdefault(self._owner(candidate), []).append(candidate)
+
+        futures = {}
+        with self._lock:
+            for name, server_candidates in grouped.items():
+                future = self._resolving.get(name)
+                if future is None or future.done():
+                    future = self._executor.submit(
+                        contextvars.copy_context().run,
+                        self._resolve_server,
+                        name,
+                        server_candidates,
+                    )
+                    self._resolving[name] = future
+                futures[name] = future
+
+        wait(futures.values(), timeout=self.timeout)
+
+        results: Dict[str, Optional[str]] = {}
+        for name, future in futures.items():
+            values: Dict[str, Optional[str]] = {}
+            if not future.done():
+                self._mark_slow(name, "Statusabfrage")
+            elif future.exception() is None:
+                values = future.result()
+            state_cache = self.fetchers[name].state_cache
+            for candidate in grouped[name]:
+                if candidate in values:
+                    results[candidate] = values[candidate]
+                else:
+                    results[candidate] = state_cache.get_stale(candidate)
+        return results
+
+    def _resolve_server(self, name: str, candidates: List[str]) -> Dict[str, Optional[str]]:
+        started = self._clock()
+        try:
+            values = self.fetchers[name].resolve_many(candidates)
+        except Exception as exc:
+            self._record_failure(name, exc)
+            raise
+        with self._lock:
+            self.health[name].state_latency = self._clock() - started
+        return values
+
+    def resolve_state_raw(self, candidate: str) -> Optional[str]:
+        return self.fetchers[self._owner(candidate)].resolve_state_raw(candidate)
+
+    def _mark_slow(self, name: str, what: str) -> None:
+        with self._lock:
+            self.health[name].status = "slow"
+        logger.warning(
+            "Miniserver %s antwortet nicht innerhalb von %.1f s (%s)", name, self.timeout, what
+        )
+
+    def _record_failure(self, name: str, exc: BaseException) -> None:
+        with self._lock:
+            health = self.health[name]
+            health.status = "error"
+            health.last_error = str(exc)
+            health.failures += 1
+        logger.warning("Miniserver %s nicht erreichbar: %s", name, exc)
+
+    def health_report(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [health.as_dict() for health in self.health.values()]
@@ -0,0 +1,490 @@
+"""Event-driven access to Loxone state values via the Miniserver WebSocket."""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+import uuid as uuid_module
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Set, Tuple, Union
+from urllib.parse import quote, urlparse
+
+from loxone_data import LoxoneDataSource
+
+
+logger = logging.getLogger(__name__)
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# WebSocket opcodes (RFC 6455).
+_OP_CONTINUATION = 0x0
+_OP_TEXT = 0x1
+_OP_BINARY = 0x2
+_OP_CLOSE = 0x8
+_OP_PING = 0x9
+_OP_PONG = 0xA
+
+# Identifier byte of the 8 byte Loxone message header.
+MSG_TEXT = 0
+MSG_BINARY_FILE = 1
+MSG_VALUE_EVENTS = 2
+MSG_TEXT_EVENTS = 3
+MSG_DAYTIMER_EVENTS = 4
+MSG_OUT_OF_SERVICE = 5
+MSG_KEEPALIVE = 6
+MSG_WEATHER_EVENTS = 7
+
+_HEADER_STRUCT = struct.Struct("<BBBxI")
+_UUID_STRUCT = struct.Struct("<IHH8s")
+_VALUE_EVENT_STRUCT = struct.Struct("<16sd")
+_ESTIMATED_FLAG = 0x80
+
+StateValue = Union[float, str]
+
+
+def parse_message_header(data: bytes) -> Tuple[int, int, int]:
+    """Return ``(identifier, info, length)`` of a Loxone binary message header."""
+
+    if len(data) != _HEADER_STRUCT.size or data[0] != 0x03:
+        raise ValueError("Ungültiger Loxone-Nachrichtenheader")
+    _marker, identifier, info, length = _HEADER_STRUCT.unpack(data)
+    return identifier, info, length
+
+
+def build_message_header(identifier: int, length: int, info: int = 0) -> bytes:
+    """Build a Loxone message header (used by tests and stand-in servers)."""
+
+    return _HEADER_STRUCT.pack(0x03, identifier, info, length)
+
+
+def format_loxone_uuid(raw: bytes) -> str:
+    """Render a 16 byte binary UUID in the ``8-4-4-16`` notation of LoxAPP3.json."""
+
+    data1, data2, data3, data4 = _UUID_STRUCT.unpack(raw)
+    return f"{data1:08x}-{data2:04x}-{data3:04x}-{data4.hex()}"
+
+
+def encode_loxone_uuid(text: str) -> bytes:
+    """Inverse of :func:`format_loxone_uuid`."""
+
+    parts = text.split("-")
+    if len(parts) == 5:
+        parts = parts[:3] + [parts[3] + parts[4]]
+    data1, data2, data3, data4 = parts
+    return _UUID_STRUCT.pack(
+        int(data1, 16), int(data2, 16), int(data3, 16), bytes.fromhex(data4)
+    )
+
+
+def decode_value_events(payload: bytes) -> Dict[str, float]:
+    """Decode a value event table into a ``{uuid: value}`` mapping."""
+
+    values: Dict[str, float] = {}
+    usable = len(payload) - len(payload) % _VALUE_EVENT_STRUCT.size
+    for raw_uuid, value in _VALUE_EVENT_STRUCT.iter_unpack(payload[:usable]):
+        values[format_loxone_uuid(raw_uuid)] = value
+    return values
+
+
+def decode_text_events(payload: bytes) -> Dict[str, str]:
+    """Decode a text event table into a ``{uuid: text}`` mapping."""
+
+    values: Dict[str, str] = {}
+    offset = 0
+    while offset + 36 <= len(payload):
+        raw_uuid = payload[offset : offset + 16]
+        (text_length,) = struct.unpack_from("<I", payload, offset + 32)
+        start = offset + 36
+        text = payload[start : start + text_length].decode("utf-8", errors="replace")
+        values[format_loxone_uuid(raw_uuid)] = text
+        # Texte werden auf ein Vielfaches von 4 Byte aufgefüllt.
+        offset = start + text_length + (-text_length % 4)
+    return values
+
+
+def format_state_value(value: StateValue) -> str:
+    """Render a streamed value the same way HTTP lookups present it."""
+
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return f"{value:.10g}"
+    return str(value)
+
+
+class _WebSocket:
+    """Minimal RFC 6455 client – just enough for the Loxone protocol."""
+
+    def __init__(self, sock: socket.socket, buffered: bytes = b""):
+        self._sock = sock
+        self._send_lock = threading.Lock()
+        self._buffer = bytearray(buffered)
+
+    @classmethod
+    def connect(cls, url: str, timeout: float) -> "_WebSocket":
+        parsed = urlparse(url)
+        port = parsed.port or 80
+        sock = socket.create_connection((parsed.hostname, port), timeout=timeout)
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        request = (
+            f"GET {parsed.path or '/'} HTTP/1.1\r\n"
+            f"Host: {parsed.netloc}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Protocol: remotecontrol\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        sock.sendall(request.encode("ascii"))
+
+        response = b""
+        while b"\r\n\r\n" not in response:
+            chunk = sock.recv(1024)
+            if not chunk:
+                sock.close()
+                raise ConnectionError("WebSocket-Handshake abgebrochen")
+            response += chunk
+        head, _, rest = response.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        if " 101 " not in f"{lines[0]} ":
+            sock.close()
+            raise ConnectionError(f"WebSocket-Handshake fehlgeschlagen: {lines[0]}")
+
+        expected = base64.b64encode(
+            hashlib.sha1((key + _WS_GUID).encode("ascii")).digest()
+        ).decode("ascii")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("sec-websocket-accept") != expected:
+            sock.close()
+            raise ConnectionError("WebSocket-Handshake: ungültiger Accept-Schlüssel")
+
+        return cls(sock, rest)
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        self._sock.settimeout(timeout)
+
+    def close(self) -> None:
+        try:
+            self._send_frame(_OP_CLOSE, b"")
+        except OSError:
+            pass
+        self._sock.close()
+
+    def send_text(self, text: str) -> None:
+        self._send_frame(_OP_TEXT, text.encode("utf-8"))
+
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header.append(0x80 | 126)
+            header += struct.pack("!H", length)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack("!Q", length)
+        mask = os.urandom(4)
+        masked = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+        with self._send_lock:
+            self._sock.sendall(bytes(header) + mask + masked)
+
+    def _read_exact(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            chunk = self._sock.recv(max(4096, size - len(self._buffer)))
+            if not chunk:
+                raise ConnectionError("WebSocket-Verbindung geschlossen")
+            self._buffer += chunk
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def receive(self) -> Tuple[int, bytes]:
+        """Return the next complete data message as ``(opcode, payload)``."""
+
+        message_opcode: Optional[int] = None
+        fragments = []
+        while True:
+            first, second = self._read_exact(2)
+            fin = bool(first & 0x80)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                (length,) = struct.unpack("!H", self._read_exact(2))
+            elif length == 127:
+                (length,) = struct.unpack("!Q", self._read_exact(8))
+            mask = self._read_exact(4) if second & 0x80 else None
+            payload = self._read_exact(length)
+            if mask:
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+            if opcode == _OP_PING:
+                self._send_frame(_OP_PONG, payload)
+                continue
+            if opcode == _OP_PONG:
+                continue
+            if opcode == _OP_CLOSE:
+                raise ConnectionError("WebSocket vom Miniserver geschlossen")
+
+            if opcode != _OP_CONTINUATION:
+                message_opcode = opcode
+            fragments.append(payload)
+            if fin:
+                return message_opcode or _OP_BINARY, b"".join(fragments)
+
+
+class LoxoneStateStream:
+    """Keep a live map of state values fed by Loxone binary status updates.
+
+    The stream opens ``/ws/rfc6455``, authenticates with a JSON web token,
+    sends ``jdev/sps/enablebinstatusupdate`` and afterwards decodes every
+    value and text event table into :attr:`values`.  Consumers either poll
+    :meth:`resolve_state_value` or block on :meth:`wait_for_change`.
+
+    Only changes of the state UUIDs passed to :meth:`watch` wake waiters
+    (all states until ``watch`` is called); :meth:`take_changes` returns
+    which of them changed.  Wake-ups are at least ``min_wake_interval``
+    seconds apart, so a burst of events is handled in one go.  While the
+    WebSocket is disconnected no values are served, callers fall back to
+    HTTP.
+    """
+
+    def __init__(
+        self,
+        source: LoxoneDataSource,
+        *,
+        timeout: float = 10.0,
+        keepalive_interval: float = 60.0,
+        reconnect_delay: float = 5.0,
+        on_change: Optional[Callable[[Dict[str, StateValue]], None]] = None,
+        min_wake_interval: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not source.websocket_url:
+            raise ValueError("Keine WebSocket-URL für den Miniserver konfiguriert")
+        self.source = source
+        self.timeout = timeout
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_delay = reconnect_delay
+        self.on_change = on_change
+        self.min_wake_interval = min_wake_interval
+        self._clock = clock
+        self._values: Dict[str, StateValue] = {}
+        self._watched: Optional[FrozenSet[str]] = None
+        self._pending: Set[str] = set()
+        self._last_wake = float("-inf")
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._connected = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._socket: Optional[_WebSocket] = None
+        self._client_uuid = str(uuid_module.uuid4())
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self) -> None:
+        """Run the stream in a daemon thread, reconnecting on errors."""
+
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        connection = self._socket
+        if connection is not None:
+            connection.close()
+        if self._thread:
+            self._thread.join(timeout=self.timeout)
+
+    def wait_until_connected(self, timeout: Optional[float] = None) -> bool:
+        return self._connected.wait(timeout)
+
+    def watch(self, state_uuids: Optional[Iterable[str]]) -> None:
+        """Wake waiters only for changes of ``state_uuids`` (``None``: every state)."""
+
+        with self._lock:
+            self._watched = None if state_uuids is None else frozenset(state_uuids)
+            if self._watched is not None:
+                self._pending &= self._watched
+
+    def take_changes(self) -> Set[str]:
+        """Return and forget the watched state UUIDs that changed since the last call."""
+
+        with self._lock:
+            changes, self._pending = self._pending, set()
+        return changes
+
+    def wait_for_change(self, timeout: Optional[float] = None) -> bool:
+        """Block until a watched value changed or ``timeout`` elapsed."""
+
+        triggered = self._changed.wait(timeout)
+        if triggered:
+            # Weitere Änderungen kurz nachsammeln statt für jede einzeln zu wecken.
+            remaining = self._last_wake + self.min_wake_interval - self._clock()
+            if remaining > 0:
+                self._stop.wait(remaining)
+            self._last_wake = self._clock()
+        self._changed.clear()
+        return triggered
+
+    def snapshot(self) -> Dict[str, StateValue]:
+        with self._lock:
+            return dict(self._values)
+
+    def resolve_state_value(self, candidate: str) -> Optional[str]:
+        """Return the streamed value of a state UUID or ``None`` if unknown.
+
+        Without a live connection the value may be outdated, so ``None`` is
+        returned as well.
+        """
+
+        if not self._connected.is_set():
+            return None
+        with self._lock:
+            value = self._values.get(candidate)
+        if value is None:
+            return None
+        return format_state_value(value)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as exc:
+                if not self._stop.is_set():
+                    logger.warning("Loxone-WebSocket getrennt: %s", exc)
+            self._connected.clear()
+            # Während der Trennung verpasste Änderungen machen die Werte ungültig;
+            # nach dem Verbinden sendet der Miniserver alle Werte neu.
+            with self._lock:
+                self._values.clear()
+            self._stop.wait(self.reconnect_delay)
+
+    def run_once(self) -> None:
+        """Connect, subscribe and process events until the connection drops."""
+
+        connection = _WebSocket.connect(self.source.websocket_url or "", self.timeout)
+        self._socket = connection
+        try:
+            self._authenticate(connection)
+            self._command(connection, "jdev/sps/enablebinstatusupdate")
+            self._connected.set()
+            # Der Leser blockiert ohne Timeout; Keepalives aus einem eigenen
+            # Thread verhindern, dass der Miniserver die Verbindung schließt.
+            connection.settimeout(None)
+            closed = threading.Event()
+            threading.Thread(
+                target=self._keepalive, args=(connection, closed), daemon=True
+            ).start()
+            try:
+                while not self._stop.is_set():
+                    identifier, payload = self._receive_message(connection)
+                    self._handle_message(identifier, payload)
+            finally:
+                closed.set()
+        finally:
+            self._socket = None
+            connection.close()
+
+    def _keepalive(self, connection: _WebSocket, closed: threading.Event) -> None:
+        while not closed.wait(self.keepalive_interval):
+            try:
+                connection.send_text("keepalive")
+            except OSError:
+                return
+
+    def _authenticate(self, connection: _WebSocket) -> None:
+        user = self.source.username
+        if not user:
+            return
+        key_info = self._command(connection, f"jdev/sys/getkey2/{quote(user)}")
+        if not isinstance(key_info, dict):
+            raise ConnectionError("Miniserver lieferte keinen Schlüssel")
+        algorithm = str(key_info.get("hashAlg", "SHA1")).lower()
+        digest = hashlib.sha256 if algorithm == "sha256" else hashlib.sha1
+        password_hash = (
+            digest(f"{self.source.password or ''}:{key_info['salt']}".encode("utf-8"))
+            .hexdigest()
+            .upper()
+        )
+        token_hash = hmac.new(
+            bytes.fromhex(str(key_info["key"])),
+            f"{user}:{password_hash}".encode("utf-8"),
+            digest,
+        ).hexdigest()
+        self._command(
+            connection,
+            f"jdev/sys/getjwt/{token_hash}/{quote(user)}/2/{self._client_uuid}/MQ-UDP",
+        )
+
+    def _command(self, connection: _WebSocket, command: str) -> object:
+        connection.send_text(command)
+        while True:
+            identifier, payload = self._receive_message(connection)
+            if identifier != MSG_TEXT:
+                self._handle_message(identifier, payload)
+                continue
+            try:
+                response = json.loads(payload.decode("utf-8"))["LL"]
+            except (ValueError, KeyError, TypeError) as exc:
+                raise ConnectionError(f"Unerwartete Antwort auf {command}") from exc
+            code = str(response.get("Code", response.get("code", "200")))
+            if code != "200":
+                raise ConnectionError(f"{command} fehlgeschlagen (Code {code})")
+            return response.get("value")
+
+    def _receive_message(self, connection: _WebSocket) -> Tuple[int, bytes]:
+        while True:
+            _opcode, header = connection.receive()
+            identifier, info, _length = parse_message_header(header)
+            if info & _ESTIMATED_FLAG:
+                # Ein geschätzter Header kündigt nur den echten Header an.
+                continue
+            if identifier in (MSG_KEEPALIVE, MSG_OUT_OF_SERVICE):
+                # Diese Nachrichten bestehen nur aus dem Header.
+                return identifier, b""
+            _opcode, payload = connection.receive()
+            return identifier, payload
+
+    def _handle_message(self, identifier: int, payload: bytes) -> None:
+        if identifier == MSG_VALUE_EVENTS:
+            updates: Dict[str, StateValue] = dict(decode_value_events(payload))
+        elif identifier == MSG_TEXT_EVENTS:
+            updates = dict(decode_text_events(payload))
+        elif identifier == MSG_OUT_OF_SERVICE:
+            raise ConnectionError("Miniserver ist außer Betrieb")
+        else:
+            return
+        self.apply_updates(updates)
+
+    def apply_updates(self, updates: Dict[str, StateValue]) -> None:
+        """Merge ``updates`` into the state map and notify waiters on change."""
+
+        with self._lock:
+            changed = {
+                key: value
+                for key, value in updates.items()
+                if self._values.get(key) != value
+            }
+            self._values.update(changed)
+            watched = changed.keys() if self._watched is None else self._watched.intersection(changed)
+            self._pending.update(watched)
+        if watched:
+            self._changed.set()
+        if changed and self.on_change is not None:
+            self.on_change(changed)
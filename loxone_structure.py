@@ -0,0 +1,324 @@
+"""Incremental parsing and change tracking of LoxAPP3.json structures."""
+from __future__ import annotations
+
+import json
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from loxone_data import ControlRow, LoxoneDataFetcher, _build_lookup, _control_row
+
+
+# Nur diese Abschnitte werden gelesen; alles andere (autopilot,
+# messageCenter, weatherServer, ...) wird übersprungen, ohne Objekte zu bauen.
+_SCALAR_SECTIONS = ("lastModified",)
+_LOOKUP_SECTIONS = ("rooms", "cats")
+
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[,}\]\s]')
+_WHITESPACE = " \t\r\n"
+
+
+class _JsonScanner:
+    """Chunked reader that can skip or capture single JSON values."""
+
+    def __init__(self, handle: TextIO, chunk_size: int = 1 << 16):
+        self._handle = handle
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._capture: Optional[List[str]] = None
+        self._capture_from = 0
+
+    def _more(self) -> bool:
+        chunk = self._handle.read(self._chunk_size)
+        if not chunk:
+            return False
+        if self._capture is not None:
+            self._capture.append(self._buffer[self._capture_from : self._pos])
+            self._capture_from = 0
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._more():
+                raise ValueError("Unerwartetes Ende der Strukturdatei")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Erwartet '{char}' an Position {self._pos}")
+        self._pos += 1
+
+    def consume_if(self, char: str) -> bool:
+        if self.peek() == char:
+            self._pos += 1
+            return True
+        return False
+
+    def read_key(self) -> str:
+        key = json.loads(self.read_raw())
+        self.expect(":")
+        return key
+
+    def read_value(self) -> Any:
+        return json.loads(self.read_raw())
+
+    def read_raw(self) -> str:
+        """Return the source text of the next value."""
+
+        self.peek()
+        self._capture = []
+        self._capture_from = self._pos
+        try:
+            self.skip()
+            self._capture.append(self._buffer[self._capture_from : self._pos])
+            return "".join(self._capture)
+        finally:
+            self._capture = None
+
+    def skip(self) -> None:
+        """Advance past the next value without building Python objects."""
+
+        first = self.peek()
+        if first == '"':
+            self._pos += 1
+            self._skip_string_rest()
+        elif first in "{[":
+            self._skip_container()
+        else:
+            self._skip_scalar()
+
+    def _skip_string_rest(self) -> None:
+        while True:
+            match = _STRING_SPECIAL.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                if not self._more():
+                    raise ValueError("Unterminierte Zeichenkette")
+                continue
+            self._pos = match.end()
+            if match.group() == '"':
+                return
+            # Escape-Sequenz: das folgende Zeichen gehört zur Zeichenkette.
+            if self._pos >= len(self._buffer) and not self._more():
+                raise ValueError("Unterminierte Zeichenkette")
+            self._pos += 1
+
+    def _skip_container(self) -> None:
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                if not self._more():
+                    raise ValueError("Unvollständige Strukturdatei")
+                continue
+            self._pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._skip_string_rest()
+            elif char in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _skip_scalar(self) -> None:
+        while True:
+            match = _SCALAR_END.search(self._buffer, self._pos)
+            if match is not None:
+                self._pos = match.start()
+                return
+            self._pos = len(self._buffer)
+            if not self._more():
+                return
+
+    def iter_object(self) -> Iterator[str]:
+        """Yield the keys of the next object; the caller consumes each value."""
+
+        self.expect("{")
+        if self.consume_if("}"):
+            return
+        while True:
+            yield self.read_key()
+            if self.consume_if(","):
+                continue
+            self.expect("}")
+            return
+
+
+@dataclass
+class ParsedStructure:
+    """Result of :func:`parse_structure`: the slim payload plus its rows."""
+
+    payload: Dict[str, Any]
+    rows: List[ControlRow]
+    rooms: Dict[str, str]
+    categories: Dict[str, str]
+
+
+def parse_structure(handle: TextIO, chunk_size: int = 1 << 16) -> ParsedStructure:
+    """Parse LoxAPP3.json from ``handle`` section by section.
+
+    Controls are turned into :class:`ControlRow` objects one at a time, so the
+    full ``controls`` tree never exists as Python objects.  The returned
+    payload keeps ``lastModified``, ``rooms``, ``cats`` and a slim
+    ``controls`` mapping that only holds each control's ``states``.
+    """
+
+    return _parse_sections(_JsonScanner(handle, chunk_size))
+
+
+def parse_wrapped_structure(
+    handle: TextIO, key: str = "payload", chunk_size: int = 1 << 16
+) -> Tuple[Dict[str, Any], Optional[ParsedStructure]]:
+    """Parse an object that holds a LoxAPP3.json structure under ``key``.
+
+    The structure is parsed like :func:`parse_structure`; all other members
+    are returned as plain values.
+    """
+
+    scanner = _JsonScanner(handle, chunk_size)
+    members: Dict[str, Any] = {}
+    parsed: Optional[ParsedStructure] = None
+    for name in scanner.iter_object():
+        if name == key:
+            parsed = _parse_sections(scanner)
+        else:
+            members[name] = scanner.read_value()
+    return members, parsed
+
+
+def _parse_sections(scanner: _JsonScanner) -> ParsedStructure:
+    payload: Dict[str, Any] = {}
+    rooms: Optional[Dict[str, str]] = None
+    categories: Optional[Dict[str, str]] = None
+    rows: List[ControlRow] = []
+    slim_controls: Dict[str, Dict[str, Any]] = {}
+    deferred: List[Tuple[ControlRow, Any, Any]] = []
+
+    for section in scanner.iter_object():
+        if section in _SCALAR_SECTIONS:
+            payload[section] = scanner.read_value()
+        elif section in _LOOKUP_SECTIONS:
+            entries = scanner.read_value()
+            payload[section] = entries
+            label = "Raum unbekannt" if section == "rooms" else "Kategorie unbekannt"
+            lookup = _build_lookup(entries or {}, default_label=label)
+            if section == "rooms":
+                rooms = lookup
+            else:
+                categories = lookup
+        elif section == "controls":
+            for uuid in scanner.iter_object():
+                control = scanner.read_value()
+                row = _control_row(uuid, control, rooms or {}, categories or {})
+                slim_controls[uuid] = {"states": control.get("states") or {}}
+                if rooms is None or categories is None:
+                    # Räume/Kategorien folgen erst später in der Datei.
+                    deferred.append((row, control.get("room"), control.get("cat")))
+                rows.append(row)
+        else:
+            scanner.skip()
+
+    rooms = rooms or {}
+    categories = categories or {}
+    for row, room_id, cat_id in deferred:
+        row.room = rooms.get(room_id, "")
+        row.category = categories.get(cat_id, "")
+
+    payload["controls"] = slim_controls
+    rows.sort(key=lambda item: (item.room.lower(), item.name.lower(), item.uuid))
+    return ParsedStructure(payload=payload, rows=rows, rooms=rooms, categories=categories)
+
+
+@dataclass
+class StructureDiff:
+    """Changes between two consecutive structure versions.
+
+    ``complete`` is set for the first structure that covers every source
+    (a federation lists servers without a structure under ``missing``);
+    only then may a consumer drop configuration of unknown controls.
+    """
+
+    initial: bool = False
+    complete: bool = False
+    added: Tuple[str, ...] = ()
+    removed: Tuple[str, ...] = ()
+    renamed: Tuple[str, ...] = ()
+    states_changed: Tuple[str, ...] = ()
+    modified: Tuple[str, ...] = ()
+
+    @property
+    def changed(self) -> Tuple[str, ...]:
+        """UUIDs whose row is new or differs from the previous version."""
+
+        return tuple(
+            dict.fromkeys(self.added + self.renamed + self.states_changed + self.modified)
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.initial or self.complete or self.added or self.removed or self.changed)
+
+
+class StructureModel:
+    """Current controls by UUID, updated incrementally on every reload.
+
+    When the fetcher hands back the identical payload object (structure
+    version unchanged) :meth:`update` returns an empty diff without touching
+    any row, so consumers only pay for what actually changed.  ``controls``
+    keeps the order of :meth:`LoxoneDataFetcher.extract_controls`.
+    """
+
+    def __init__(self) -> None:
+        self.controls: Dict[str, ControlRow] = {}
+        self._payload: Optional[Dict[str, Any]] = None
+        self._complete = False
+        self._lock = threading.Lock()
+
+    def update(self, payload: Dict[str, Any]) -> StructureDiff:
+        with self._lock:
+            if payload is self._payload:
+                return StructureDiff()
+
+            rows = LoxoneDataFetcher.extract_controls(payload)
+            current = {row.uuid: row for row in rows}
+            previous = self.controls
+            initial = self._payload is None
+            complete = not self._complete and not payload.get("missing")
+            self._complete = self._complete or complete
+            self.controls = current
+            self._payload = payload
+
+        renamed: List[str] = []
+        states_changed: List[str] = []
+        modified: List[str] = []
+        for uuid, row in current.items():
+            before = previous.get(uuid)
+            if before is None or before is row or before == row:
+                continue
+            if before.name != row.name:
+                renamed.append(uuid)
+            if before.states != row.states:
+                states_changed.append(uuid)
+            elif before.name == row.name:
+                modified.append(uuid)
+
+        return StructureDiff(
+            initial=initial,
+            complete=complete,
+            added=tuple(uuid for uuid in current if uuid not in previous),
+            removed=tuple(uuid for uuid in previous if uuid not in current),
+            renamed=tuple(renamed),
+            states_changed=tuple(states_changed),
+            modified=tuple(modified),
+        )
@@ -0,0 +1,182 @@
+"""One MQTT broker connection shared by all bridge components."""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from mqtt_publisher import MESSAGE_AUTOMATIC, MqttPublisher
+
+logger = logging.getLogger(__name__)
+
+MessageCallback = Callable[[Any, Any, Any], None]
+
+
+def topic_matches(subscription: str, topic: str) -> bool:
+    """Whether ``topic`` matches ``subscription`` including ``+``/``#`` wildcards."""
+
+    parts = topic.split("/")
+    sub_parts = subscription.split("/")
+    for index, part in enumerate(sub_parts):
+        if part == "#":
+            return True
+        if index >= len(parts) or (part != "+" and part != parts[index]):
+            return False
+    return len(sub_parts) == len(parts)
+
+
+class MqttConnection:
+    """Multiplex subscriptions and publishes of all components over one client.
+
+    The client connects asynchronously and paho's network thread reconnects
+    on its own (with the client's reconnect backoff); every (re)connect
+    restores all registered subscriptions and runs the connect listeners.
+    Incoming messages are dispatched to the callbacks of all matching
+    subscriptions, outgoing messages go through one shared
+    :class:`MqttPublisher`, which buffers them while the broker is away.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        host: str,
+        port: int,
+        *,
+        keepalive: int = 60,
+        publisher: Optional[MqttPublisher] = None,
+        connect_options: Optional[Dict[str, Any]] = None,
+    ):
+        self.client = client
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.connect_options: Dict[str, Any] = dict(connect_options or {})
+        self.publisher = publisher if publisher is not None else MqttPublisher(client)
+        self.connected = threading.Event()
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, Tuple[int, List[MessageCallback]]] = {}
+        self._connect_listeners: List[Callable[[], None]] = []
+        self._started = False
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = self._on_message
+
+    def start(self) -> None:
+        """Connect in the background and start the network and publisher threads."""
+
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        # Ein bereits verbundener Client darf sofort senden, sonst puffern.
+        self.publisher.set_online(bool(self.client.is_connected()))
+        self.client.connect_async(self.host, self.port, self.keepalive, **self.connect_options)
+        self.client.loop_start()
+        self.publisher.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+        self.publisher.stop()
+        self.client.loop_stop()
+        self.client.disconnect()
+        self.connected.clear()
+
+    def subscribe(self, topic: str, callback: MessageCallback, qos: int = 0) -> None:
+        """Call ``callback(client, userdata, message)`` for messages on ``topic``."""
+
+        with self._lock:
+            current_qos, callbacks = self._subscriptions.get(topic, (qos, []))
+            callbacks.append(callback)
+            self._subscriptions[topic] = (max(current_qos, qos), callbacks)
+            subscribe_now = self.connected.is_set()
+        if subscribe_now:
+            self.client.subscribe(topic, max(current_qos, qos))
+
+    def unsubscribe(self, topic: str, callback: MessageCallback) -> None:
+        with self._lock:
+            qos, callbacks = self._subscriptions.get(topic, (0, []))
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if callbacks:
+                return
+            self._subscriptions.pop(topic, None)
+            unsubscribe_now = self.connected.is_set()
+        if unsubscribe_now:
+            self.client.unsubscribe(topic)
+
+    def add_connect_listener(self, listener: Callable[[], None]) -> None:
+        """Call ``listener()`` from the network thread after every successful connect."""
+
+        with self._lock:
+            self._connect_listeners.append(listener)
+
+    def remove_connect_listener(self, listener: Callable[[], None]) -> None:
+        with self._lock:
+            if listener in self._connect_listeners:
+                self._connect_listeners.remove(listener)
+
+    def publish(
+        self,
+        topic: str,
+        payload: str,
+        *,
+        message_class: str = MESSAGE_AUTOMATIC,
+        key: Optional[Hashable] = None,
+        retain: bool = False,
+    ) -> None:
+        self.publisher.publish(topic, payload, message_class=message_class, key=key, retain=retain)
+
+    def _on_connect(
+        self, client: Any, userdata: Any, flags: Any, rc: Any, properties: Any = None, *args: Any
+    ) -> None:
+        if rc != 0:
+            logger.warning("MQTT-Verbindung abgelehnt: %s", rc)
+            return
+        # MQTT v5: Topic-Aliase gelten nur für diese Verbindung.
+        self.publisher.set_topic_alias_maximum(getattr(properties, "TopicAliasMaximum", 0) or 0)
+        with self._lock:
+            subscriptions = [(topic, qos) for topic, (qos, _callbacks) in self._subscriptions.items()]
+            listeners = list(self._connect_listeners)
+            self.connected.set()
+        if subscriptions:
+            # Abonnements nach jedem (Wieder-)Verbinden erneuern; bei einer
+            # persistenten Sitzung kennt der Broker sie zwar schon, schadet aber nicht.
+            client.subscribe(subscriptions)
+        session_present = bool(flags.get("session present")) if isinstance(flags, dict) else False
+        logger.info(
+            "MQTT verbunden mit %s:%s (%d Abonnements, Sitzung %s)",
+            self.host,
+            self.port,
+            len(subscriptions),
+            "fortgesetzt" if session_present else "neu",
+        )
+        self.publisher.set_online(True)
+        for listener in listeners:
+            try:
+                listener()
+            except Exception:  # pragma: no cover - defensive logging only
+                logger.exception("Fehler im MQTT-Verbindungs-Listener")
+
+    def _on_disconnect(self, client: Any, userdata: Any, rc: Any, *args: Any) -> None:
+        self.connected.clear()
+        self.publisher.set_online(False)
+        self.publisher.set_topic_alias_maximum(0)
+        if rc != 0:
+            logger.warning("MQTT-Verbindung unterbrochen (%s), verbinde neu", rc)
+
+    def _on_message(self, client: Any, userdata: Any, message: Any) -> None:
+        with self._lock:
+            callbacks = [
+                callback
+                for topic, (_qos, topic_callbacks) in self._subscriptions.items()
+                if topic_matches(topic, message.topic)
+                for callback in topic_callbacks
+            ]
+        for callback in callbacks:
+            try:
+                callback(client, userdata, message)
+            except Exception:  # pragma: no cover - defensive logging only
+                logger.exception("Fehler beim Verarbeiten der MQTT-Nachricht auf %s", message.topic)
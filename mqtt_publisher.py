@@ -0,0 +1,358 @@
+"""Bounded, asynchronous MQTT publishing with backpressure and ack statistics."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Hashable, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_AUTOMATIC = "automatic"
+MESSAGE_BRIDGE = "bridge"
+
+# Entsprechen ``paho.mqtt.client.MQTT_ERR_SUCCESS`` und ``MQTT_ERR_NO_CONN``.
+_MQTT_ERR_SUCCESS = 0
+_MQTT_ERR_NO_CONN = 4
+
+
+@dataclass
+class _Outgoing:
+    topic: str
+    payload: str
+    qos: int
+    retain: bool
+    key: Optional[Hashable] = None
+    queued_at: float = 0.0
+
+
+class MqttPublisher:
+    """Publish through a paho client without letting its queue grow unbounded.
+
+    Messages wait in a queue of at most ``max_queue`` entries and are handed
+    to the client by a worker thread while fewer than ``max_inflight``
+    messages are still unacknowledged.  A message published with a ``key``
+    replaces a still queued message with the same topic and key in place, so
+    a saturated queue only holds the latest payload per control and that
+    payload keeps the earlier queue position.  When the queue is full anyway
+    the oldest message is dropped.  Messages that are not acknowledged within
+    ``ack_timeout`` seconds no longer count against the inflight window.
+    ``on_send`` is called with the payload right before it is handed to the
+    client, so a broker echo can never overtake it; ``on_send_failed`` undoes
+    that when the client rejects the message.  Dropped, replaced or stale
+    messages never reach ``on_send``.
+
+    While the publisher is offline (:meth:`set_online`) nothing is sent and
+    the queue doubles as offline buffer that keeps only the last payload per
+    topic (and key); it is flushed as soon as the connection is back.
+
+    With a ``properties_factory`` (MQTT v5) every message carries a
+    ``MessageExpiryInterval`` reduced by the time it spent in the queue, and
+    keyed messages carry the key as ``uuid`` user property and use topic
+    aliases: the first message on a topic registers the alias, later QoS 0
+    messages send only the alias.  Aliases are valid for one connection and
+    limited by the broker's ``TopicAliasMaximum``.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        name: str = "mqtt",
+        *,
+        qos: Optional[Mapping[str, int]] = None,
+        max_queue: int = 1000,
+        max_inflight: int = 20,
+        ack_timeout: float = 30.0,
+        on_send: Optional[Callable[[str], None]] = None,
+        on_send_failed: Optional[Callable[[str], None]] = None,
+        properties_factory: Optional[Callable[[], Any]] = None,
+        message_expiry: float = 0.0,
+        topic_alias_limit: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client = client
+        self.name = name
+        self.qos: Dict[str, int] = dict(qos or {})
+        self.max_queue = max(1, max_queue)
+        self.max_inflight = max(1, max_inflight)
+        self.ack_timeout = ack_timeout
+        self._on_send = on_send
+        self._on_send_failed = on_send_failed
+        self._properties_factory = properties_factory
+        self.message_expiry = message_expiry
+        self.topic_alias_limit = topic_alias_limit
+        self._alias_maximum = 0
+        self._aliases: Dict[str, int] = {}
+        self._clock = clock
+        self._condition = threading.Condition(threading.RLock())
+        self._queue: "OrderedDict[Hashable, _Outgoing]" = OrderedDict()
+        self._sequence = 0
+        self._inflight: Dict[int, float] = {}
+        self._early_acks: Dict[int, float] = {}
+        self._latencies: Deque[float] = deque(maxlen=512)
+        self._stopping = False
+        self._online = True
+        self._thread: Optional[threading.Thread] = None
+        self.counters: Dict[str, int] = {
+            "published": 0,
+            "acked": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "failed": 0,
+            "expired": 0,
+            "buffered": 0,
+            "requeued": 0,
+            "stale": 0,
+            "aliased": 0,
+        }
+        client.on_publish = self._on_publish
+
+    def start(self) -> None:
+        """Run the sending worker in a daemon thread."""
+
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"mqtt-publisher-{self.name}", daemon=True
+        )
+        self._thread.start()
+        _register(self)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Hand all queued messages to the client (up to ``timeout``) and stop."""
+
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        _unregister(self)
+
+    def set_online(self, online: bool) -> None:
+        """Pause sending while the broker is unreachable; resume and flush afterwards."""
+
+        with self._condition:
+            self._online = online
+            self._condition.notify_all()
+
+    def set_topic_alias_maximum(self, maximum: int) -> None:
+        """Start a new alias table for a connection that accepts ``maximum`` aliases."""
+
+        with self._condition:
+            self._alias_maximum = max(0, min(maximum, self.topic_alias_limit))
+            self._aliases.clear()
+
+    def publish(
+        self,
+        topic: str,
+        payload: str,
+        *,
+        message_class: str = MESSAGE_AUTOMATIC,
+        key: Optional[Hashable] = None,
+        retain: bool = False,
+    ) -> None:
+        """Queue ``payload`` for ``topic``; never blocks on the broker."""
+
+        message = _Outgoing(
+            topic, payload, self.qos.get(message_class, 0), retain, key, self._clock()
+        )
+        with self._condition:
+            if not self._online:
+                # Offline nur den letzten Wert je Topic puffern.
+                self.counters["buffered"] += 1
+            if key is not None or not self._online:
+                entry_key: Hashable = (topic, key)
+                if entry_key in self._queue:
+                    # Veralteten Wert ersetzen, Position in der Warteschlange behalten.
+                    self._queue[entry_key] = message
+                    self.counters["coalesced"] += 1
+                    return
+            else:
+                self._sequence += 1
+                entry_key = self._sequence
+            if len(self._queue) >= self.max_queue:
+                _dropped_key, dropped = self._queue.popitem(last=False)
+                self.counters["dropped"] += 1
+                logger.warning(
+                    "MQTT-Warteschlange %s voll, verwerfe Nachricht für %s", self.name, dropped.topic
+                )
+            self._queue[entry_key] = message
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    self._expire_inflight(self._clock())
+                    if self._queue and self._online and len(self._inflight) < self.max_inflight:
+                        break
+                    if self._stopping and (not self._queue or not self._online):
+                        return
+                    timeout = None
+                    if self._inflight:
+                        oldest = min(self._inflight.values())
+                        timeout = max(0.01, oldest + self.ack_timeout - self._clock())
+                    if self._stopping:
+                        # Beim Beenden nicht auf Bestätigungen warten.
+                        self._inflight.clear()
+                        continue
+                    self._condition.wait(timeout)
+                key, message = self._queue.popitem(last=False)
+            self._send(key, message)
+
+    def _send(self, key: Hashable, message: _Outgoing) -> None:
+        sent_at = self._clock()
+        topic, properties = message.topic, None
+        if self._properties_factory is not None:
+            properties = self._properties_factory()
+            if self.message_expiry:
+                remaining = self.message_expiry - (sent_at - message.queued_at)
+                if remaining <= 0:
+                    # Zu lange gepuffert – ein veralteter Wert hilft der Uhr nicht.
+                    with self._condition:
+                        self.counters["stale"] += 1
+                    return
+                properties.MessageExpiryInterval = max(1, int(remaining))
+            if message.key is not None:
+                properties.UserProperty = ("uuid", str(message.key))
+                topic, alias = self._topic_alias(message)
+                if alias is not None:
+                    properties.TopicAlias = alias
+        if self._on_send is not None:
+            # Vor dem Senden melden: das Echo des Brokers kann sonst schneller sein.
+            self._on_send(message.payload)
+        try:
+            if properties is None:
+                info = self.client.publish(
+                    topic, message.payload, qos=message.qos, retain=message.retain
+                )
+            else:
+                info = self.client.publish(
+                    topic,
+                    message.payload,
+                    qos=message.qos,
+                    retain=message.retain,
+                    properties=properties,
+                )
+            rc = info.rc
+        except Exception as exc:  # pragma: no cover - depends on the client
+            info, rc = None, exc
+        if rc != _MQTT_ERR_SUCCESS and self._on_send_failed is not None:
+            # Nicht gesendet: die Meldung zurücknehmen, sonst würde ein echter
+            # eingehender Befehl mit gleichem Inhalt unterdrückt.
+            self._on_send_failed(message.payload)
+        with self._condition:
+            if rc == _MQTT_ERR_NO_CONN:
+                # Verbindung weg, bevor ``on_disconnect`` kam: zurück in den Puffer,
+                # sofern inzwischen kein neuerer Wert wartet.
+                if key not in self._queue:
+                    self._queue[key] = message
+                    self._queue.move_to_end(key, last=False)
+                    self.counters["requeued"] += 1
+                self._condition.wait(0.5)
+                return
+            if rc != _MQTT_ERR_SUCCESS:
+                self.counters["failed"] += 1
+                logger.warning("MQTT-Veröffentlichung fehlgeschlagen (%s): %s", message.topic, rc)
+                return
+            self.counters["published"] += 1
+            acked_at = self._early_acks.pop(info.mid, None)
+            if acked_at is not None:
+                self._record_ack(acked_at - sent_at)
+            else:
+                self._inflight[info.mid] = sent_at
+
+    def _topic_alias(self, message: _Outgoing) -> Tuple[str, Optional[int]]:
+        with self._condition:
+            alias = self._aliases.get(message.topic)
+            if alias is not None:
+                # QoS>0 kann nach einem Neuverbinden erneut gesendet werden,
+                # dann wäre der Alias unbekannt – Topic mitsenden.
+                if message.qos:
+                    return message.topic, alias
+                self.counters["aliased"] += 1
+                return "", alias
+            if len(self._aliases) < self._alias_maximum:
+                alias = self._aliases[message.topic] = len(self._aliases) + 1
+                return message.topic, alias
+        return message.topic, None
+
+    def _on_publish(self, client: Any, userdata: Any, mid: int, *args: Any) -> None:
+        now = self._clock()
+        with self._condition:
+            sent_at = self._inflight.pop(mid, None)
+            if sent_at is None:
+                # Bestätigung kam, bevor ``publish`` die Nachrichten-ID geliefert hat.
+                self._early_acks[mid] = now
+                return
+            self._record_ack(now - sent_at)
+            self._condition.notify_all()
+
+    def _record_ack(self, latency: float) -> None:
+        self.counters["acked"] += 1
+        self._latencies.append(max(0.0, latency))
+
+    def _expire_inflight(self, now: float) -> None:
+        expired = [mid for mid, sent_at in self._inflight.items() if now - sent_at >= self.ack_timeout]
+        for mid in expired:
+            del self._inflight[mid]
+        self.counters["expired"] += len(expired)
+        for mid in [mid for mid, acked_at in self._early_acks.items() if now - acked_at >= self.ack_timeout]:
+            del self._early_acks[mid]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            latencies = sorted(self._latencies)
+            stats: Dict[str, Any] = dict(self.counters)
+            stats.update(
+                online=self._online,
+                topic_aliases=len(self._aliases),
+                queued=len(self._queue),
+                inflight=len(self._inflight),
+                max_queue=self.max_queue,
+                max_inflight=self.max_inflight,
+            )
+        if latencies:
+            stats["ack_latency"] = {
+                "count": len(latencies),
+                "avg": sum(latencies) / len(latencies),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max": latencies[-1],
+            }
+        else:
+            stats["ack_latency"] = None
+        return stats
+
+
+_publishers: Dict[str, MqttPublisher] = {}
+_publishers_lock = threading.Lock()
+
+
+def _register(publisher: MqttPublisher) -> None:
+    with _publishers_lock:
+        _publishers[publisher.name] = publisher
+
+
+def _unregister(publisher: MqttPublisher) -> None:
+    with _publishers_lock:
+        if _publishers.get(publisher.name) is publisher:
+            del _publishers[publisher.name]
+
+
+def publisher_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistics of all running publishers by name."""
+
+    with _publishers_lock:
+        publishers = dict(_publishers)
+    return {name: publisher.stats() for name, publisher in publishers.items()}
+
+
+def clear_publishers() -> None:
+    """Forget all registered publishers (hauptsächlich für Tests)."""
+
+    with _publishers_lock:
+        _publishers.clear()
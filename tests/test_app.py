@@ -4,9 +4,12 @@ from pathlib import Path
 import types
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 # Füge den Projektstamm zum Python-Pfad hinzu
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from auto_config import ChangeFilter, ControlSchedule
 from loxone_data import ControlRow
 
 # Erstelle Dummy-Module für paho.mqtt.client, damit die Tests ohne externe Abhängigkeiten laufen
@@ -59,7 +62,7 @@ def setup_function(function):
     app.reset_message_tracking()
 
 
-def test_send_udp_message_sends_only_once():
+def test_send_udp_message_suppresses_repeats_within_window():
     with patch.object(app.socket, "socket") as mock_socket:
         socket_instance = mock_socket.return_value
 
@@ -68,11 +71,105 @@ def test_send_udp_message_sends_only_once():
         socket_instance.sendto.assert_called_once_with(
             "hello".encode(), (TEST_CONFIG.udp_ip, TEST_CONFIG.udp_port)
         )
-        assert "hello" in app.sent_messages
+        assert "hello" in app.udp_deduplicator(TEST_CONFIG)
 
         app.send_udp_message("hello", TEST_CONFIG)
 
         socket_instance.sendto.assert_called_once()
+        stats = app.udp_stats()[f"{TEST_CONFIG.udp_ip}:{TEST_CONFIG.udp_port}"]
+        assert stats["dedupe"]["suppressed"] == 1
+
+
+def test_message_deduplicator_expires_and_bounds_entries():
+    now = [0.0]
+    dedupe = app.MessageDeduplicator(window=2.0, max_entries=2, clock=lambda: now[0])
+
+    assert dedupe.admit("szene-1")
+    assert not dedupe.admit("szene-1")
+    now[0] = 1.5
+    # Eine Wiederholung verlängert das Fenster nicht.
+    assert not dedupe.admit("szene-1")
+    now[0] = 2.0
+    assert dedupe.admit("szene-1")
+
+    assert dedupe.admit("szene-2")
+    assert dedupe.admit("szene-3")
+    assert len(dedupe) == 2
+    assert "szene-1" not in dedupe
+    assert dedupe.stats()["suppressed"] == 2
+    assert dedupe.stats()["evicted"] == 1
+
+    assert app.MessageDeduplicator(window=0).admit("x")
+
+
+def test_send_udp_message_reuses_one_socket_per_destination():
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="topic",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+        udp_dedupe_window=0.0,
+        udp_sndbuf=65536,
+    )
+    with patch.object(app.socket, "socket") as mock_socket:
+        socket_instance = mock_socket.return_value
+
+        for _ in range(3):
+            app.send_udp_message("hello", config)
+
+        mock_socket.assert_called_once()
+        socket_instance.setsockopt.assert_called_once_with(
+            app.socket.SOL_SOCKET, app.socket.SO_SNDBUF, 65536
+        )
+        assert socket_instance.sendto.call_count == 3
+
+        socket_instance.sendto.side_effect = OSError("Netzwerk nicht erreichbar")
+        app.send_udp_message("hello", config)
+        transport_stats = app.udp_stats()["127.0.0.1:5005"]["transport"]
+        assert transport_stats["sent"] == 3
+        assert transport_stats["send_errors"] == 1
+        assert transport_stats["send_sockets"] == 0
+        socket_instance.close.assert_called_once()
+
+
+def test_udp_transport_receives_large_datagrams_and_counts_truncation():
+    receiver = app.UdpTransport(rcvbuf=1 << 20, max_datagram=2048)
+    sender = app.UdpTransport()
+    try:
+        receiver.bind(("127.0.0.1", 0))
+        address = receiver._receive_socket.getsockname()
+
+        sender.send(b"x" * 1500, address)
+        data, _sender_address = receiver.receive()
+        assert data == b"x" * 1500
+
+        sender.send(b"y" * 4096, address)
+        data, _sender_address = receiver.receive()
+        assert data == b"y" * 2048
+        stats = receiver.stats()
+        assert stats["received"] == 2
+        assert stats["truncated"] == (1 if app._MSG_TRUNC else 0)
+        assert stats["rcvbuf"] > 0
+    finally:
+        receiver.close()
+        sender.close()
+
+
+def test_udp_transport_receives_largest_ipv4_datagram_untruncated():
+    receiver = app.UdpTransport(rcvbuf=1 << 20)
+    sender = app.UdpTransport()
+    try:
+        receiver.bind(("127.0.0.1", 0))
+        address = receiver._receive_socket.getsockname()
+
+        assert sender.send(b"z" * app.UDP_MAX_DATAGRAM, address)
+        data, _sender_address = receiver.receive()
+        assert len(data) == 65507
+        assert receiver.stats()["truncated"] == 0
+    finally:
+        receiver.close()
+        sender.close()
 
 
 def test_on_message_forwards_payload_to_udp():
@@ -201,6 +298,31 @@ def test_format_control_message_falls_back_to_details():
     assert json.loads(message) == {"text": "Info: status: aktiv"}
 
 
+def test_render_plan_matches_json_dumps():
+    control = ControlRow(
+        uuid="uuid-3",
+        name=' Tür "Süd" ',
+        type="Window",
+        room="",
+        category="",
+        details=tuple(),
+        states=(("error", "err"), ("value", "state-a"), ("text", "state-b")),
+        links=tuple(),
+    )
+    plan = app.compile_render_plan(control)
+    values = {"state-a": "offen\n", "state-b": "\\ 5 °"}
+
+    assert plan.state_uuids == ("state-a", "state-b")
+    for icon in (None, "", "2056", "custom"):
+        message = app.render_plan_message(plan, values.get, icon=icon)
+        expected = {"text": 'Tür "Süd": offen \\ 5 °'}
+        if icon:
+            expected = {"text": "offen \\ 5 °", "icon": int(icon) if icon.isdigit() else icon}
+        assert message == json.dumps(expected, ensure_ascii=False)
+
+    assert json.loads(app.render_plan_message(plan)) == {"text": 'Tür "Süd": state-a state-b'}
+
+
 def test_resolve_target_topic_defaults_to_base():
     assert app.resolve_target_topic("awtrix/device/custom", "uuid") == "awtrix/device/custom/uuid"
 
@@ -271,6 +393,9 @@ def test_automatic_mode_notification_publishes_to_notify_topic(monkeypatch):
     ]
     store.get_mode.return_value = "notification"
     store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {}
+    store.get_schedule.return_value = ControlSchedule()
     store.sync_from.return_value = None
 
     client = MagicMock()
@@ -334,6 +459,9 @@ def test_automatic_mode_publishes_clear_message_when_disabled(monkeypatch):
     ]
     store.get_mode.return_value = "app"
     store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {}
+    store.get_schedule.return_value = ControlSchedule()
     store.sync_from.return_value = None
 
     client = MagicMock()
@@ -400,6 +528,9 @@ def test_automatic_mode_app_skips_unchanged_value(monkeypatch):
     store.enabled_ids.side_effect = enabled_ids_side_effect
     store.get_mode.return_value = "app"
     store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {}
+    store.get_schedule.return_value = ControlSchedule()
     store.sync_from.return_value = None
 
     client = MagicMock()
@@ -422,6 +553,150 @@ def test_automatic_mode_app_skips_unchanged_value(monkeypatch):
     assert publish_count == 1
 
 
+def test_automatic_mode_resends_app_messages_after_reconnect():
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="awtrix/device/custom",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+    )
+    payload = {
+        "controls": {
+            "uuid-123": {"name": "Temperatur", "type": "InfoOnlyAnalog", "states": {"value": "state-uuid"}},
+        },
+        "rooms": {},
+        "cats": {},
+    }
+    fetcher = MagicMock()
+    fetcher.load.return_value = payload
+    fetcher.resolve_state_value.return_value = "21°"
+
+    store = MagicMock()
+    store.enabled_ids.side_effect = [{"uuid-123"}, KeyboardInterrupt()]
+    store.get_mode.return_value = "app"
+    store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {}
+    store.get_schedule.return_value = ControlSchedule()
+
+    connection = MagicMock()
+    with pytest.raises(KeyboardInterrupt):
+        app.automatic_mode(
+            config, store, lambda: fetcher, interval_override=0.0, connection=connection
+        )
+
+    listener = connection.add_connect_listener.call_args.args[0]
+    connection.remove_connect_listener.assert_called_once_with(listener)
+    connection.stop.assert_not_called()
+    listener()
+
+    expected = (
+        "awtrix/device/custom/uuid-123",
+        json.dumps({"text": "Temperatur: 21°"}, ensure_ascii=False),
+    )
+    assert [call.args for call in connection.publish.call_args_list] == [expected, expected]
+
+
+def test_automatic_mode_publishes_grouped_controls_as_one_app():
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="awtrix/device/custom",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+    )
+    payload = {
+        "controls": {
+            "temp": {"name": "Temperatur", "type": "InfoOnlyAnalog", "states": {"value": "temp-state"}},
+            "wind": {"name": "Wind", "type": "InfoOnlyAnalog", "states": {"value": "wind-state"}},
+        },
+        "rooms": {},
+        "cats": {},
+    }
+    values = {"temp-state": iter(["21°", "21°", "22°"]), "wind-state": iter(["5 km/h"] * 3)}
+    fetcher = MagicMock()
+    fetcher.load.return_value = payload
+    fetcher.resolve_state_value.side_effect = lambda uuid: next(values[uuid])
+
+    store = MagicMock()
+    store.enabled_ids.side_effect = [{"temp", "wind"}] * 3 + [KeyboardInterrupt()]
+    store.get_mode.return_value = "app"
+    store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {"temp": "wetter", "wind": "wetter"}
+    store.get_schedule.return_value = ControlSchedule()
+
+    connection = MagicMock()
+    with pytest.raises(KeyboardInterrupt):
+        app.automatic_mode(
+            config, store, lambda: fetcher, interval_override=0.0, connection=connection
+        )
+
+    published = [call.args for call in connection.publish.call_args_list]
+    assert [topic for topic, _message in published] == [
+        "awtrix/device/custom/wetter",
+        "awtrix/device/custom/wetter",
+    ]
+    assert [json.loads(message) for _topic, message in published] == [
+        [{"text": "Temperatur: 21°"}, {"text": "Wind: 5 km/h"}],
+        [{"text": "Temperatur: 22°"}, {"text": "Wind: 5 km/h"}],
+    ]
+
+
+def test_automatic_mode_fans_out_to_display_profiles(monkeypatch, tmp_path):
+    from auto_config import AutoConfigStore
+
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="wohnzimmer/custom",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+        mqtt_displays=("kueche/custom",),
+    )
+    payload = {
+        "controls": {
+            "temp": {"name": "Temperatur", "type": "InfoOnlyAnalog", "states": {"value": "temp-state"}},
+            "wind": {"name": "Wind", "type": "InfoOnlyAnalog", "states": {"value": "wind-state"}},
+        },
+        "rooms": {},
+        "cats": {},
+    }
+    fetcher = MagicMock()
+    fetcher.load.return_value = payload
+    fetcher.resolve_state_value.side_effect = {"temp-state": "21°", "wind-state": "5 km/h"}.get
+
+    store = AutoConfigStore(tmp_path / "auto_config.json")
+    store.set_enabled("temp", True)
+    kitchen = store.add_profile("kueche/custom")
+    kitchen.set_enabled("temp", True)
+    kitchen.set_icon("temp", "2056")
+    kitchen.set_enabled("wind", True)
+    kitchen.set_mode("wind", "notification")
+
+    def stop(_timeout):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(app.time, "sleep", stop)
+    connection = MagicMock()
+    with pytest.raises(KeyboardInterrupt):
+        app.automatic_mode(
+            config, store, lambda: fetcher, interval_override=0.0, connection=connection
+        )
+
+    # Jeder Zustand wird für alle Uhren nur einmal abgefragt.
+    fetcher.load.assert_called_once()
+    fetcher.resolve_many.assert_called_once()
+    assert sorted(fetcher.resolve_many.call_args.args[0]) == ["temp-state", "wind-state"]
+    published = {call.args[0]: json.loads(call.args[1]) for call in connection.publish.call_args_list}
+    assert published == {
+        "wohnzimmer/custom/temp": {"text": "Temperatur: 21°"},
+        "kueche/custom/temp": {"text": "21°", "icon": 2056},
+        "kueche/notify": {"text": "Wind: 5 km/h"},
+    }
+
+
 def test_automatic_mode_app_publishes_on_value_change(monkeypatch):
     """App mode should re-publish when the value changes."""
     config = app.Config(
@@ -467,6 +742,9 @@ def test_automatic_mode_app_publishes_on_value_change(monkeypatch):
     store.enabled_ids.side_effect = enabled_ids_side_effect
     store.get_mode.return_value = "app"
     store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {}
+    store.get_schedule.return_value = ControlSchedule()
     store.sync_from.return_value = None
 
     client = MagicMock()
@@ -533,6 +811,9 @@ def test_automatic_mode_app_refreshes_unchanged_value_every_minute(monkeypatch):
     store.enabled_ids.side_effect = enabled_ids_side_effect
     store.get_mode.return_value = "app"
     store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {}
+    store.get_schedule.return_value = ControlSchedule()
     store.sync_from.return_value = None
 
     client = MagicMock()
@@ -557,3 +838,399 @@ def test_automatic_mode_app_refreshes_unchanged_value_every_minute(monkeypatch):
 
     # Same value should still be refreshed once 60s have elapsed
     assert publish_count == 2
+
+
+def test_automatic_mode_prefers_streamed_values(monkeypatch):
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="awtrix/device/custom",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+    )
+
+    payload = {
+        "controls": {
+            "uuid-123": {
+                "name": "Temperatur",
+                "type": "InfoOnlyAnalog",
+                "states": {"value": "state-uuid", "other": "other-uuid"},
+            }
+        },
+    }
+
+    fetcher = MagicMock()
+    fetcher.load.return_value = payload
+    fetcher.resolve_state_value.return_value = "http"
+    fetcher_factory = MagicMock(return_value=fetcher)
+
+    stream = MagicMock()
+    stream.resolve_state_value.side_effect = lambda uuid: "21.5" if uuid == "state-uuid" else None
+    stream.wait_for_change.return_value = True
+
+    store = MagicMock()
+    store.enabled_ids.side_effect = [{"uuid-123"}, KeyboardInterrupt()]
+    store.get_mode.return_value = "app"
+    store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {}
+    store.get_schedule.return_value = ControlSchedule()
+
+    client = MagicMock()
+    monkeypatch.setattr(app, "create_mqtt_client", lambda *_: client)
+
+    try:
+        app.automatic_mode(config, store, fetcher_factory, state_stream=stream)
+    except KeyboardInterrupt:
+        pass
+
+    topic_messages = [call.args for call in client.publish.call_args_list]
+    assert (
+        "awtrix/device/custom/uuid-123",
+        json.dumps({"text": "Temperatur: http 21.5"}, ensure_ascii=False),
+    ) in topic_messages
+    fetcher.resolve_state_value.assert_called_once_with("other-uuid")
+    stream.wait_for_change.assert_called_once()
+    assert stream.wait_for_change.call_args.args[0] == pytest.approx(config.automatic_interval)
+
+
+def test_automatic_mode_rerenders_only_controls_with_streamed_changes(monkeypatch):
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="awtrix/device/custom",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+    )
+
+    payload = {
+        "controls": {
+            "uuid-1": {"name": "A", "states": {"value": "state-a"}},
+            "uuid-2": {"name": "B", "states": {"value": "state-b"}},
+        },
+    }
+
+    fetcher = MagicMock()
+    fetcher.load.return_value = payload
+    fetcher.resolve_many.return_value = {"state-a": "1", "state-b": "2"}
+
+    streamed = {}
+    stream = MagicMock()
+    stream.resolve_state_value.side_effect = streamed.get
+    stream.take_changes.side_effect = [set(), {"state-a"}]
+    stream.wait_for_change.side_effect = lambda _timeout: streamed.update({"state-a": "5"})
+
+    store = MagicMock()
+    store.enabled_ids.side_effect = [{"uuid-1", "uuid-2"}, {"uuid-1", "uuid-2"}, KeyboardInterrupt()]
+    store.get_mode.return_value = "app"
+    store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {}
+    store.get_schedule.return_value = ControlSchedule()
+
+    connection = MagicMock()
+    monkeypatch.setattr(app.time, "monotonic", lambda: 1000.0)
+
+    try:
+        app.automatic_mode(
+            config,
+            store,
+            MagicMock(return_value=fetcher),
+            state_stream=stream,
+            connection=connection,
+        )
+    except KeyboardInterrupt:
+        pass
+
+    messages = [call.args[1] for call in connection.publish.call_args_list]
+    assert sorted(messages[:2]) == [json.dumps({"text": "A: 1"}), json.dumps({"text": "B: 2"})]
+    assert messages[2:] == [json.dumps({"text": "A: 5"})]
+    stream.watch.assert_called_once_with({"state-a", "state-b"})
+    fetcher.resolve_many.assert_called_once()
+    fetcher.resolve_state_value.assert_not_called()
+    fetcher.load.assert_called_once()
+
+
+def test_automatic_mode_keeps_config_of_a_miniserver_that_timed_out(monkeypatch, tmp_path):
+    import itertools
+    import threading
+
+    from auto_config import AutoConfigStore
+    from loxone_data import LoxoneDataFetcher, LoxoneDataSource
+    from loxone_federation import MiniserverFederation
+
+    class FakeFetcher(LoxoneDataFetcher):
+        def __init__(self, payload, gate=None):
+            super().__init__(LoxoneDataSource())
+            self.payload = payload
+            self.gate = gate
+
+        def load(self):
+            if self.gate is not None:
+                self.gate.wait(5)
+            return self.payload
+
+        def resolve_state_value(self, candidate):
+            return "1"
+
+    def structure(prefix):
+        return {
+            "lastModified": "2024-01-01 10:00:00",
+            "controls": {f"{prefix}-control": {"name": prefix, "states": {"value": f"{prefix}-state"}}},
+        }
+
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="awtrix/device/custom",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+    )
+    store = AutoConfigStore(tmp_path / "auto_config.json")
+    for uuid in ("a-control", "b-control"):
+        store.set_enabled(uuid, True)
+    store.set_mode("b-control", "notification")
+
+    gate = threading.Event()
+    garage = FakeFetcher(structure("b"), gate=gate)
+    federation = MiniserverFederation({"main": FakeFetcher(structure("a")), "garage": garage}, timeout=0.05)
+    survived = []
+
+    def fake_sleep(_seconds):
+        survived.append((store.enabled_ids(), store.get_mode("b-control")))
+        if len(survived) > 1:
+            raise KeyboardInterrupt
+        # Der Client antwortet erst nach dem ersten Durchlauf.
+        gate.set()
+        federation._loading["garage"].result(timeout=5)
+
+    monkeypatch.setattr(app.time, "monotonic", lambda ticks=itertools.count(0, 1000): next(ticks))
+    monkeypatch.setattr(app.time, "sleep", fake_sleep)
+
+    try:
+        app.automatic_mode(config, store, lambda: federation, connection=MagicMock())
+    except KeyboardInterrupt:
+        pass
+
+    assert survived == [({"a-control", "b-control"}, "notification")] * 2
+    assert AutoConfigStore(tmp_path / "auto_config.json").get_mode("b-control") == "notification"
+
+
+def test_automatic_mode_resolves_states_in_one_batch(monkeypatch):
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="awtrix/device/custom",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+    )
+
+    payload = {
+        "controls": {
+            "uuid-1": {"name": "A", "states": {"value": "state-a", "error": "err-a"}},
+            "uuid-2": {"name": "B", "states": {"value": "state-b"}},
+        },
+    }
+
+    fetcher = MagicMock()
+    fetcher.load.return_value = payload
+    fetcher.resolve_many.return_value = {"state-a": "1", "state-b": "2"}
+
+    store = MagicMock()
+    store.enabled_ids.side_effect = [{"uuid-1", "uuid-2"}, KeyboardInterrupt()]
+    store.get_mode.return_value = "app"
+    store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {}
+    store.get_schedule.return_value = ControlSchedule()
+
+    connection = MagicMock()
+
+    try:
+        app.automatic_mode(
+            config, store, lambda: fetcher, interval_override=0.0, connection=connection
+        )
+    except KeyboardInterrupt:
+        pass
+
+    fetcher.resolve_many.assert_called_once()
+    assert sorted(fetcher.resolve_many.call_args.args[0]) == ["state-a", "state-b"]
+    # Formatiert wird mit den Werten des Stapels, ohne erneute Einzelabfrage.
+    fetcher.resolve_state_value.assert_not_called()
+    messages = sorted(json.loads(call.args[1])["text"] for call in connection.publish.call_args_list)
+    assert messages == ["A: 1", "B: 2"]
+
+
+def test_change_gate_deadband_hysteresis_and_interval():
+    gate = app.ChangeGate(ChangeFilter(absolute=0.5, hysteresis=0.5, min_interval=10))
+
+    assert gate.accept(("21.0°C",), 0) is True
+    assert gate.accept(("22.0°C",), 5) is False  # min_interval
+    assert gate.accept(("21.3°C",), 20) is False  # deadband
+    assert gate.accept(("21.6°C",), 20) is True
+    assert gate.accept(("20.8°C",), 40) is False  # Richtungswechsel: Hysterese
+    assert gate.accept(("20.5°C",), 40) is True
+    assert gate.accept(("offen",), 60) is True
+
+
+def test_automatic_mode_filter_skips_formatting_inside_deadband(monkeypatch):
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="awtrix/device/custom",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+    )
+    payload = {
+        "controls": {
+            "uuid-123": {"name": "Leistung", "type": "InfoOnlyAnalog", "states": {"value": "state-uuid"}}
+        },
+        "rooms": {},
+        "cats": {},
+    }
+    values = iter(["1000 W", "1004 W", "1100 W"])
+    fetcher = MagicMock()
+    fetcher.load.return_value = payload
+    fetcher.resolve_state_value.side_effect = lambda _uuid: current[0]
+    current = [None]
+
+    def enabled_ids():
+        try:
+            current[0] = next(values)
+        except StopIteration:
+            raise KeyboardInterrupt()
+        return {"uuid-123"}
+
+    store = MagicMock()
+    store.enabled_ids.side_effect = enabled_ids
+    store.get_mode.return_value = "notification"
+    store.get_icon.return_value = ""
+    store.get_filter.return_value = ChangeFilter(relative=0.01)
+    store.groups_mapping.return_value = {}
+    store.get_schedule.return_value = ControlSchedule()
+    client = MagicMock()
+    monkeypatch.setattr(app, "create_mqtt_client", lambda *_: client)
+    rendered = []
+    original = app.render_plan_message
+
+    def counting_render(*args, **kwargs):
+        rendered.append(args[0])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(app, "render_plan_message", counting_render)
+
+    try:
+        app.automatic_mode(config, store, lambda: fetcher, interval_override=0.0)
+    except KeyboardInterrupt:
+        pass
+
+    texts = [json.loads(call.args[1])["text"] for call in client.publish.call_args_list]
+    assert texts == ["Leistung: 1000 W", "Leistung: 1100 W"]
+    assert len(rendered) == 2
+
+
+def test_poll_scheduler_orders_by_due_time():
+    scheduler = app.PollScheduler()
+    scheduler.schedule("slow", 600)
+    scheduler.schedule("fast", 1)
+    scheduler.schedule("fast", 2)
+
+    assert scheduler.next_due() == 2
+    assert scheduler.pop_due(1) == []
+    assert scheduler.pop_due(600) == ["fast", "slow"]
+    assert scheduler.next_due() is None
+
+
+def test_automatic_mode_polls_each_control_at_its_interval(monkeypatch):
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="awtrix/device/custom",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+        automatic_interval=60.0,
+    )
+    payload = {
+        "controls": {
+            "door": {"name": "Tür", "type": "InfoOnlyDigital", "states": {"active": "door-state"}},
+            "weather": {"name": "Wetter", "type": "InfoOnlyAnalog", "states": {"value": "weather-state"}},
+        },
+        "rooms": {},
+        "cats": {},
+    }
+    requested = []
+    fetcher = MagicMock()
+    fetcher.load.return_value = payload
+    fetcher.resolve_state_value.side_effect = lambda uuid: requested.append(uuid) or "1"
+
+    ticks = iter([0.0, 1.0, 2.0])
+    store = MagicMock()
+    store.enabled_ids.return_value = {"door", "weather"}
+    store.get_mode.return_value = "notification"
+    store.get_icon.return_value = ""
+    store.get_filter.return_value = None
+    store.groups_mapping.return_value = {}
+    store.get_schedule.side_effect = lambda uuid: (
+        ControlSchedule(poll_interval=1) if uuid == "door" else ControlSchedule(poll_interval=600)
+    )
+    client = MagicMock()
+    monkeypatch.setattr(app, "create_mqtt_client", lambda *_: client)
+    monkeypatch.setattr(app.time, "monotonic", lambda: next(ticks))
+    sleeps = []
+    monkeypatch.setattr(app.time, "sleep", sleeps.append)
+
+    with pytest.raises(StopIteration):
+        app.automatic_mode(config, store, lambda: fetcher)
+
+    assert requested.count("door-state") == 3
+    assert requested.count("weather-state") == 1
+    assert fetcher.load.call_count == 1
+    assert sleeps == [1.0, 1.0, 1.0]
+
+
+def test_automatic_mode_backs_off_while_miniserver_fails(monkeypatch):
+    config = app.Config(
+        mqtt_broker="broker",
+        mqtt_port=1883,
+        mqtt_topic="awtrix/device/custom",
+        udp_ip="127.0.0.1",
+        udp_port=5005,
+        automatic_interval=60.0,
+    )
+    fetcher = MagicMock()
+    fetcher.load.side_effect = ConnectionError("Miniserver nicht erreichbar")
+    store = MagicMock()
+    store.enabled_ids.return_value = {"door"}
+    store.groups_mapping.return_value = {}
+
+    sleeps = []
+
+    def record_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 8:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(app.time, "monotonic", lambda: 0.0)
+    monkeypatch.setattr(app.time, "sleep", record_sleep)
+
+    with pytest.raises(KeyboardInterrupt):
+        app.automatic_mode(config, store, lambda: fetcher, connection=MagicMock())
+
+    # Nie 0 s warten: die Pause verdoppelt sich bis zum Automatik-Intervall.
+    assert sleeps == [1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 60.0, 60.0]
+    assert fetcher.load.call_count == 8
+
+
+def test_adaptive_poller_shrinks_on_change_and_backs_off():
+    poller = app.AdaptivePoller(min_interval=1, max_interval=8, window=3600)
+
+    assert poller.observe("uuid", ("1",), 0, 60) == 8
+    assert poller.observe("uuid", ("2",), 8, 60) == 1
+    assert poller.observe("uuid", ("2",), 9, 60) == 2
+    assert poller.observe("uuid", ("2",), 11, 60) == 4
+    assert poller.observe("uuid", ("2",), 15, 60) == 8
+    assert poller.observe("uuid", ("2",), 23, 60) == 8
+    assert poller.stats() == {"uuid": {"interval": 8, "changes_per_hour": 1.0}}
+
+    poller.forget("uuid")
+    assert poller.stats() == {}
@@ -1,9 +1,11 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from auto_config import AutoConfigStore
+from auto_config import AutoConfigStore, ChangeFilter, ControlSchedule
 
 
 def test_store_roundtrip(tmp_path: Path) -> None:
@@ -64,3 +66,108 @@ def test_icon_sync(tmp_path: Path) -> None:
 
     assert store.get_icon("keep") == "100"
     assert store.get_icon("remove") == ""
+
+
+def test_store_forget(tmp_path: Path) -> None:
+    store = AutoConfigStore(tmp_path / "config.json")
+    store.set_enabled("keep", True)
+    store.set_enabled("remove", True)
+    store.set_mode("remove", "notification")
+    store.set_icon("remove", "200")
+
+    store.forget(["remove", "unknown"])
+
+    assert store.enabled_ids() == {"keep"}
+    assert store.modes_mapping() == {}
+    assert store.get_icon("remove") == ""
+
+
+def test_filter_roundtrip(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    store = AutoConfigStore(config_path)
+
+    store.set_filter("uuid-1", ChangeFilter(absolute=0.5, min_interval=30))
+    store.set_filter("uuid-2", ChangeFilter())
+
+    reloaded = AutoConfigStore(config_path)
+    assert reloaded.get_filter("uuid-1") == ChangeFilter(absolute=0.5, min_interval=30)
+    assert reloaded.get_filter("uuid-2") is None
+
+    reloaded.sync_from(["uuid-2"])
+    assert reloaded.filters_mapping() == {}
+
+    with pytest.raises(ValueError):
+        ChangeFilter(relative=-1)
+
+
+def test_schedule_roundtrip(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    store = AutoConfigStore(config_path)
+
+    assert store.get_schedule("door") == ControlSchedule()
+    store.set_schedule("door", ControlSchedule(poll_interval=1, refresh_interval=30))
+
+    reloaded = AutoConfigStore(config_path)
+    assert reloaded.get_schedule("door") == ControlSchedule(poll_interval=1, refresh_interval=30)
+    assert reloaded.schedules_mapping() == {"door": {"poll_interval": 1.0, "refresh_interval": 30.0}}
+
+    reloaded.set_schedule("door", ControlSchedule())
+    assert reloaded.schedules_mapping() == {}
+
+
+def test_group_roundtrip(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    store = AutoConfigStore(config_path)
+
+    store.set_group("temp", " wetter ")
+    with pytest.raises(ValueError):
+        store.set_group("wind", "wetter/aussen")
+
+    reloaded = AutoConfigStore(config_path)
+    assert reloaded.get_group("temp") == "wetter"
+    assert reloaded.groups_mapping() == {"temp": "wetter"}
+
+    reloaded.forget(["temp"])
+    assert reloaded.get_group("temp") == ""
+
+
+def test_display_profiles_keep_their_own_selection(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    store = AutoConfigStore(config_path)
+
+    store.set_enabled("temp", True)
+    kitchen = store.add_profile("kueche/custom/")
+    kitchen.set_enabled("wind", True)
+    kitchen.set_mode("wind", "notification")
+    kitchen.set_icon("wind", "1234")
+    with pytest.raises(ValueError):
+        store.add_profile("kueche/#")
+
+    reloaded = AutoConfigStore(config_path)
+    assert reloaded.profiles() == ["kueche/custom"]
+    assert reloaded.enabled_ids() == {"temp"}
+    kitchen = reloaded.profile("kueche/custom")
+    assert kitchen.enabled_ids() == {"wind"}
+    assert kitchen.get_mode("wind") == "notification"
+    assert kitchen.get_icon("wind") == "1234"
+    assert reloaded.get_mode("wind") == "app"
+
+    reloaded.sync_from(["temp"])
+    assert kitchen.as_mapping() == {}
+    reloaded.remove_profile("kueche/custom")
+    assert AutoConfigStore(config_path).profiles() == []
+
+
+def test_store_updating_saves_profile_changes(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    store = AutoConfigStore(config_path)
+    store.set_enabled("temp", True)
+
+    with pytest.raises(RuntimeError):
+        with store.updating():
+            raise RuntimeError("abgebrochen")
+    store.add_profile("kueche/custom").set_icon("temp", "42")
+
+    reloaded = AutoConfigStore(config_path)
+    assert reloaded.profile("kueche/custom").get_icon("temp") == "42"
+    assert reloaded.enabled_ids() == {"temp"}
@@ -6,7 +6,25 @@ import pytest
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from loxone_data import ControlRow, LoxoneDataFetcher, LoxoneDataSource
+from loxone_data import (
+    PRIORITY_AUTOMATIC,
+    PRIORITY_DEBUG,
+    ControlRow,
+    LoxoneDataFetcher,
+    LoxoneDataSource,
+    RateLimiter,
+    RateLimitExceeded,
+    clear_rate_limiters,
+    close_shared_sessions,
+    request_priority,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_sessions():
+    yield
+    close_shared_sessions()
+    clear_rate_limiters()
 
 
 @pytest.fixture()
@@ -75,6 +93,32 @@ def test_extract_controls_creates_rows(sample_payload: Path) -> None:
     assert second.details == tuple()
 
 
+def test_control_rows_are_compact_and_share_strings() -> None:
+    data = {
+        "rooms": {"room-1": {"name": "Wohnzimmer"}},
+        "controls": {
+            uuid: {
+                "name": uuid,
+                "type": "Switch",
+                "room": "room-1",
+                "details": {"format": "%.1f"},
+                "states": {"active": f"{uuid}-state"},
+            }
+            for uuid in ("a", "b")
+        },
+    }
+
+    first, second = LoxoneDataFetcher.extract_controls(data)
+
+    assert not hasattr(first, "__dict__")
+    assert first.type is second.type
+    assert first.room is second.room
+    assert first.states[0][0] is second.states[0][0]
+    assert isinstance(first._details, dict)
+    assert first.details == (("format", "%.1f"),)
+    assert first.details is first._details
+
+
 def test_data_source_from_env_derives_template(monkeypatch):
     monkeypatch.setenv("LOXONE_URL", "http://miniserver.local/data/LoxAPP3.json")
     monkeypatch.delenv("LOXONE_STATE_URL_TEMPLATE", raising=False)
@@ -108,7 +152,8 @@ def test_resolve_state_value_fetches_and_caches(monkeypatch):
     response.raise_for_status.return_value = None
 
     mock_requests = MagicMock()
-    mock_requests.get.return_value = response
+    session = mock_requests.Session.return_value
+    session.get.return_value = response
 
     monkeypatch.setitem(sys.modules, "requests", mock_requests)
 
@@ -119,7 +164,7 @@ def test_resolve_state_value_fetches_and_caches(monkeypatch):
 
     assert first == "48.7"
     assert second == "48.7"
-    mock_requests.get.assert_called_once_with(
+    session.get.assert_called_once_with(
         "http://host/jdev/sps/io/01234567-89ab-cdef-0123-456789abcdef/state",
         auth=source.auth,
         timeout=fetcher.timeout,
@@ -136,7 +181,8 @@ def test_resolve_state_value_handles_ll_payload(monkeypatch):
     response.raise_for_status.return_value = None
 
     mock_requests = MagicMock()
-    mock_requests.get.return_value = response
+    session = mock_requests.Session.return_value
+    session.get.return_value = response
 
     monkeypatch.setitem(sys.modules, "requests", mock_requests)
 
@@ -164,7 +210,8 @@ def test_resolve_state_value_handles_loxone_uuid_format(monkeypatch):
     response.raise_for_status.return_value = None
 
     mock_requests = MagicMock()
-    mock_requests.get.return_value = response
+    session = mock_requests.Session.return_value
+    session.get.return_value = response
 
     monkeypatch.setitem(sys.modules, "requests", mock_requests)
 
@@ -173,7 +220,7 @@ def test_resolve_state_value_handles_loxone_uuid_format(monkeypatch):
     result = fetcher.resolve_state_value(uuid)
 
     assert result == "0.0 Lx"
-    mock_requests.get.assert_called_once()
+    session.get.assert_called_once()
 
 
 def test_resolve_state_value_returns_error_message(monkeypatch):
@@ -181,7 +228,8 @@ def test_resolve_state_value_returns_error_message(monkeypatch):
     fetcher = LoxoneDataFetcher(source)
 
     mock_requests = MagicMock()
-    mock_requests.get.side_effect = RuntimeError("kaputt")
+    session = mock_requests.Session.return_value
+    session.get.side_effect = RuntimeError("kaputt")
 
     monkeypatch.setitem(sys.modules, "requests", mock_requests)
 
@@ -209,8 +257,9 @@ def test_resolve_state_value_falls_back_without_state_suffix(monkeypatch):
     fail_response.raise_for_status.side_effect = RuntimeError("500 Server Error")
 
     mock_requests = MagicMock()
+    session = mock_requests.Session.return_value
     # First call (/state) fails, second call (without /state) succeeds
-    mock_requests.get.side_effect = [fail_response, ok_response]
+    session.get.side_effect = [fail_response, ok_response]
 
     monkeypatch.setitem(sys.modules, "requests", mock_requests)
 
@@ -219,10 +268,10 @@ def test_resolve_state_value_falls_back_without_state_suffix(monkeypatch):
     result = fetcher.resolve_state_value(uuid)
 
     assert result == "1"
-    assert mock_requests.get.call_count == 2
+    assert session.get.call_count == 2
     # First call: with /state, second call: without /state
-    first_url = mock_requests.get.call_args_list[0][0][0]
-    second_url = mock_requests.get.call_args_list[1][0][0]
+    first_url = session.get.call_args_list[0][0][0]
+    second_url = session.get.call_args_list[1][0][0]
     assert first_url.endswith("/state")
     assert not second_url.endswith("/state")
 
@@ -236,7 +285,8 @@ def test_resolve_state_raw_returns_json(monkeypatch):
     response.raise_for_status.return_value = None
 
     mock_requests = MagicMock()
-    mock_requests.get.return_value = response
+    session = mock_requests.Session.return_value
+    session.get.return_value = response
 
     monkeypatch.setitem(sys.modules, "requests", mock_requests)
 
@@ -248,3 +298,518 @@ def test_resolve_state_raw_returns_json(monkeypatch):
     import json
     parsed = json.loads(result)
     assert parsed["LL"]["value"] == "42"
+
+
+def _structure_requests(versions, payload):
+    """Mock requests module serving a version endpoint and LoxAPP3.json."""
+
+    version_values = iter(versions)
+
+    def get(url, auth=None, timeout=None):
+        response = MagicMock()
+        response.raise_for_status.return_value = None
+        if url.endswith("LoxAPPversion3"):
+            response.json.return_value = {"LL": {"value": next(version_values), "Code": "200"}}
+        else:
+            response.json.return_value = dict(payload)
+        return response
+
+    mock_requests = MagicMock()
+    session = mock_requests.Session.return_value
+    session.get.side_effect = get
+    return mock_requests
+
+
+def test_load_skips_download_when_version_unchanged(monkeypatch):
+    from loxone_data import clear_structure_cache
+
+    clear_structure_cache()
+    payload = {"lastModified": "2024-01-01 10:00:00", "controls": {"c": {"name": "A"}}}
+    mock_requests = _structure_requests(
+        ["2024-01-01 10:00:00", "2024-01-01 10:00:00", "2024-02-01 08:00:00"], payload
+    )
+    monkeypatch.setitem(sys.modules, "requests", mock_requests)
+    source = LoxoneDataSource(
+        url="http://host/data/LoxAPP3.json",
+        version_url="http://host/jdev/sps/LoxAPPversion3",
+    )
+
+    first = LoxoneDataFetcher(source).load()
+    first_rows = LoxoneDataFetcher.extract_controls(first)
+    second = LoxoneDataFetcher(source).load()
+    second_rows = LoxoneDataFetcher.extract_controls(second)
+    LoxoneDataFetcher(source).load()
+
+    session = mock_requests.Session.return_value
+    urls = [call.args[0] for call in session.get.call_args_list]
+    assert urls.count("http://host/data/LoxAPP3.json") == 2
+    assert urls.count("http://host/jdev/sps/LoxAPPversion3") == 3
+    assert second is first
+    assert second_rows[0] is first_rows[0]
+    clear_structure_cache()
+
+
+def test_data_source_from_env_derives_version_url(monkeypatch):
+    monkeypatch.delenv("LOXONE_URL", raising=False)
+    monkeypatch.delenv("LOXONE_VERSION_URL", raising=False)
+    monkeypatch.setenv("LOXONE_HOSTNAME", "miniserver.local")
+
+    source = LoxoneDataSource.from_env()
+
+    assert source.version_url == "http://miniserver.local/jdev/sps/LoxAPPversion3"
+
+
+def test_load_serves_disk_cache_after_restart(monkeypatch, tmp_path: Path):
+    from loxone_data import clear_structure_cache
+
+    clear_structure_cache()
+    payload = {
+        "lastModified": "2024-01-01 10:00:00",
+        "rooms": {"r": {"name": "Küche"}},
+        "controls": {"c": {"name": "A", "room": "r"}},
+    }
+    monkeypatch.setitem(
+        sys.modules, "requests", _structure_requests(["2024-01-01 10:00:00"], payload)
+    )
+    source = LoxoneDataSource(
+        url="http://host/data/LoxAPP3.json",
+        version_url="http://host/jdev/sps/LoxAPPversion3",
+        cache_path=tmp_path / "structure.cache",
+    )
+    LoxoneDataFetcher(source).load()
+    assert source.cache_path.exists()
+
+    # Neustart simulieren: Speicher-Cache leer, Miniserver nicht erreichbar.
+    clear_structure_cache()
+    offline = MagicMock()
+    offline.Session.return_value.get.side_effect = RuntimeError("offline")
+    monkeypatch.setitem(sys.modules, "requests", offline)
+
+    fetcher = LoxoneDataFetcher(source)
+    data = fetcher.load()
+    rows = fetcher.extract_controls(data)
+    fetcher._revalidation.join(timeout=1)
+
+    assert data["lastModified"] == "2024-01-01 10:00:00"
+    assert [(row.uuid, row.room) for row in rows] == [("c", "Küche")]
+    assert offline.Session.return_value.get.called
+    clear_structure_cache()
+
+
+def test_disk_cache_is_plain_json_and_keeps_full_structure_when_stream_parsing(
+    monkeypatch, tmp_path: Path
+):
+    import io
+    import json
+
+    from loxone_data import clear_structure_cache
+
+    clear_structure_cache()
+    payload = {
+        "lastModified": "2024-01-01 10:00:00",
+        "cats": {"k": {"name": "Licht"}},
+        "controls": {"c": {"name": "A", "type": "Switch", "cat": "k", "states": {"active": "s"}}},
+    }
+    response = MagicMock()
+    response.raw = io.BytesIO(json.dumps(payload).encode("utf-8"))
+    online = MagicMock()
+    online.Session.return_value.get.return_value = response
+    monkeypatch.setitem(sys.modules, "requests", online)
+    source = LoxoneDataSource(
+        url="http://host/data/LoxAPP3.json",
+        cache_path=tmp_path / "structure.json",
+        stream_parse=True,
+    )
+    LoxoneDataFetcher(source).load()
+
+    stored = json.loads(source.cache_path.read_text(encoding="utf-8"))
+    assert stored["url"] == source.url
+    assert stored["version"] == "2024-01-01 10:00:00"
+    assert stored["payload"] == payload
+
+    # Neustart: die Zeilen werden aus der gespeicherten Rohstruktur neu gebaut.
+    clear_structure_cache()
+    offline = MagicMock()
+    offline.Session.return_value.get.side_effect = RuntimeError("offline")
+    monkeypatch.setitem(sys.modules, "requests", offline)
+    fetcher = LoxoneDataFetcher(source)
+    rows = fetcher.extract_controls(fetcher.load())
+    fetcher._revalidation.join(timeout=1)
+
+    assert [(row.uuid, row.name, row.type, row.category) for row in rows] == [
+        ("c", "A", "Switch", "Licht")
+    ]
+    clear_structure_cache()
+
+
+def test_unreadable_disk_cache_is_ignored(tmp_path: Path):
+    from loxone_data import _read_disk_cache
+
+    path = tmp_path / "structure.cache"
+    path.write_bytes(b"\x80\x04\x95 kein JSON")
+
+    assert _read_disk_cache(path, "http://host/data/LoxAPP3.json") is None
+
+
+def test_fetchers_share_one_pooled_session(monkeypatch):
+    response = MagicMock()
+    response.json.return_value = {"value": 1}
+    response.raise_for_status.return_value = None
+
+    mock_requests = MagicMock()
+    mock_requests.Session.return_value.get.return_value = response
+    monkeypatch.setitem(sys.modules, "requests", mock_requests)
+
+    source = LoxoneDataSource(
+        state_url_template="http://host/jdev/sps/io/{uuid}/state", pool_size=8, max_retries=3
+    )
+    LoxoneDataFetcher(source).resolve_state_value("01234567-89ab-cdef-0123-456789abcdef")
+    LoxoneDataFetcher(source).resolve_state_value("89abcdef-0123-4567-89ab-cdef01234567")
+
+    mock_requests.Session.assert_called_once_with()
+    assert mock_requests.Session.return_value.get.call_count == 2
+    adapter_kwargs = mock_requests.adapters.HTTPAdapter.call_args.kwargs
+    assert adapter_kwargs["pool_maxsize"] == 8
+    assert mock_requests.adapters.Retry.call_args.kwargs["total"] == 3
+
+
+def test_resolve_many_runs_requests_concurrently(monkeypatch):
+    import threading
+
+    in_flight = []
+    peak = [0]
+    lock = threading.Lock()
+    release = threading.Barrier(3, timeout=2)
+
+    def get(url, auth=None, timeout=None):
+        with lock:
+            in_flight.append(url)
+            peak[0] = max(peak[0], len(in_flight))
+        release.wait()
+        with lock:
+            in_flight.remove(url)
+        response = MagicMock()
+        response.raise_for_status.return_value = None
+        response.json.return_value = {"LL": {"value": url.split("/")[-2][:4]}}
+        return response
+
+    mock_requests = MagicMock()
+    mock_requests.Session.return_value.get.side_effect = get
+    monkeypatch.setitem(sys.modules, "requests", mock_requests)
+
+    fetcher = LoxoneDataFetcher(
+        LoxoneDataSource(state_url_template="http://host/jdev/sps/io/{uuid}/state", pool_size=3)
+    )
+    uuids = [
+        "aaaa0000-0000-0000-0000-000000000000",
+        "bbbb0000-0000-0000-0000-000000000000",
+        "cccc0000-0000-0000-0000-000000000000",
+        "aaaa0000-0000-0000-0000-000000000000",
+    ]
+
+    result = fetcher.resolve_many(uuids)
+
+    assert result == {uuids[0]: "aaaa", uuids[1]: "bbbb", uuids[2]: "cccc"}
+    assert peak[0] == 3
+    assert mock_requests.Session.return_value.get.call_count == 3
+
+
+def test_resolve_many_returns_batch_values_after_cache_expiry(monkeypatch):
+    from loxone_data import StateCache
+
+    response = MagicMock()
+    response.raise_for_status.return_value = None
+    response.json.return_value = {"LL": {"value": "7"}}
+    mock_requests = MagicMock()
+    mock_requests.Session.return_value.get.return_value = response
+    monkeypatch.setitem(sys.modules, "requests", mock_requests)
+
+    # TTL < 0: jeder Eintrag ist sofort abgelaufen, wie bei einem langen Stapel.
+    fetcher = LoxoneDataFetcher(
+        LoxoneDataSource(state_url_template="http://host/jdev/sps/io/{uuid}/state", pool_size=2),
+        state_cache=StateCache(ttl=-1.0),
+    )
+    uuids = [
+        "aaaa0000-0000-0000-0000-000000000000",
+        "bbbb0000-0000-0000-0000-000000000000",
+        "cccc0000-0000-0000-0000-000000000000",
+    ]
+
+    assert fetcher.resolve_many(uuids) == {uuid: "7" for uuid in uuids}
+    assert mock_requests.Session.return_value.get.call_count == 3
+
+
+def test_resolve_many_keeps_request_priority_in_workers(monkeypatch):
+    from loxone_data import _request_priority
+
+    fetcher = LoxoneDataFetcher(LoxoneDataSource(pool_size=3))
+    seen = {}
+
+    def resolve(candidate):
+        seen[candidate] = _request_priority.get()
+        return candidate
+
+    monkeypatch.setattr(fetcher, "resolve_state_value", resolve)
+
+    with request_priority(PRIORITY_DEBUG):
+        fetcher.resolve_many(["a", "b", "c"])
+
+    assert seen == {"a": PRIORITY_DEBUG, "b": PRIORITY_DEBUG, "c": PRIORITY_DEBUG}
+
+
+def test_state_cache_expires_and_evicts():
+    from loxone_data import StateCache
+
+    now = [0.0]
+    cache = StateCache(ttl=10.0, max_entries=2, clock=lambda: now[0])
+
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")  # "b" ist am längsten unbenutzt
+
+    assert "b" not in cache
+    assert cache.get("c") == "3"
+    now[0] = 11.0
+    assert cache.get("a", "missing") == "missing"
+    assert cache.get_stale("a") == "1"
+    assert cache.stats() == {"entries": 2, "hits": 2, "misses": 1, "evictions": 1}
+
+
+def test_fetchers_share_state_cache(monkeypatch):
+    from loxone_data import StateCache
+
+    response = MagicMock()
+    response.json.return_value = {"value": 5}
+    response.raise_for_status.return_value = None
+    mock_requests = MagicMock()
+    mock_requests.Session.return_value.get.return_value = response
+    monkeypatch.setitem(sys.modules, "requests", mock_requests)
+
+    source = LoxoneDataSource(state_url_template="http://host/jdev/sps/io/{uuid}/state")
+    cache = StateCache()
+    uuid = "01234567-89ab-cdef-0123-456789abcdef"
+
+    assert LoxoneDataFetcher(source, state_cache=cache).resolve_state_value(uuid) == "5"
+    assert LoxoneDataFetcher(source, state_cache=cache).resolve_state_value(uuid) == "5"
+    assert mock_requests.Session.return_value.get.call_count == 1
+
+
+def _endpoint_requests(working_suffix_free):
+    """Mock requests where ``/state`` fails for the given UUIDs."""
+
+    def get(url, auth=None, timeout=None):
+        response = MagicMock()
+        uuid = url.split("/")[-2] if url.endswith("/state") else url.split("/")[-1]
+        if url.endswith("/state") and uuid in working_suffix_free:
+            response.raise_for_status.side_effect = RuntimeError("500 Server Error")
+        elif uuid.startswith("dead"):
+            response.raise_for_status.side_effect = RuntimeError("404")
+        else:
+            response.raise_for_status.return_value = None
+            response.json.return_value = {"LL": {"value": "1"}}
+        return response
+
+    mock_requests = MagicMock()
+    mock_requests.Session.return_value.get.side_effect = get
+    return mock_requests
+
+
+def test_endpoint_variant_is_learned_per_uuid_and_type(monkeypatch):
+    from loxone_data import StateEndpointMemory
+
+    timed_a = "aaaa0000-0000-0000-0000-000000000001"
+    timed_b = "aaaa0000-0000-0000-0000-000000000002"
+    mock_requests = _endpoint_requests({timed_a, timed_b})
+    monkeypatch.setitem(sys.modules, "requests", mock_requests)
+    source = LoxoneDataSource(state_url_template="http://host/jdev/sps/io/{uuid}/state")
+    memory = StateEndpointMemory()
+    memory.register_controls(
+        [
+            ControlRow("c1", "A", "TimedSwitch", "", "", (), (("active", timed_a),), ()),
+            ControlRow("c2", "B", "TimedSwitch", "", "", (), (("active", timed_b),), ()),
+        ]
+    )
+    session = mock_requests.Session.return_value
+
+    LoxoneDataFetcher(source, endpoints=memory).resolve_state_value(timed_a)
+    assert session.get.call_count == 2
+
+    LoxoneDataFetcher(source, endpoints=memory).resolve_state_value(timed_a)
+    LoxoneDataFetcher(source, endpoints=memory).resolve_state_value(timed_b)
+    assert session.get.call_count == 4
+    assert not session.get.call_args_list[-1].args[0].endswith("/state")
+
+
+def test_failing_uuid_backs_off(monkeypatch):
+    from loxone_data import StateEndpointMemory
+
+    monkeypatch.setitem(sys.modules, "requests", _endpoint_requests(set()))
+    source = LoxoneDataSource(state_url_template="http://host/jdev/sps/io/{uuid}/state")
+    now = [0.0]
+    memory = StateEndpointMemory(failure_backoff=10.0, clock=lambda: now[0])
+    uuid = "dead0000-0000-0000-0000-000000000000"
+    session = sys.modules["requests"].Session.return_value
+
+    first = LoxoneDataFetcher(source, endpoints=memory).resolve_state_value(uuid)
+    second = LoxoneDataFetcher(source, endpoints=memory).resolve_state_value(uuid)
+    assert session.get.call_count == 2
+    assert second == first
+
+    now[0] = 11.0
+    LoxoneDataFetcher(source, endpoints=memory).resolve_state_value(uuid)
+    assert session.get.call_count == 4
+    # Zweiter Fehlschlag verdoppelt die Wartezeit.
+    now[0] = 25.0
+    LoxoneDataFetcher(source, endpoints=memory).resolve_state_value(uuid)
+    assert session.get.call_count == 4
+
+
+def test_endpoint_memory_keeps_only_recent_uuids():
+    from loxone_data import StateEndpointMemory
+
+    memory = StateEndpointMemory(max_entries=2)
+    for uuid in ("a", "b", "c"):
+        memory.record_success(uuid, 1)
+        memory.order(uuid, 2)
+    memory.order("b", 2)
+    memory.record_success("d", 1)
+    memory.order("d", 2)
+
+    assert list(memory._uses) == ["b", "d"]
+    assert list(memory._by_uuid) == ["b", "d"]
+    assert memory.order("b", 2) == [1, 0]
+    assert memory.order("c", 2) == [0, 1]
+
+    for uuid in ("x", "y", "z"):
+        memory.record_failure(uuid, "kaputt")
+    assert list(memory._failures) == ["y", "z"]
+    memory.record_failure("d", "kaputt")
+    assert list(memory._failures) == ["z", "d"]
+    memory.record_success("e", 0)
+    memory.record_success("f", 0)
+    # "d" fällt mit seinem Endpunkt aus dem Speicher, samt Fehlerzähler.
+    assert list(memory._by_uuid) == ["e", "f"]
+    assert "d" not in memory._failures
+
+
+def test_circuit_breaker_opens_and_recovers():
+    from loxone_data import CircuitBreaker, CircuitOpenError
+
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=2, base_backoff=10.0, clock=lambda: now[0], jitter=lambda: 1.0
+    )
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 10.0
+    breaker.before_call()  # Probeanfrage im Half-Open-Zustand
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+
+    now[0] = 25.0
+    assert breaker.state == CircuitBreaker.OPEN  # Wartezeit verdoppelt
+    now[0] = 30.0
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_serves_last_good_data(monkeypatch):
+    from loxone_data import CircuitBreaker, StateCache, clear_structure_cache
+
+    clear_structure_cache()
+    payload = {"lastModified": "v1", "controls": {}}
+    monkeypatch.setitem(sys.modules, "requests", _structure_requests(["v1"], payload))
+    source = LoxoneDataSource(
+        url="http://host/data/LoxAPP3.json",
+        version_url="http://host/jdev/sps/LoxAPPversion3",
+        state_url_template="http://host/jdev/sps/io/{uuid}/state",
+    )
+    breaker = CircuitBreaker(failure_threshold=1)
+    cache = StateCache(ttl=0.0)
+    uuid = "01234567-89ab-cdef-0123-456789abcdef"
+    cache.put(uuid, "21.5")
+    LoxoneDataFetcher(source, breaker=breaker).load()
+
+    offline = MagicMock()
+    offline.Session.return_value.get.side_effect = ConnectionError("timeout")
+    monkeypatch.setitem(sys.modules, "requests", offline)
+    fetcher = LoxoneDataFetcher(source, breaker=breaker, state_cache=cache)
+
+    assert fetcher.load()["lastModified"] == "v1"
+    assert fetcher.resolve_state_value(uuid) == "21.5"
+    # Nach dem ersten Fehlschlag bleibt der Circuit offen: kein weiterer Versuch.
+    assert offline.Session.return_value.get.call_count == 1
+    clear_structure_cache()
+
+
+def test_rate_limiter_is_off_by_default(monkeypatch) -> None:
+    from loxone_data import shared_rate_limiter
+
+    monkeypatch.delenv("LOXONE_RATE_LIMIT", raising=False)
+    source = LoxoneDataSource.from_env()
+
+    assert source.rate_limit == 0
+    assert shared_rate_limiter(source) is None
+    assert shared_rate_limiter(LoxoneDataSource(url="http://host/", rate_limit=10.0)) is not None
+
+
+def test_rate_limiter_drops_requests_after_burst() -> None:
+    now = [0.0]
+    limiter = RateLimiter(1.0, 2, max_wait={PRIORITY_AUTOMATIC: 0.0}, clock=lambda: now[0])
+
+    limiter.acquire()
+    limiter.acquire()
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire()
+
+    now[0] = 1.0
+    limiter.acquire()
+
+    stats = limiter.stats()
+    assert stats["granted"] == 3
+    assert stats["queued"] == 1
+    assert stats["dropped"]["automatic"] == 1
+
+
+def test_rate_limiter_serves_automatic_before_debug() -> None:
+    import threading
+    import time
+
+    now = [0.0]
+    limiter = RateLimiter(100.0, 1, clock=lambda: now[0])
+    limiter.acquire()
+    order = []
+
+    def request(priority: int, name: str) -> None:
+        limiter.acquire(priority)
+        order.append(name)
+
+    def wait_for_waiters(count: int) -> None:
+        for _ in range(200):
+            if limiter.stats()["waiting"] == count:
+                return
+            time.sleep(0.005)
+        raise AssertionError("Anfrage wurde nicht eingereiht")
+
+    debug = threading.Thread(target=request, args=(PRIORITY_DEBUG, "debug"))
+    debug.start()
+    wait_for_waiters(1)
+    automatic = threading.Thread(target=request, args=(PRIORITY_AUTOMATIC, "automatic"))
+    automatic.start()
+    wait_for_waiters(2)
+
+    now[0] = 0.01
+    automatic.join(timeout=2)
+    now[0] = 0.02
+    debug.join(timeout=2)
+
+    assert order == ["automatic", "debug"]
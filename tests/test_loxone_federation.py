@@ -0,0 +1,134 @@
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from loxone_data import LoxoneDataFetcher, LoxoneDataSource
+from loxone_federation import MiniserverFederation, federation_sources_from_env
+
+
+def _structure(prefix, room):
+    return {
+        "lastModified": f"2024-01-0{len(prefix)} 10:00:00",
+        "rooms": {f"{prefix}-room": {"name": room}},
+        "controls": {
+            f"{prefix}-control": {
+                "name": f"Control {prefix}",
+                "type": "InfoOnlyAnalog",
+                "room": f"{prefix}-room",
+                "states": {"value": f"{prefix}-state"},
+            }
+        },
+    }
+
+
+class _FakeFetcher(LoxoneDataFetcher):
+    def __init__(self, payload, gate=None):
+        super().__init__(LoxoneDataSource())
+        self.payload = payload
+        self.gate = gate
+        self.resolved = []
+
+    def load(self):
+        if self.gate is not None:
+            self.gate.wait(5)
+        return self.payload
+
+    def resolve_state_value(self, candidate):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.resolved.append(candidate)
+        self.state_cache.put(candidate, f"value of {candidate}")
+        return f"value of {candidate}"
+
+
+def test_federation_merges_namespace_and_routes_states():
+    main = _FakeFetcher(_structure("a", "Küche"))
+    client = _FakeFetcher(_structure("bb", "Garage"))
+    federation = MiniserverFederation({"main": main, "garage": client}, timeout=2.0)
+
+    payload = federation.load()
+    rows = federation.extract_controls(payload)
+
+    assert [row.uuid for row in rows] == ["bb-control", "a-control"]
+    assert {row.room for row in rows} == {"Küche", "Garage"}
+    assert set(payload["controls"]) == {"a-control", "bb-control"}
+    assert federation.load() is payload
+
+    values = federation.resolve_many(["a-state", "bb-state"])
+
+    assert values == {"a-state": "value of a-state", "bb-state": "value of bb-state"}
+    assert set(main.resolved) == {"a-state"}
+    assert set(client.resolved) == {"bb-state"}
+    assert {entry["name"]: entry["status"] for entry in federation.health_report()} == {
+        "main": "ok",
+        "garage": "ok",
+    }
+
+
+def test_federations_of_the_same_servers_share_one_cache_entry():
+    from loxone_data import _structure_cache, clear_structure_cache
+
+    clear_structure_cache()
+    main = _FakeFetcher(_structure("a", "Küche"))
+    client = _FakeFetcher(_structure("bb", "Garage"))
+    for _attempt in range(3):
+        federation = MiniserverFederation({"main": main, "garage": client}, timeout=2.0)
+        payload = federation.load()
+
+    assert list(_structure_cache) == [federation.cache_key]
+    assert [row.uuid for row in LoxoneDataFetcher.extract_controls(payload)] == [
+        "bb-control",
+        "a-control",
+    ]
+    clear_structure_cache()
+
+
+def test_slow_server_does_not_stall_the_others():
+    gate = threading.Event()
+    main = _FakeFetcher(_structure("a", "Küche"))
+    slow = _FakeFetcher(_structure("bb", "Garage"), gate=gate)
+    federation = MiniserverFederation({"main": main, "slow": slow}, timeout=0.05)
+    try:
+        payload = federation.load()
+
+        assert set(payload["controls"]) == {"a-control"}
+        assert payload["missing"] == ["slow"]
+        assert federation.health["slow"].status == "slow"
+
+        gate.set()
+        federation._loading["slow"].result(timeout=2)
+        payload = federation.load()
+        assert set(payload["controls"]) == {"a-control", "bb-control"}
+        assert federation.health["slow"].status == "ok"
+
+        gate.clear()
+        values = federation.resolve_many(["a-state", "bb-state"])
+        assert values == {"a-state": "value of a-state", "bb-state": None}
+        assert federation.resolve_state_value("bb-state") is None
+        assert federation.health["slow"].status == "slow"
+    finally:
+        gate.set()
+
+
+def test_federation_sources_from_env(monkeypatch):
+    monkeypatch.setenv("LOXONE_SERVERS", "garage=10.0.0.2, 10.0.0.3")
+    monkeypatch.setenv("LOXONE_GARAGE_USERNAME", "garage-user")
+    base = LoxoneDataSource(
+        url="http://10.0.0.1/data/LoxAPP3.json",
+        username="admin",
+        password="secret",
+        cache_path=Path("/tmp/loxapp.json"),
+    )
+
+    sources = federation_sources_from_env(base)
+
+    assert list(sources) == ["main", "garage", "10.0.0.3"]
+    garage = sources["garage"]
+    assert garage.url == "http://10.0.0.2/data/LoxAPP3.json"
+    assert garage.state_url_template == "http://10.0.0.2/jdev/sps/io/{uuid}/state"
+    assert garage.username == "garage-user"
+    assert garage.password == "secret"
+    assert garage.cache_path == Path("/tmp/loxapp-garage.json")
+    assert sources["10.0.0.3"].username == "admin"
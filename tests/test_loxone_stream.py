@@ -0,0 +1,233 @@
+import base64
+import hashlib
+import json
+import socketserver
+import struct
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from loxone_data import LoxoneDataSource
+from loxone_stream import (
+    MSG_TEXT,
+    MSG_TEXT_EVENTS,
+    MSG_VALUE_EVENTS,
+    LoxoneStateStream,
+    build_message_header,
+    decode_text_events,
+    decode_value_events,
+    encode_loxone_uuid,
+    format_loxone_uuid,
+)
+
+VALUE_UUID = "0f8a1b2c-0123-4567-89abcdef01234567"
+TEXT_UUID = "1a2b3c4d-0001-0002-0003000400050006"
+
+
+def _value_table(values):
+    return b"".join(
+        encode_loxone_uuid(uuid) + struct.pack("<d", value) for uuid, value in values.items()
+    )
+
+
+def _text_table(texts):
+    chunks = []
+    for uuid, text in texts.items():
+        encoded = text.encode("utf-8")
+        padding = b"\0" * (-len(encoded) % 4)
+        chunks.append(
+            encode_loxone_uuid(uuid)
+            + bytes(16)
+            + struct.pack("<I", len(encoded))
+            + encoded
+            + padding
+        )
+    return b"".join(chunks)
+
+
+class _MiniserverStandIn(socketserver.BaseRequestHandler):
+    """Speaks just enough of the Loxone WebSocket protocol for the tests."""
+
+    def handle(self):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += self.request.recv(1024)
+        key = next(
+            line.split(b":", 1)[1].strip()
+            for line in request.split(b"\r\n")
+            if line.lower().startswith(b"sec-websocket-key")
+        )
+        accept = base64.b64encode(
+            hashlib.sha1(key + b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11").digest()
+        )
+        self.request.sendall(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        self.server.commands = []
+        while True:
+            try:
+                command = self._read_text()
+            except ConnectionError:
+                return
+            self.server.commands.append(command)
+            if command.startswith("jdev/sys/getkey2/"):
+                self._reply(command, {"key": "00ff", "salt": "abcd", "hashAlg": "SHA256"})
+            elif command.startswith("jdev/sys/getjwt/"):
+                self._reply(command, {"token": "t"})
+            elif command == "jdev/sps/enablebinstatusupdate":
+                self._reply(command, "1")
+                self._send_event(MSG_VALUE_EVENTS, _value_table(self.server.values))
+                self._send_event(MSG_TEXT_EVENTS, _text_table(self.server.texts))
+
+    def _read_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    def _read_text(self):
+        first, second = self._read_exact(2)
+        length = second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", self._read_exact(2))
+        mask = self._read_exact(4)
+        payload = self._read_exact(length)
+        if first & 0x0F == 0x8:
+            raise ConnectionError
+        return bytes(b ^ mask[i % 4] for i, b in enumerate(payload)).decode()
+
+    def _send_frame(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = bytes([0x80 | opcode, length])
+        else:
+            header = bytes([0x80 | opcode, 126]) + struct.pack("!H", length)
+        self.request.sendall(header + payload)
+
+    def _reply(self, command, value):
+        body = json.dumps({"LL": {"control": command, "value": value, "Code": "200"}}).encode()
+        self._send_frame(0x2, build_message_header(MSG_TEXT, len(body)))
+        self._send_frame(0x1, body)
+
+    def _send_event(self, identifier, payload):
+        self._send_frame(0x2, build_message_header(identifier, len(payload)))
+        self._send_frame(0x2, payload)
+
+
+@pytest.fixture()
+def miniserver():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _MiniserverStandIn)
+    server.daemon_threads = True
+    server.values = {VALUE_UUID: 21.5}
+    server.texts = {TEXT_UUID: "Geöffnet"}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_uuid_roundtrip():
+    raw = encode_loxone_uuid(VALUE_UUID)
+
+    assert len(raw) == 16
+    assert format_loxone_uuid(raw) == VALUE_UUID
+
+
+def test_decode_event_tables():
+    values = decode_value_events(_value_table({VALUE_UUID: 1.0, TEXT_UUID: -3.25}))
+    texts = decode_text_events(_text_table({TEXT_UUID: "abc", VALUE_UUID: "x"}))
+
+    assert values == {VALUE_UUID: 1.0, TEXT_UUID: -3.25}
+    assert texts == {TEXT_UUID: "abc", VALUE_UUID: "x"}
+
+
+def test_stream_populates_state_map(miniserver):
+    host, port = miniserver.server_address
+    source = LoxoneDataSource(
+        username="user",
+        password="secret",
+        websocket_url=f"ws://{host}:{port}/ws/rfc6455",
+    )
+    stream = LoxoneStateStream(source, timeout=2.0, reconnect_delay=0.1)
+    stream.start()
+    try:
+        assert stream.wait_until_connected(2.0)
+        deadline = threading.Event()
+        while stream.resolve_state_value(TEXT_UUID) is None and not deadline.wait(0.01):
+            pass
+        assert stream.resolve_state_value(VALUE_UUID) == "21.5"
+        assert stream.resolve_state_value(TEXT_UUID) == "Geöffnet"
+    finally:
+        stream.stop()
+
+    # Nach dem Trennen werden keine veralteten Werte mehr geliefert.
+    assert stream.connected is False
+    assert stream.resolve_state_value(VALUE_UUID) is None
+    assert miniserver.commands[0] == "jdev/sys/getkey2/user"
+    assert miniserver.commands[1].startswith("jdev/sys/getjwt/")
+    assert "jdev/sps/enablebinstatusupdate" in miniserver.commands
+
+
+def test_apply_updates_signals_only_real_changes():
+    source = LoxoneDataSource(websocket_url="ws://127.0.0.1:1/ws/rfc6455")
+    changes = []
+    stream = LoxoneStateStream(source, on_change=changes.append)
+
+    stream.apply_updates({VALUE_UUID: 1.0})
+    stream.apply_updates({VALUE_UUID: 1.0})
+
+    assert changes == [{VALUE_UUID: 1.0}]
+    assert stream.wait_for_change(0) is True
+    assert stream.wait_for_change(0) is False
+
+
+def test_resolve_state_value_requires_connection():
+    source = LoxoneDataSource(websocket_url="ws://127.0.0.1:1/ws/rfc6455")
+    stream = LoxoneStateStream(source)
+    stream.apply_updates({VALUE_UUID: 1.0})
+
+    assert stream.resolve_state_value(VALUE_UUID) is None
+
+    stream._connected.set()
+    assert stream.resolve_state_value(VALUE_UUID) == "1"
+
+
+def test_wait_for_change_wakes_only_for_watched_states():
+    source = LoxoneDataSource(websocket_url="ws://127.0.0.1:1/ws/rfc6455")
+    stream = LoxoneStateStream(source, min_wake_interval=0)
+    stream.watch([VALUE_UUID])
+
+    stream.apply_updates({TEXT_UUID: "x"})
+    assert stream.wait_for_change(0) is False
+
+    stream.apply_updates({VALUE_UUID: 1.0, TEXT_UUID: "y"})
+    assert stream.wait_for_change(0) is True
+    assert stream.take_changes() == {VALUE_UUID}
+    assert stream.take_changes() == set()
+
+
+def test_wait_for_change_coalesces_bursts():
+    source = LoxoneDataSource(websocket_url="ws://127.0.0.1:1/ws/rfc6455")
+    now = [100.0]
+    waits = []
+    stream = LoxoneStateStream(source, min_wake_interval=0.5, clock=lambda: now[0])
+    stream._stop.wait = lambda timeout=None: waits.append(timeout)
+
+    stream.apply_updates({VALUE_UUID: 1.0})
+    assert stream.wait_for_change(0) is True
+    now[0] += 0.1
+    stream.apply_updates({VALUE_UUID: 2.0})
+    stream.apply_updates({TEXT_UUID: "z"})
+    assert stream.wait_for_change(0) is True
+
+    assert waits == [pytest.approx(0.4)]
+    assert stream.take_changes() == {VALUE_UUID, TEXT_UUID}
@@ -0,0 +1,99 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from loxone_data import LoxoneDataFetcher, LoxoneDataSource, clear_structure_cache
+from loxone_structure import StructureModel, parse_structure
+
+
+def _document():
+    return {
+        "lastModified": "2024-01-01 10:00:00",
+        "msInfo": {"serialNr": "x", "list": [1, 2, {"a": "}"}]},
+        "autopilot": {"rule": {"text": "escaped \" quote and \\ backslash {["}},
+        "controls": {
+            "uuid-1": {
+                "name": "Deckenlicht",
+                "type": "Switch",
+                "room": "room-1",
+                "cat": "cat-1",
+                "details": {"format": "%.0f %%"},
+                "states": {"active": "state-1"},
+                "links": ["uuid-2"],
+                "subControls": {"sub": {"name": "ignored", "states": {}}},
+            },
+            "uuid-3": {"name": "Fenster öffnen", "type": "Info", "room": "room-2"},
+        },
+        "rooms": {"room-1": {"name": "Wohnzimmer"}},
+        "cats": {"cat-1": {"name": "Licht"}},
+        "weatherServer": {"forecast": [[1.5, -2, True, None]] * 5},
+        "messageCenter": {},
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_parse_structure_matches_full_parse(chunk_size):
+    document = _document()
+    text = json.dumps(document, indent=1)
+
+    parsed = parse_structure(io.StringIO(text), chunk_size=chunk_size)
+
+    assert parsed.rows == LoxoneDataFetcher.extract_controls(document)
+    assert parsed.payload["lastModified"] == "2024-01-01 10:00:00"
+    assert parsed.payload["controls"]["uuid-1"] == {"states": {"active": "state-1"}}
+    assert set(parsed.payload) == {"lastModified", "rooms", "cats", "controls"}
+
+
+def test_fetcher_streams_local_file(tmp_path: Path):
+    clear_structure_cache()
+    path = tmp_path / "LoxAPP3.json"
+    path.write_text(json.dumps(_document()), encoding="utf-8")
+    fetcher = LoxoneDataFetcher(LoxoneDataSource(json_path=path, stream_parse=True))
+
+    payload = fetcher.load()
+    rows = fetcher.extract_controls(payload)
+
+    assert "autopilot" not in payload
+    assert [row.uuid for row in rows] == ["uuid-3", "uuid-1"]
+    assert rows[1].room == "Wohnzimmer"
+    assert rows[1].category == "Licht"
+    clear_structure_cache()
+
+
+def test_structure_model_reports_only_changes():
+    clear_structure_cache()
+    model = StructureModel()
+    first = _document()
+
+    diff = model.update(first)
+    assert diff.initial is True
+    assert set(diff.added) == {"uuid-1", "uuid-3"}
+    assert list(model.controls.values()) == LoxoneDataFetcher.extract_controls(first)
+
+    assert not model.update(first)
+
+    second = _document()
+    second["controls"]["uuid-1"]["name"] = "Stehlampe"
+    second["controls"]["uuid-3"]["states"] = {"value": "state-3"}
+    second["controls"]["uuid-4"] = {"name": "Neu", "type": "Switch"}
+
+    diff = model.update(second)
+    assert diff.initial is False
+    assert diff.added == ("uuid-4",)
+    assert diff.removed == ()
+    assert diff.renamed == ("uuid-1",)
+    assert diff.states_changed == ("uuid-3",)
+    assert set(diff.changed) == {"uuid-1", "uuid-3", "uuid-4"}
+    assert model.controls["uuid-1"].name == "Stehlampe"
+
+    third = _document()
+    del third["controls"]["uuid-3"]
+    diff = model.update(third)
+    assert set(diff.removed) == {"uuid-3", "uuid-4"}
+    assert diff.renamed == ("uuid-1",)
+    assert set(model.controls) == {"uuid-1"}
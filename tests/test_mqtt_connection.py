@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+# Füge den Projektstamm zum Python-Pfad hinzu
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from mqtt_connection import MqttConnection, topic_matches
+
+
+def test_topic_matches_wildcards():
+    assert topic_matches("awtrix/+/custom", "awtrix/clock1/custom")
+    assert topic_matches("awtrix/#", "awtrix")
+    assert topic_matches("awtrix/#", "awtrix/custom/uuid")
+    assert not topic_matches("awtrix/+", "awtrix/custom/uuid")
+    assert not topic_matches("awtrix/custom", "awtrix/notify")
+
+
+def test_connection_restores_subscriptions_and_dispatches_messages():
+    client = MagicMock()
+    connection = MqttConnection(client, "broker", 1883, publisher=MagicMock())
+    bridge = MagicMock()
+    stats = MagicMock()
+    connection.subscribe("loxone/in", bridge)
+    connection.subscribe("awtrix/+/stats", stats, qos=1)
+    # Vor dem Verbinden wird nichts abonniert.
+    client.subscribe.assert_not_called()
+
+    client.on_connect(client, None, {}, 0)
+    client.on_disconnect(client, None, 1)
+    client.on_connect(client, None, {}, 0)
+
+    expected = [("loxone/in", 0), ("awtrix/+/stats", 1)]
+    assert [call.args[0] for call in client.subscribe.call_args_list] == [expected, expected]
+
+    message = SimpleNamespace(topic="awtrix/clock1/stats", payload=b"{}")
+    client.on_message(client, None, message)
+    stats.assert_called_once_with(client, None, message)
+    bridge.assert_not_called()
+
+
+def test_connection_pauses_publisher_while_disconnected():
+    client = MagicMock()
+    client.is_connected.return_value = False
+    publisher = MagicMock()
+    connection = MqttConnection(client, "broker", 1883, publisher=publisher)
+    listener = MagicMock()
+    connection.add_connect_listener(listener)
+
+    connection.start()
+    client.connect_async.assert_called_once_with("broker", 1883, 60)
+    client.on_connect(client, None, {"session present": 1}, 0)
+    client.on_disconnect(client, None, 7)
+    client.on_connect(client, None, {"session present": 0}, 0)
+
+    assert [call.args[0] for call in publisher.set_online.call_args_list] == [False, True, False, True]
+    assert listener.call_count == 2
@@ -0,0 +1,191 @@
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# Füge den Projektstamm zum Python-Pfad hinzu
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from mqtt_publisher import MESSAGE_BRIDGE, MqttPublisher
+
+
+class FakeClient:
+    def __init__(self):
+        self.on_publish = None
+        self.published = []
+        self.properties = []
+        self.next_mid = 0
+
+    def publish(self, topic, payload, qos=0, retain=False, properties=None):
+        self.next_mid += 1
+        self.published.append((topic, payload, qos, self.next_mid))
+        self.properties.append(properties)
+        return SimpleNamespace(rc=0, mid=self.next_mid)
+
+
+def test_publisher_coalesces_latest_value_per_key_and_drops_oldest():
+    client = FakeClient()
+    publisher = MqttPublisher(client, max_queue=2)
+
+    publisher.publish("clock/custom/a", "1", key="a")
+    publisher.publish("clock/custom/a", "2", key="a")
+    publisher.publish("clock/notify", "n1")
+    publisher.publish("clock/notify", "n2")
+
+    publisher.start()
+    publisher.stop()
+
+    assert [(topic, payload) for topic, payload, _qos, _mid in client.published] == [
+        ("clock/notify", "n1"),
+        ("clock/notify", "n2"),
+    ]
+    stats = publisher.stats()
+    assert stats["coalesced"] == 1
+    assert stats["dropped"] == 1
+    assert stats["queued"] == 0
+
+
+def test_publisher_respects_inflight_window_and_measures_ack_latency():
+    now = [0.0]
+    client = FakeClient()
+    sent = threading.Event()
+    publish = client.publish
+
+    def publish_and_signal(*args, **kwargs):
+        info = publish(*args, **kwargs)
+        sent.set()
+        return info
+
+    client.publish = publish_and_signal
+    publisher = MqttPublisher(
+        client, qos={MESSAGE_BRIDGE: 1}, max_inflight=1, clock=lambda: now[0]
+    )
+    publisher.publish("bridge", "a", message_class=MESSAGE_BRIDGE)
+    publisher.publish("bridge", "b", message_class=MESSAGE_BRIDGE)
+    publisher.start()
+
+    assert sent.wait(2)
+    sent.clear()
+    # Ohne Bestätigung bleibt die zweite Nachricht in der Warteschlange.
+    assert not sent.wait(0.1)
+    assert publisher.stats()["queued"] == 1
+
+    now[0] = 0.25
+    client.on_publish(client, None, client.published[0][3])
+    assert sent.wait(2)
+    publisher.stop()
+
+    assert [(payload, qos) for _topic, payload, qos, _mid in client.published] == [("a", 1), ("b", 1)]
+    stats = publisher.stats()
+    assert stats["acked"] == 1
+    assert stats["ack_latency"]["max"] == 0.25
+
+
+def test_publisher_buffers_last_value_per_topic_while_offline():
+    client = FakeClient()
+    publisher = MqttPublisher(client)
+    publisher.set_online(False)
+    publisher.start()
+
+    publisher.publish("clock/custom/a", "1")
+    publisher.publish("clock/custom/a", "2")
+    publisher.publish("clock/custom/b", "3")
+    assert publisher.stats()["queued"] == 2
+    assert client.published == []
+
+    publisher.set_online(True)
+    publisher.stop()
+
+    assert [(topic, payload) for topic, payload, _qos, _mid in client.published] == [
+        ("clock/custom/a", "2"),
+        ("clock/custom/b", "3"),
+    ]
+    assert publisher.stats()["buffered"] == 3
+
+
+def test_publisher_uses_topic_aliases_expiry_and_uuid_property():
+    now = [100.0]
+    client = FakeClient()
+    publisher = MqttPublisher(
+        client,
+        properties_factory=SimpleNamespace,
+        message_expiry=60,
+        topic_alias_limit=1,
+        clock=lambda: now[0],
+    )
+    publisher.set_topic_alias_maximum(10)
+
+    publisher.publish("clock/custom/a", "1", key="a")
+    publisher.start()
+    publisher.stop()
+    publisher.publish("clock/custom/a", "2", key="a")
+    publisher.publish("clock/custom/b", "3", key="b")
+    now[0] = 130.0
+    publisher.start()
+    publisher.stop()
+
+    assert [topic for topic, _payload, _qos, _mid in client.published] == [
+        "clock/custom/a",
+        "",
+        "clock/custom/b",
+    ]
+    first, second, third = client.properties
+    assert (first.TopicAlias, first.UserProperty, first.MessageExpiryInterval) == (1, ("uuid", "a"), 60)
+    assert (second.TopicAlias, second.MessageExpiryInterval) == (1, 30)
+    assert not hasattr(third, "TopicAlias")
+
+    # Neue Verbindung: die alten Aliase gelten nicht mehr.
+    publisher.set_topic_alias_maximum(10)
+    publisher.publish("clock/custom/a", "4", key="a")
+    now[0] = 200.0
+    publisher.publish("clock/custom/b", "5", key="b")
+    now[0] = 250.0
+    publisher.start()
+    publisher.stop()
+
+    # "4" lag 120 s in der Warteschlange und ist verfallen; "b" erhält im
+    # neuen Alias-Bereich wieder Alias 1 und wird mit vollem Topic gesendet.
+    assert len(client.published) == 4
+    assert client.published[3][:2] == ("clock/custom/b", "5")
+    assert (client.properties[3].TopicAlias, client.properties[3].MessageExpiryInterval) == (1, 10)
+    assert publisher.stats()["stale"] == 1
+
+
+def test_publisher_records_messages_before_sending_and_undoes_failures():
+    now = [0.0]
+    client = FakeClient()
+    publish = client.publish
+    results = [1, 4]  # MQTT_ERR_NO_CONN, danach ein anderer Fehler
+    recorded = []
+    seen_by_client = []
+
+    def publish_or_fail(topic, payload, *args, **kwargs):
+        # Das Echo des Brokers darf nicht vor der Meldung ankommen.
+        seen_by_client.append(list(recorded))
+        if results:
+            return SimpleNamespace(rc=results.pop(), mid=0)
+        return publish(topic, payload, *args, **kwargs)
+
+    client.publish = publish_or_fail
+    publisher = MqttPublisher(
+        client,
+        on_send=recorded.append,
+        on_send_failed=recorded.remove,
+        properties_factory=SimpleNamespace,
+        message_expiry=60,
+        clock=lambda: now[0],
+    )
+
+    publisher.publish("clock/custom/a", "veraltet", key="a")
+    now[0] = 100.0
+    publisher.publish("clock/custom/b", "erneut", key="b")
+    publisher.publish("clock/custom/c", "gesendet", key="c")
+    publisher.start()
+    publisher.stop()
+
+    # Erneut eingereihte, fehlgeschlagene und verfallene Nachrichten bleiben nicht vermerkt.
+    assert seen_by_client == [["erneut"], ["erneut"], ["gesendet"]]
+    assert recorded == ["gesendet"]
+    assert [payload for _topic, payload, _qos, _mid in client.published] == ["gesendet"]
+    stats = publisher.stats()
+    assert (stats["stale"], stats["requeued"], stats["failed"], stats["published"]) == (1, 1, 1, 1)
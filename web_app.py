@@ -6,7 +6,8 @@ import os
 import threading
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Union
+from urllib.parse import urlencode
 
 from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse
@@ -19,16 +20,34 @@ try:  # pragma: no cover - optional dependency for HTTP access
 except ModuleNotFoundError:  # pragma: no cover - optional dependency for HTTP access
     requests = None  # type: ignore
 
-from auto_config import AutoConfigStore
+from auto_config import AutoConfigStore, ChangeFilter, ControlSchedule, DisplayProfile
 from app import (
+    AdaptivePoller,
     Config,
     automatic_mode,
     config_from_env,
-    create_mqtt_client,
+    create_mqtt_connection,
     mqtt_to_udp,
+    udp_stats,
     udp_to_mqtt,
 )
-from loxone_data import LoxoneDataFetcher, LoxoneDataSource
+from loxone_data import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LoxoneDataFetcher,
+    PRIORITY_DEBUG,
+    PRIORITY_UI,
+    LoxoneDataSource,
+    RateLimitExceeded,
+    StateCache,
+    StateEndpointMemory,
+    rate_limiter_stats,
+    request_priority,
+)
+from loxone_federation import MAIN_SERVER, MiniserverFederation, federation_sources_from_env
+from loxone_stream import LoxoneStateStream
+from loxone_structure import StructureModel
+from mqtt_publisher import publisher_stats
 
 app = FastAPI(title="Loxone Controls Viewer")
 TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
@@ -48,10 +67,92 @@ class IconConfigUpdate(BaseModel):
     icon: str
 
 
+class GroupConfigUpdate(BaseModel):
+    group: str = ""
+
+
+class DisplayCreate(BaseModel):
+    prefix: str
+
+
+class ScheduleConfigUpdate(BaseModel):
+    poll_interval: float = 0.0
+    refresh_interval: float = 0.0
+
+
+class FilterConfigUpdate(BaseModel):
+    absolute: float = 0.0
+    relative: float = 0.0
+    hysteresis: float = 0.0
+    min_interval: float = 0.0
+
+
+@lru_cache()
+def get_data_source() -> LoxoneDataSource:
+    return LoxoneDataSource.from_env()
+
+
+@lru_cache()
+def get_state_cache() -> StateCache:
+    source = get_data_source()
+    return StateCache(ttl=source.state_ttl, max_entries=source.state_cache_size)
+
+
+@lru_cache()
+def get_endpoint_memory() -> StateEndpointMemory:
+    return StateEndpointMemory()
+
+
 @lru_cache()
-def get_fetcher() -> LoxoneDataFetcher:
-    source = LoxoneDataSource.from_env()
-    return LoxoneDataFetcher(source=source)
+def get_circuit_breaker() -> CircuitBreaker:
+    return CircuitBreaker()
+
+
+@lru_cache()
+def get_federation() -> Optional[MiniserverFederation]:
+    """Return the federation of all Miniservers when client servers are configured."""
+
+    sources = federation_sources_from_env(get_data_source())
+    if len(sources) < 2:
+        return None
+    fetchers = {
+        name: LoxoneDataFetcher(source=source, state_cache=get_state_cache())
+        for name, source in sources.items()
+        if name != MAIN_SERVER
+    }
+    return MiniserverFederation({MAIN_SERVER: _create_main_fetcher(), **fetchers})
+
+
+def create_fetcher() -> Union[LoxoneDataFetcher, MiniserverFederation]:
+    """Build a fetcher that shares caches and endpoint knowledge process-wide.
+
+    With ``LOXONE_SERVERS`` the long-lived federation of all Miniservers is
+    returned instead, so per-server health and pending requests survive cycles.
+    """
+
+    federation = get_federation()
+    if federation is not None:
+        return federation
+    return _create_main_fetcher()
+
+
+def _create_main_fetcher() -> LoxoneDataFetcher:
+    return LoxoneDataFetcher(
+        source=get_data_source(),
+        state_cache=get_state_cache(),
+        endpoints=get_endpoint_memory(),
+        breaker=get_circuit_breaker(),
+    )
+
+
+@lru_cache()
+def get_fetcher() -> Union[LoxoneDataFetcher, MiniserverFederation]:
+    return create_fetcher()
+
+
+@lru_cache()
+def get_structure_model() -> StructureModel:
+    return StructureModel()
 
 
 @lru_cache()
@@ -64,6 +165,17 @@ def get_bridge_config() -> Config:
     return config_from_env()
 
 
+@lru_cache()
+def get_adaptive_poller() -> Optional[AdaptivePoller]:
+    try:
+        config = get_bridge_config()
+    except ValueError:
+        return None
+    if not config.adaptive_polling:
+        return None
+    return AdaptivePoller(config.adaptive_min_interval, config.adaptive_max_interval)
+
+
 @app.on_event("startup")
 def start_bridge() -> None:
     try:
@@ -73,38 +185,81 @@ def start_bridge() -> None:
         return
 
     store = get_auto_config_store()
-    source = LoxoneDataSource.from_env()
+    source = get_data_source()
+
+    state_stream = None
+    if source.websocket_url:
+        state_stream = LoxoneStateStream(source)
+        state_stream.start()
 
-    publisher_client = create_mqtt_client(config)
-    publisher_client.loop_start()
+    # Eine Broker-Verbindung für Brücke und Automatikmodus.
+    connection = create_mqtt_connection(config)
+    mqtt_to_udp(config, connection)
+    connection.start()
 
-    threading.Thread(target=mqtt_to_udp, args=(config,), daemon=True).start()
     threading.Thread(
         target=udp_to_mqtt,
-        args=(publisher_client, config),
+        args=(connection, config),
         daemon=True,
     ).start()
     threading.Thread(
         target=automatic_mode,
-        args=(config, store, lambda: LoxoneDataFetcher(source=source)),
+        args=(config, store, create_fetcher),
+        kwargs={
+            "state_stream": state_stream,
+            "adaptive": get_adaptive_poller(),
+            "connection": connection,
+        },
         daemon=True,
     ).start()
 
 
+def _display_selection(
+    store: AutoConfigStore, display: str
+) -> Union[AutoConfigStore, DisplayProfile]:
+    """Selection of the clock ``display``; an empty prefix is the default clock."""
+
+    if not display:
+        return store
+    try:
+        return store.profile(display)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Unbekannte Anzeige: {display}") from exc
+
+
 @app.get("/", response_class=HTMLResponse)
 def render_controls(
     request: Request,
+    display: str = "",
     fetcher: LoxoneDataFetcher = Depends(get_fetcher),
     store: AutoConfigStore = Depends(get_auto_config_store),
 ) -> HTMLResponse:
+    selection = _display_selection(store, display)
     try:
-        payload: Dict[str, object] = fetcher.load()
+        with request_priority(PRIORITY_UI):
+            payload: Dict[str, object] = fetcher.load()
+    except CircuitOpenError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except RateLimitExceeded as exc:
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
     except Exception as exc:
         if requests is not None and isinstance(exc, requests.RequestException):  # pragma: no cover - depends on network
             raise HTTPException(status_code=502, detail=f"Fehler beim Abruf der Daten: {exc}") from exc
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    controls = fetcher.extract_controls(payload)
+    structure = get_structure_model()
+    diff = structure.update(payload)
+    # Das Modell hat die Struktur schon geparst (sortiert wie extract_controls).
+    controls = list(structure.controls.values())
+    if diff.initial:
+        fetcher.register_controls(controls)
+    elif diff:
+        fetcher.register_controls(structure.controls[uuid] for uuid in diff.changed)
+    # Controls eines noch nicht geladenen Miniservers nicht als gelöscht behandeln.
+    if diff.complete:
+        store.sync_from(control.uuid for control in controls)
+    elif diff.removed:
+        store.forget(diff.removed)
     metadata = {
         "last_modified": payload.get("lastModified"),
         "control_count": len(payload.get("controls", {})),
@@ -112,69 +267,187 @@ def render_controls(
         "category_count": len(payload.get("cats", {})),
     }
 
-    store.sync_from(control.uuid for control in controls)
-
     return templates.TemplateResponse(
         "controls.html",
         {
             "request": request,
             "controls": controls,
             "metadata": metadata,
-            "auto_config": store.as_mapping(),
-            "mode_config": store.modes_mapping(),
-            "icon_config": store.icons_mapping(),
+            "auto_config": selection.as_mapping(),
+            "mode_config": selection.modes_mapping(),
+            "icon_config": selection.icons_mapping(),
+            "group_config": store.groups_mapping(),
+            "displays": store.profiles(),
+            "display": display,
+            "display_query": f"?{urlencode({'display': display})}" if display else "",
         },
     )
 
 
+@app.get("/api/displays")
+def read_displays(store: AutoConfigStore = Depends(get_auto_config_store)) -> List[str]:
+    return store.profiles()
+
+
+@app.post("/api/displays")
+def create_display(payload: DisplayCreate, store: AutoConfigStore = Depends(get_auto_config_store)):
+    try:
+        profile = store.add_profile(payload.prefix)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    return {"prefix": profile.prefix}
+
+
+@app.delete("/api/displays/{prefix:path}")
+def delete_display(prefix: str, store: AutoConfigStore = Depends(get_auto_config_store)):
+    _display_selection(store, prefix)
+    store.remove_profile(prefix)
+    return {"prefix": prefix}
+
+
 @app.get("/api/auto-config")
-def read_auto_config(store: AutoConfigStore = Depends(get_auto_config_store)) -> Dict[str, bool]:
-    return store.as_mapping()
+def read_auto_config(
+    display: str = "", store: AutoConfigStore = Depends(get_auto_config_store)
+) -> Dict[str, bool]:
+    return _display_selection(store, display).as_mapping()
 
 
 @app.post("/api/auto-config/{control_uuid}")
 def update_auto_config(
     control_uuid: str,
     payload: AutoConfigUpdate,
+    display: str = "",
     store: AutoConfigStore = Depends(get_auto_config_store),
 ):
-    store.set_enabled(control_uuid, payload.enabled)
-    return {"uuid": control_uuid, "enabled": store.is_enabled(control_uuid)}
+    selection = _display_selection(store, display)
+    selection.set_enabled(control_uuid, payload.enabled)
+    return {"uuid": control_uuid, "enabled": selection.is_enabled(control_uuid)}
 
 
 @app.get("/api/mode-config")
-def read_mode_config(store: AutoConfigStore = Depends(get_auto_config_store)) -> Dict[str, str]:
-    return store.modes_mapping()
+def read_mode_config(
+    display: str = "", store: AutoConfigStore = Depends(get_auto_config_store)
+) -> Dict[str, str]:
+    return _display_selection(store, display).modes_mapping()
 
 
 @app.post("/api/mode-config/{control_uuid}")
 def update_mode_config(
     control_uuid: str,
     payload: ModeConfigUpdate,
+    display: str = "",
     store: AutoConfigStore = Depends(get_auto_config_store),
 ):
+    selection = _display_selection(store, display)
     try:
-        store.set_mode(control_uuid, payload.mode)
+        selection.set_mode(control_uuid, payload.mode)
     except ValueError as exc:
         raise HTTPException(status_code=422, detail=str(exc)) from exc
-    return {"uuid": control_uuid, "mode": store.get_mode(control_uuid)}
+    return {"uuid": control_uuid, "mode": selection.get_mode(control_uuid)}
 
 
 @app.get("/api/icon-config")
-def read_icon_config(store: AutoConfigStore = Depends(get_auto_config_store)) -> Dict[str, str]:
-    return store.icons_mapping()
+def read_icon_config(
+    display: str = "", store: AutoConfigStore = Depends(get_auto_config_store)
+) -> Dict[str, str]:
+    return _display_selection(store, display).icons_mapping()
 
 
 @app.post("/api/icon-config/{control_uuid}")
 def update_icon_config(
     control_uuid: str,
     payload: IconConfigUpdate,
+    display: str = "",
     store: AutoConfigStore = Depends(get_auto_config_store),
 ):
-    store.set_icon(control_uuid, payload.icon)
+    selection = _display_selection(store, display)
+    selection.set_icon(control_uuid, payload.icon)
     if payload.icon:
-        store.set_mode(control_uuid, "app")
-    return {"uuid": control_uuid, "icon": store.get_icon(control_uuid), "mode": store.get_mode(control_uuid)}
+        selection.set_mode(control_uuid, "app")
+    return {
+        "uuid": control_uuid,
+        "icon": selection.get_icon(control_uuid),
+        "mode": selection.get_mode(control_uuid),
+    }
+
+
+@app.get("/api/group-config")
+def read_group_config(store: AutoConfigStore = Depends(get_auto_config_store)) -> Dict[str, str]:
+    return store.groups_mapping()
+
+
+@app.post("/api/group-config/{control_uuid}")
+def update_group_config(
+    control_uuid: str,
+    payload: GroupConfigUpdate,
+    display: str = "",
+    store: AutoConfigStore = Depends(get_auto_config_store),
+):
+    # Gruppen gelten für alle Uhren, der Modus nur für die gewählte Anzeige.
+    selection = _display_selection(store, display)
+    try:
+        store.set_group(control_uuid, payload.group)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    if store.get_group(control_uuid):
+        # Gruppen gibt es nur für Custom Apps.
+        selection.set_mode(control_uuid, "app")
+    return {
+        "uuid": control_uuid,
+        "group": store.get_group(control_uuid),
+        "mode": selection.get_mode(control_uuid),
+    }
+
+
+@app.get("/api/filter-config")
+def read_filter_config(
+    store: AutoConfigStore = Depends(get_auto_config_store),
+) -> Dict[str, Dict[str, float]]:
+    return store.filters_mapping()
+
+
+@app.post("/api/filter-config/{control_uuid}")
+def update_filter_config(
+    control_uuid: str,
+    payload: FilterConfigUpdate,
+    store: AutoConfigStore = Depends(get_auto_config_store),
+):
+    try:
+        change_filter = ChangeFilter(
+            absolute=payload.absolute,
+            relative=payload.relative,
+            hysteresis=payload.hysteresis,
+            min_interval=payload.min_interval,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    store.set_filter(control_uuid, change_filter)
+    current = store.get_filter(control_uuid)
+    return {"uuid": control_uuid, "filter": current.as_dict() if current else None}
+
+
+@app.get("/api/schedule-config")
+def read_schedule_config(
+    store: AutoConfigStore = Depends(get_auto_config_store),
+) -> Dict[str, Dict[str, float]]:
+    return store.schedules_mapping()
+
+
+@app.post("/api/schedule-config/{control_uuid}")
+def update_schedule_config(
+    control_uuid: str,
+    payload: ScheduleConfigUpdate,
+    store: AutoConfigStore = Depends(get_auto_config_store),
+):
+    try:
+        schedule = ControlSchedule(
+            poll_interval=payload.poll_interval,
+            refresh_interval=payload.refresh_interval,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    store.set_schedule(control_uuid, schedule)
+    return {"uuid": control_uuid, "schedule": store.get_schedule(control_uuid).as_dict()}
 
 
 @app.get("/api/debug-status/{control_uuid}")
@@ -184,24 +457,71 @@ def debug_status(
 ) -> Dict[str, object]:
     """Return the raw state responses for all state UUIDs of a control."""
 
-    try:
-        payload = fetcher.load()
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=str(exc)) from exc
+    with request_priority(PRIORITY_DEBUG):
+        try:
+            payload = fetcher.load()
+        except RateLimitExceeded as exc:
+            raise HTTPException(status_code=429, detail=str(exc)) from exc
+        except Exception as exc:
+            raise HTTPException(status_code=502, detail=str(exc)) from exc
 
-    control_data = payload.get("controls", {}).get(control_uuid)
-    if control_data is None:
-        raise HTTPException(status_code=404, detail="Control nicht gefunden")
+        control_data = payload.get("controls", {}).get(control_uuid)
+        if control_data is None:
+            raise HTTPException(status_code=404, detail="Control nicht gefunden")
 
-    states = control_data.get("states", {})
-    result: Dict[str, object] = {}
-    for key, state_uuid in states.items():
-        raw = fetcher.resolve_state_raw(str(state_uuid))
-        result[key] = {"uuid": state_uuid, "response": raw}
+        states = control_data.get("states", {})
+        result: Dict[str, object] = {}
+        for key, state_uuid in states.items():
+            raw = fetcher.resolve_state_raw(str(state_uuid))
+            result[key] = {"uuid": state_uuid, "response": raw}
 
     return {"control_uuid": control_uuid, "states": result}
 
 
+@app.get("/api/state-cache")
+def state_cache_stats(cache: StateCache = Depends(get_state_cache)) -> Dict[str, int]:
+    return cache.stats()
+
+
+@app.get("/api/rate-limit")
+def rate_limit_stats() -> Dict[str, Dict[str, object]]:
+    """Granted, queued and dropped Miniserver requests per host and priority."""
+
+    return rate_limiter_stats()
+
+
+@app.get("/api/mqtt-stats")
+def mqtt_stats() -> Dict[str, Dict[str, object]]:
+    """Queue length, drops and ack latency of the MQTT publishers."""
+
+    return publisher_stats()
+
+
+@app.get("/api/udp-stats")
+def udp_bridge_stats() -> Dict[str, Dict[str, object]]:
+    """Forwarded and suppressed MQTT→UDP messages per destination."""
+
+    return udp_stats()
+
+
+@app.get("/api/poll-stats")
+def poll_stats() -> Dict[str, Dict[str, float]]:
+    """Current adaptive poll interval and change rate per control."""
+
+    poller = get_adaptive_poller()
+    return poller.stats() if poller is not None else {}
+
+
+@app.get("/api/servers")
+def server_health() -> Dict[str, object]:
+    """Health and latency per Miniserver (only populated with ``LOXONE_SERVERS``)."""
+
+    federation = get_federation()
+    if federation is None:
+        return {"servers": []}
+    return {"servers": federation.health_report()}
+
+
 def _default_host() -> str:
     return os.getenv("WEBAPP_HOST", "0.0.0.0")
 